@@ -1,16 +1,54 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from routes.route_keyword_analyzer import router as keyword_analyzer
 from routes.route_roadmap_creator import router as roadmap_creator
 from routes.resume_parser import router as resume_parser
 from routes.route_analyzer_service import router as resume_analyzer
 from routes.routes_chatbot import router as chatbot
+from routes.route_resume_index import router as resume_index_router
+from routes.route_metrics import router as metrics_router
+from services.resume_index import resume_index
+from services.embedding_index import embedding_index
+from services.index_owner import index_owner
+from services.roadmap import roadmap_cache
+from services.llm_gateway import close_clients
+from services.text_extraction import RequestSizeLimitMiddleware
+from services.extraction_pool import extraction_pool
+from services.components import COMPONENT_WARMUP, PRELOAD_COMPONENTS, components
+from services.metrics import METRICS_ENABLED, MetricsMiddleware
+
+if PRELOAD_COMPONENTS:
+    # Load fork-safe models here so `gunicorn --preload` workers share them copy-on-write
+    components.preload()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Refuses to start a worker that cannot serve the resume indexes
+    index_owner.start()
+    extraction_pool.start()
+    if COMPONENT_WARMUP:
+        # Load models and clients in the background; the server accepts requests meanwhile
+        components.start_warm_up()
+    yield
+    await components.stop_warm_up()
+    if index_owner.held():
+        # Only the worker serving the indexes has anything to save
+        resume_index.snapshot()
+        embedding_index.snapshot()
+    roadmap_cache.flush_counts()
+    await close_clients()
+    extraction_pool.close()
 
 
 app = FastAPI(
     title="RefNetwork Unified API",
     version="1.0.0",
-    description="AI powered Parser, Keyword Analyzer, Roadmap Creator, Resume Analyzer "
+    description="AI powered Parser, Keyword Analyzer, Roadmap Creator, Resume Analyzer ",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -20,13 +58,26 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestSizeLimitMiddleware)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 app.include_router(keyword_analyzer, prefix="/refnet", tags=["Keyword Analyzer"])
 app.include_router(roadmap_creator, prefix="/refnet", tags=["Roadmap Creator"])
 app.include_router(resume_parser, prefix="/refnet", tags=["Resume Parser"])
 app.include_router(resume_analyzer, prefix="/refnet", tags=["Resume Analyzer"])
 app.include_router(chatbot,prefix='/refnet',tags=["Chatbot"])
+if index_owner.enabled:
+    app.include_router(resume_index_router, prefix="/refnet", tags=["Resume Index"])
+if METRICS_ENABLED:
+    app.include_router(metrics_router, tags=["Metrics"])
 
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
+
+@app.get("/ready")
+def readiness_check():
+    """200 once the background warm-up has loaded every component, 503 until then"""
+    status = components.status()
+    return JSONResponse(content=status, status_code=200 if status["ready"] else 503)
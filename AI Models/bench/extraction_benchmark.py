@@ -0,0 +1,133 @@
+import argparse
+import difflib
+import json
+import os
+import re
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from services.text_extraction import (
+    MIN_ALNUM_RATIO,
+    PDF_ENGINES,
+    extract_pdf,
+    extract_pdf_with,
+    normalize_extracted_text,
+    text_quality,
+)
+
+FIXTURES_DIR = os.path.join("data", "resume_fixtures")
+POLICY = "policy"
+
+_WORD = re.compile(r"\w+")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def fidelity(extracted: str, expected: str) -> Dict[str, float]:
+    """Word-level F1 (content) and sequence similarity (reading order) against the expected text"""
+    got, want = _words(extracted), _words(expected)
+    overlap = sum((Counter(got) & Counter(want)).values())
+    precision = overlap / len(got) if got else 0.0
+    recall = overlap / len(want) if want else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if overlap else 0.0
+    order = difflib.SequenceMatcher(None, got, want, autojunk=False).ratio() if got and want else 0.0
+    return {"token_f1": f1, "order_ratio": order}
+
+
+def load_fixtures(path: str = FIXTURES_DIR) -> List[Tuple[str, bytes, str]]:
+    """(name, pdf bytes, expected text) for every PDF with a same-named .txt beside it"""
+    fixtures = []
+    for name in sorted(os.listdir(path)):
+        stem, extension = os.path.splitext(name)
+        expected_path = os.path.join(path, stem + ".txt")
+        if extension.lower() != ".pdf" or not os.path.exists(expected_path):
+            continue
+        with open(os.path.join(path, name), "rb") as f:
+            data = f.read()
+        with open(expected_path, encoding="utf-8") as f:
+            expected = normalize_extracted_text(f.read())
+        fixtures.append((stem, data, expected))
+    return fixtures
+
+
+def _run(engine: str, data: bytes, max_pages: Optional[int]) -> Tuple[str, int]:
+    if engine == POLICY:
+        return extract_pdf(data, max_pages)
+    return extract_pdf_with(engine, data, max_pages)
+
+
+def benchmark(
+    fixtures: List[Tuple[str, bytes, str]],
+    engines: List[str],
+    repeat: int = 3,
+    max_pages: Optional[int] = None,
+) -> Dict[str, dict]:
+    """Pages per second and fidelity per engine; POLICY is the engine fallback chain used in production"""
+    results = {}
+    for engine in engines:
+        seconds, pages, errors, poor = 0.0, 0, 0, 0
+        documents = {}
+        for name, data, expected in fixtures:
+            try:
+                text, page_count = _run(engine, data, max_pages)
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    _run(engine, data, max_pages)
+                seconds += time.perf_counter() - start
+            except ImportError:
+                results[engine] = {"error": "not installed"}
+                break
+            except Exception as e:
+                errors += 1
+                documents[name] = {"error": str(e)}
+                continue
+            pages += page_count * repeat
+            poor += text_quality(text, page_count) < MIN_ALNUM_RATIO
+            documents[name] = {key: round(value, 4) for key, value in fidelity(text, expected).items()}
+        else:
+            scored = [doc for doc in documents.values() if "error" not in doc]
+            results[engine] = {
+                "pages_per_sec": round(pages / seconds, 1) if seconds else None,
+                "mean_token_f1": round(sum(doc["token_f1"] for doc in scored) / len(scored), 4) if scored else None,
+                "mean_order_ratio": round(sum(doc["order_ratio"] for doc in scored) / len(scored), 4) if scored else None,
+                "poor_outputs": poor,
+                "errors": errors,
+                "documents": documents,
+            }
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark PDF text engines on a fixture corpus of resumes")
+    parser.add_argument("fixtures", nargs="?", default=FIXTURES_DIR, help="directory of .pdf files with expected .txt text")
+    parser.add_argument("--engines", default=",".join([*PDF_ENGINES, POLICY]), help="comma separated engine names")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per document")
+    parser.add_argument("--max-pages", type=int, default=None, help="page limit (default: all pages)")
+    parser.add_argument("--out", default=None, help="write the full results as JSON")
+    args = parser.parse_args(argv)
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        raise SystemExit(f"No fixtures found in {args.fixtures}")
+    results = benchmark(fixtures, args.engines.split(","), args.repeat, args.max_pages)
+
+    print(f"{len(fixtures)} documents, {args.repeat} timed runs each")
+    print(f"{'engine':<12} {'pages/s':>9} {'token F1':>9} {'order':>7} {'poor':>5} {'errors':>6}")
+    for engine, result in results.items():
+        if "error" in result:
+            print(f"{engine:<12} {result['error']}")
+            continue
+        print(
+            f"{engine:<12} {result['pages_per_sec'] or 0:>9} {result['mean_token_f1'] or 0:>9} "
+            f"{result['mean_order_ratio'] or 0:>7} {result['poor_outputs']:>5} {result['errors']:>6}"
+        )
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
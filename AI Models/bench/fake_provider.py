@@ -0,0 +1,382 @@
+import argparse
+import asyncio
+import datetime
+import ipaddress
+import itertools
+import json
+import os
+import random
+import re
+import socket
+import tempfile
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+FAKE_HOST = "127.0.0.1"
+GEMINI_SERVICE = "google.ai.generativelanguage.v1beta.GenerativeService"
+
+_SCHEMA = re.compile(r"Here is the output schema:\s*```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL)
+_PACKED_RESUME = re.compile(r"^=== Resume (\d+) ===$", re.MULTILINE)
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[A-Za-z]{2,}")
+_WORDS = (
+    "focus on measurable impact and tailor each section to the role you are targeting while keeping "
+    "the language concise, highlight leadership, collaboration, technical depth and the results you delivered"
+).replace(",", "").split()
+_LONG_FIELDS = {"feedback", "experience", "summary", "message", "description"}
+
+
+@dataclass
+class FakeProviderConfig:
+    latency: float = 0.3  # seconds before the first token
+    jitter: float = 0.2  # latency varies uniformly by this fraction
+    tokens_per_second: float = 100.0  # output token rate; 0 returns the whole answer at once
+    completion_tokens: int = 150  # length of free-text answers, capped by the request's max tokens
+    failure_rate: float = 0.0  # share of calls answered with failure_status
+    failure_status: int = 503  # 503 (retryable server error) or 429 (rate limit)
+    seed: Optional[int] = None
+
+
+def count_tokens(text: str) -> int:
+    """Roughly four characters per token, as for English text with the OpenAI and Gemini tokenizers"""
+    return max(1, len(text) // 4)
+
+
+def free_text(tokens: int) -> str:
+    return " ".join(itertools.islice(itertools.cycle(_WORDS), tokens)).capitalize() + "."
+
+
+def sample_schema(schema: dict, defs: dict, documents: Dict[int, str], name: str = "", index: int = 0) -> Any:
+    """
+    A value valid against a JSON schema. Names and emails are copied from the
+    document the prompt is about, so checks that an answer belongs to its input pass.
+    """
+    if "$ref" in schema:
+        return sample_schema(defs[schema["$ref"].rsplit("/", 1)[-1]], defs, documents, name, index)
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [option for option in schema[key] if option.get("type") != "null"] or schema[key]
+            return sample_schema(options[0], defs, documents, name, index)
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type", "object" if "properties" in schema else "string")
+    if kind == "object":
+        return {
+            field: sample_schema(definition, defs, documents, field, index)
+            for field, definition in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        return [sample_schema(schema.get("items", {}), defs, documents, name, index) for _ in range(2)]
+    if kind == "integer":
+        return min(max(70, schema.get("minimum", 0)), schema.get("maximum", 100))
+    if kind == "number":
+        return float(schema.get("minimum", 0.5))
+    if kind == "boolean":
+        return True
+    document = documents.get(index) or documents.get(0, "")
+    if schema.get("format") == "email" or name == "email":
+        match = _EMAIL.search(document)
+        return match.group(0) if match else "candidate@example.com"
+    if name == "name":
+        lines = [line.strip() for line in document.split("\n") if line.strip()]
+        return lines[0] if lines and len(lines[0].split()) <= 4 else "Alex Morgan"
+    return free_text(40 if name in _LONG_FIELDS else 4)
+
+
+def sample_json(schema: dict, prompt: str) -> Any:
+    """Answer for a structured-output request; packed resume prompts get one entry per numbered resume"""
+    defs = schema.get("$defs", {})
+    parts = _PACKED_RESUME.split(prompt)
+    if len(parts) > 1:
+        documents = {int(number): text for number, text in zip(parts[1::2], parts[2::2])}
+        properties = schema.get("properties", {})
+        if "resumes" in properties:
+            item = properties["resumes"].get("items", {})
+            resumes = []
+            for number in sorted(documents):
+                resume = sample_schema(item, defs, documents, index=number)
+                resume["resume_number"] = number
+                resumes.append(resume)
+            return {"resumes": resumes}
+    return sample_schema(schema, defs, {0: prompt})
+
+
+def answer(prompt: str, schema: Optional[dict], max_tokens: Optional[int], config: FakeProviderConfig) -> str:
+    """The text of a completion: JSON for a schema, YES/NO for the chat screening gates, prose otherwise"""
+    if schema is not None:
+        return json.dumps(sample_json(schema, prompt))
+    if "Respond only" in prompt:
+        # The moderation gate answers YES for inappropriate messages, the relevance gate YES for career ones
+        return "NO" if "inappropriate" in prompt else "YES"
+    return free_text(min(config.completion_tokens, max_tokens or config.completion_tokens))
+
+
+class FakeProvider:
+    """
+    Local stand-in for the OpenAI chat completions API (HTTP, streaming included)
+    and Gemini's GenerateContent (gRPC over TLS, as the Google client requires).
+    Answers are valid for the schema a request asks for, and arrive after the
+    configured latency plus the output tokens at the configured token rate.
+    """
+
+    def __init__(self, config: FakeProviderConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.calls: Counter = Counter()
+        self.ids = itertools.count(1)
+
+    def _fails(self, provider: str) -> bool:
+        self.calls[provider] += 1
+        if self.random.random() < self.config.failure_rate:
+            self.calls[f"{provider}_failures"] += 1
+            return True
+        return False
+
+    def _first_token_delay(self) -> float:
+        jitter = self.config.latency * self.config.jitter
+        return max(0.0, self.config.latency + self.random.uniform(-jitter, jitter))
+
+    def _token_delay(self, tokens: int) -> float:
+        rate = self.config.tokens_per_second
+        return tokens / rate if rate > 0 else 0.0
+
+    # OpenAI
+
+    def openai_app(self):
+        from fastapi import FastAPI, Request
+        from fastapi.responses import JSONResponse, StreamingResponse
+
+        app = FastAPI()
+
+        @app.post("/v1/chat/completions")
+        async def chat_completions(request: Request):
+            body = await request.json()
+            if self._fails("openai"):
+                await asyncio.sleep(self._first_token_delay())
+                kind = "rate_limit_exceeded" if self.config.failure_status == 429 else "server_error"
+                return JSONResponse({"error": {"message": "Injected failure", "type": kind}}, status_code=self.config.failure_status)
+            if body.get("stream"):
+                return StreamingResponse(self._openai_stream(body), media_type="text/event-stream")
+            return JSONResponse(await self._openai_completion(body))
+
+        @app.get("/fake/stats")
+        async def stats():
+            return {"calls": dict(self.calls), "config": asdict(self.config)}
+
+        return app
+
+    def _openai_request(self, body: dict) -> Tuple[str, Optional[dict], Optional[str], int]:
+        prompt = "\n".join(
+            message["content"] if isinstance(message.get("content"), str) else json.dumps(message.get("content"))
+            for message in body.get("messages", [])
+        )
+        schema, tool = None, None
+        response_format = body.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            schema = response_format["json_schema"]["schema"]
+        elif body.get("tools"):
+            function = body["tools"][0]["function"]
+            schema, tool = function.get("parameters", {}), function["name"]
+        max_tokens = body.get("max_completion_tokens") or body.get("max_tokens")
+        return prompt, schema, tool, max_tokens
+
+    async def _openai_completion(self, body: dict) -> dict:
+        prompt, schema, tool, max_tokens = self._openai_request(body)
+        content = answer(prompt, schema, max_tokens, self.config)
+        completion_tokens = count_tokens(content)
+        await asyncio.sleep(self._first_token_delay() + self._token_delay(completion_tokens))
+        message: Dict[str, Any] = {"role": "assistant", "content": content}
+        if tool is not None:
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [{"id": f"call_{next(self.ids)}", "type": "function", "function": {"name": tool, "arguments": content}}],
+            }
+        prompt_tokens = count_tokens(prompt)
+        return {
+            "id": f"chatcmpl-fake-{next(self.ids)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool else "stop", "logprobs": None}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    async def _openai_stream(self, body: dict):
+        prompt, schema, _, max_tokens = self._openai_request(body)
+        content = answer(prompt, schema, max_tokens, self.config)
+        base = {"id": f"chatcmpl-fake-{next(self.ids)}", "object": "chat.completion.chunk", "created": int(time.time()), "model": body.get("model", "fake")}
+
+        def event(choices: list, **extra) -> str:
+            return f"data: {json.dumps({**base, 'choices': choices, **extra})}\n\n"
+
+        await asyncio.sleep(self._first_token_delay())
+        yield event([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+        words = content.split(" ")
+        for position, word in enumerate(words):
+            await asyncio.sleep(self._token_delay(1))
+            yield event([{"index": 0, "delta": {"content": word if position == 0 else " " + word}, "finish_reason": None}])
+        yield event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if (body.get("stream_options") or {}).get("include_usage"):
+            prompt_tokens, completion_tokens = count_tokens(prompt), count_tokens(content)
+            yield event([], usage={"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens})
+        yield "data: [DONE]\n\n"
+
+    # Gemini
+
+    async def generate_content(self, request, context):
+        import grpc
+        from google.ai import generativelanguage_v1beta as glm
+
+        if self._fails("gemini"):
+            await asyncio.sleep(self._first_token_delay())
+            code = grpc.StatusCode.RESOURCE_EXHAUSTED if self.config.failure_status == 429 else grpc.StatusCode.UNAVAILABLE
+            await context.abort(code, "Injected failure")
+        texts = [part.text for content in [request.system_instruction, *request.contents] for part in content.parts]
+        prompt = "\n".join(texts)
+        match = _SCHEMA.search(prompt)
+        schema = json.loads(match.group(1)) if match else None
+        content = answer(prompt, schema, request.generation_config.max_output_tokens or None, self.config)
+        if schema is not None:
+            content = f"```json\n{content}\n```"
+        completion_tokens = count_tokens(content)
+        await asyncio.sleep(self._first_token_delay() + self._token_delay(completion_tokens))
+        prompt_tokens = count_tokens(prompt)
+        return glm.GenerateContentResponse(
+            candidates=[glm.Candidate(content=glm.Content(parts=[glm.Part(text=content)], role="model"), finish_reason=1, index=0)],
+            usage_metadata=glm.GenerateContentResponse.UsageMetadata(
+                prompt_token_count=prompt_tokens,
+                candidates_token_count=completion_tokens,
+                total_token_count=prompt_tokens + completion_tokens,
+            ),
+        )
+
+    async def start_gemini(self, port: int, cert_dir: str):
+        """Serve GenerateContent over TLS with a throwaway self-signed certificate; returns (server, port, certificate path)"""
+        import grpc
+        from google.ai import generativelanguage_v1beta as glm
+
+        certificate, key = self_signed_certificate()
+        cert_path = os.path.join(cert_dir, "fake_provider.pem")
+        with open(cert_path, "wb") as f:
+            f.write(certificate)
+        server = grpc.aio.server()
+        server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler(GEMINI_SERVICE, {
+            "GenerateContent": grpc.unary_unary_rpc_method_handler(
+                self.generate_content,
+                request_deserializer=glm.GenerateContentRequest.deserialize,
+                response_serializer=glm.GenerateContentResponse.serialize,
+            ),
+        }),))
+        port = server.add_secure_port(f"{FAKE_HOST}:{port}", grpc.ssl_server_credentials([(key, certificate)]))
+        await server.start()
+        return server, port, cert_path
+
+
+def self_signed_certificate() -> Tuple[bytes, bytes]:
+    """(certificate, key) PEM for localhost, valid for a day"""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName("localhost"), x509.IPAddress(ipaddress.ip_address(FAKE_HOST))]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    return (
+        certificate.public_bytes(serialization.Encoding.PEM),
+        key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()),
+    )
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind((FAKE_HOST, 0))
+        return sock.getsockname()[1]
+
+
+def client_env(endpoints: dict) -> Dict[str, str]:
+    """Environment pointing the app's OpenAI and Gemini clients at a running fake provider"""
+    return {
+        "OPENAI_API_KEY": "fake",
+        "GENAI_API_KEY": "fake",
+        "OPENAI_BASE_URL": endpoints["openai_base_url"],
+        "GEMINI_API_ENDPOINT": endpoints["gemini_api_endpoint"],
+        "GRPC_DEFAULT_SSL_ROOTS_FILE_PATH": endpoints["ssl_roots"],
+    }
+
+
+async def serve(config: FakeProviderConfig, http_port: int = 0, grpc_port: int = 0, cert_dir: Optional[str] = None) -> None:
+    import uvicorn
+
+    provider = FakeProvider(config)
+    gemini, grpc_port, cert_path = await provider.start_gemini(grpc_port, cert_dir or tempfile.mkdtemp(prefix="fake_provider"))
+    http_port = http_port or free_port()
+    server = uvicorn.Server(uvicorn.Config(provider.openai_app(), host=FAKE_HOST, port=http_port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    # The first stdout line tells a parent process (the load benchmark) where to connect
+    print(json.dumps({
+        "openai_base_url": f"http://{FAKE_HOST}:{http_port}/v1",
+        "gemini_api_endpoint": f"localhost:{grpc_port}",
+        "ssl_roots": cert_path,
+        "stats_url": f"http://{FAKE_HOST}:{http_port}/fake/stats",
+    }), flush=True)
+    try:
+        await task
+    finally:
+        await gemini.stop(grace=None)
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = FakeProviderConfig()
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=defaults.jitter, help="latency varies by this fraction")
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second, help="output token rate, 0 for instant")
+    parser.add_argument("--completion-tokens", type=int, default=defaults.completion_tokens, help="length of free-text answers")
+    parser.add_argument("--failure-rate", type=float, default=defaults.failure_rate, help="share of calls that fail")
+    parser.add_argument("--failure-status", type=int, choices=[429, 503], default=defaults.failure_status)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeProviderConfig:
+    return FakeProviderConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        failure_rate=args.failure_rate,
+        failure_status=args.failure_status,
+        seed=args.seed,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Local fake OpenAI and Gemini server for offline benchmarks")
+    add_config_arguments(parser)
+    parser.add_argument("--http-port", type=int, default=0, help="OpenAI-compatible HTTP port (default: any free port)")
+    parser.add_argument("--grpc-port", type=int, default=0, help="Gemini gRPC port (default: any free port)")
+    parser.add_argument("--cert-dir", default=None, help="where to write the TLS certificate clients must trust")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(config_from_args(args), args.http_port, args.grpc_port, args.cert_dir))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
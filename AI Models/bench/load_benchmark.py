@@ -0,0 +1,427 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from bench.fake_provider import FAKE_HOST, add_config_arguments, client_env, free_port
+from services.text_extraction import extract_pdf_text
+
+FIXTURES_DIR = os.path.join("data", "resume_fixtures")
+DEFAULT_CONCURRENCY = (1, 4, 16, 32)
+READY_TIMEOUT_SECONDS = 180
+REQUEST_TIMEOUT_SECONDS = 120
+
+JOB_DESCRIPTIONS = (
+    "Backend engineer: Python, FastAPI, PostgreSQL, Redis, Docker, Kubernetes, AWS. Design REST APIs, "
+    "write tests, own services in production and mentor junior engineers.",
+    "Data scientist: Python, pandas, scikit-learn, SQL, experimentation, A/B testing, statistics and "
+    "communicating results to product teams. Experience with NLP is a plus.",
+)
+CHAT_QUESTIONS = (
+    "How should I prepare for a system design interview for a senior backend role?",
+    "What is the best way to negotiate salary for a new job offer?",
+    "How do I make my resume stand out for data science positions?",
+    "Should I mention a career gap on my resume and how?",
+)
+ROADMAP_DOMAINS = ("data engineering", "frontend development", "machine learning", "cloud security")
+
+
+class BenchClient:
+    """Issues workload requests against the app and records each one's latency and status"""
+
+    def __init__(self, client: httpx.AsyncClient, fixtures: List[Tuple[str, bytes, str]], unique: bool):
+        self.client = client
+        self.fixtures = fixtures
+        self.unique = unique
+        self.samples: List[Tuple[float, int]] = []
+
+    def vary(self, n: int) -> str:
+        """Suffix making request n's input distinct, so the caches miss as for real traffic"""
+        return f" {n}" if self.unique else ""
+
+    async def request(self, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, 0
+        self.samples.append((time.perf_counter() - start, status))
+        return response
+
+
+async def keyword_workload(bench: BenchClient, n: int) -> None:
+    _, _, text = bench.fixtures[n % len(bench.fixtures)]
+    params = {"jd_text": JOB_DESCRIPTIONS[n % len(JOB_DESCRIPTIONS)], "resume_text": text[:1500] + bench.vary(n)}
+    await bench.request("POST", "/refnet/keyword_analyzer", params=params)
+
+
+async def parser_workload(bench: BenchClient, n: int) -> None:
+    name, _, text = bench.fixtures[n % len(bench.fixtures)]
+    data = (text + "\n" + bench.vary(n)).encode("utf-8")
+    await bench.request("POST", "/refnet/parser", files={"file": (f"{name}.txt", data, "text/plain")})
+
+
+async def analyzer_workload(bench: BenchClient, n: int) -> None:
+    name, pdf, _ = bench.fixtures[n % len(bench.fixtures)]
+    # Bytes after %%EOF are ignored by PDF readers but change the content hash
+    data = pdf + f"\n%{bench.vary(n)}\n".encode("ascii") if bench.unique else pdf
+    await bench.request(
+        "POST",
+        "/refnet/resume_analyzer",
+        data={"job_description": JOB_DESCRIPTIONS[n % len(JOB_DESCRIPTIONS)]},
+        files={"resume_file": (f"{name}.pdf", data, "application/pdf")},
+    )
+
+
+async def chat_workload(bench: BenchClient, n: int, turns: int = 3) -> None:
+    """One conversation: a greeting, then career questions in the same session"""
+    session_id = f"bench-{os.getpid()}-{n}"
+    await bench.request("POST", "/refnet/chat", json={"message": "Hello", "session_id": session_id})
+    for turn in range(turns):
+        question = CHAT_QUESTIONS[(n + turn) % len(CHAT_QUESTIONS)]
+        await bench.request("POST", "/refnet/chat", json={"message": question + bench.vary(n), "session_id": session_id})
+
+
+async def roadmap_workload(bench: BenchClient, n: int) -> None:
+    domain = ROADMAP_DOMAINS[n % len(ROADMAP_DOMAINS)]
+    await bench.request("POST", "/refnet/roadmap_creator", params={"domain": domain + bench.vary(n)})
+
+
+WORKLOADS: Dict[str, Callable[[BenchClient, int], Awaitable[None]]] = {
+    "keyword": keyword_workload,
+    "parser": parser_workload,
+    "analyzer": analyzer_workload,
+    "chat": chat_workload,
+    "roadmap": roadmap_workload,
+}
+
+
+def load_fixtures(path: str = FIXTURES_DIR) -> List[Tuple[str, bytes, str]]:
+    """(name, pdf bytes, expected text) of the resume fixtures whose PDF has a text layer"""
+    fixtures = []
+    for name in sorted(os.listdir(path)):
+        stem, extension = os.path.splitext(name)
+        text_path = os.path.join(path, stem + ".txt")
+        if extension.lower() != ".pdf" or not os.path.exists(text_path):
+            continue
+        with open(text_path, encoding="utf-8") as f:
+            text = f.read()
+        with open(os.path.join(path, name), "rb") as f:
+            pdf = f.read()
+        # Image-only PDFs are rejected by the analyzer; they would only measure the error path
+        try:
+            if len(extract_pdf_text(pdf).strip()) < 200:
+                continue
+        except ValueError:
+            continue
+        fixtures.append((stem, pdf, text))
+    return fixtures
+
+
+def process_tree_rss(pid: int) -> Optional[float]:
+    """Resident memory in MB of a process and all its descendants (uvicorn workers, extraction workers)"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; the parent pid follows its closing parenthesis
+                parent = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    total, stack, found = 0, [pid], False
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+                        found = True
+        except OSError:
+            pass
+        stack.extend(children.get(current, []))
+    return round(total / 1024, 1) if found else None
+
+
+def summarize(samples: List[Tuple[float, int]], seconds: float) -> dict:
+    latencies = np.array([latency for latency, _ in samples]) * 1000
+    statuses = Counter(str(status) for _, status in samples)
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "statuses": dict(statuses),
+        "rps": round(len(samples) / seconds, 2) if seconds else None,
+        "p50_ms": round(float(p50), 1),
+        "p95_ms": round(float(p95), 1),
+        "p99_ms": round(float(p99), 1),
+        "max_ms": round(float(latencies.max()), 1) if len(latencies) else 0.0,
+        "seconds": round(seconds, 2),
+    }
+
+
+async def _provider_calls(stats_url: Optional[str]) -> Dict[str, int]:
+    if stats_url is None:
+        return {}
+    try:
+        async with httpx.AsyncClient() as client:
+            return (await client.get(stats_url)).json()["calls"]
+    except (httpx.HTTPError, ValueError, KeyError):
+        return {}
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    workload: str,
+    concurrency: int,
+    units: int,
+    fixtures: List[Tuple[str, bytes, str]],
+    unique: bool,
+    offset: int,
+    pid: Optional[int],
+    stats_url: Optional[str],
+) -> dict:
+    """Run `units` workload units with `concurrency` of them in flight at any time"""
+    bench = BenchClient(client, fixtures, unique)
+    numbers = iter(range(offset, offset + units))
+    peak_rss = process_tree_rss(pid) if pid else None
+    calls_before = await _provider_calls(stats_url)
+
+    async def user():
+        for n in numbers:
+            await WORKLOADS[workload](bench, n)
+
+    async def sample_rss():
+        nonlocal peak_rss
+        while True:
+            await asyncio.sleep(0.5)
+            rss = process_tree_rss(pid)
+            if rss is not None and (peak_rss is None or rss > peak_rss):
+                peak_rss = rss
+
+    sampler = asyncio.create_task(sample_rss()) if pid else None
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    seconds = time.perf_counter() - start
+    if sampler is not None:
+        sampler.cancel()
+
+    calls_after = await _provider_calls(stats_url)
+    result = {"concurrency": concurrency, **summarize(bench.samples, seconds), "rss_mb_peak": peak_rss}
+    if stats_url is not None:
+        result["provider_calls"] = {key: value - calls_before.get(key, 0) for key, value in calls_after.items()}
+    return result
+
+
+def _start_provider(args: argparse.Namespace, cert_dir: str) -> Tuple[subprocess.Popen, dict]:
+    command = [
+        sys.executable, "-m", "bench.fake_provider", "--cert-dir", cert_dir,
+        "--latency", str(args.latency), "--jitter", str(args.jitter),
+        "--tokens-per-second", str(args.tokens_per_second), "--completion-tokens", str(args.completion_tokens),
+        "--failure-rate", str(args.failure_rate), "--failure-status", str(args.failure_status),
+    ]
+    if args.seed is not None:
+        command += ["--seed", str(args.seed)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line:
+        raise SystemExit("The fake provider failed to start")
+    return process, json.loads(line)
+
+
+def _server_env(endpoints: dict, workdir: str) -> Dict[str, str]:
+    """The app's environment: the fake provider, and every cache and index in a throwaway directory"""
+    env = {key: value for key, value in os.environ.items() if not key.startswith(("LANGCHAIN_", "LANGSMITH_"))}
+    env.update(client_env(endpoints))
+    env.update({
+        "EXTRACTION_CACHE_DB": os.path.join(workdir, "extraction_cache.db"),
+        "ROADMAP_CACHE_DB": os.path.join(workdir, "roadmap_cache.db"),
+        "CHAT_SESSION_DB": os.path.join(workdir, "chat_sessions.db"),
+        "RESUME_INDEX_PATH": os.path.join(workdir, "resume_index.msgpack"),
+        "EMBEDDING_INDEX_DIR": os.path.join(workdir, "embedding_index"),
+        "RESUME_INDEX_LOCK": os.path.join(workdir, "resume_index.lock"),
+        "NO_PROXY": ",".join(filter(None, [os.environ.get("NO_PROXY"), FAKE_HOST, "localhost"])),
+    })
+    env.pop("KEYWORD_CACHE_DIR", None)
+    return env
+
+
+async def _wait_ready(url: str, process: Optional[subprocess.Popen]) -> float:
+    start = time.perf_counter()
+    async with httpx.AsyncClient(base_url=url) as client:
+        while time.perf_counter() - start < READY_TIMEOUT_SECONDS:
+            if process is not None and process.poll() is not None:
+                raise SystemExit(f"The app exited with code {process.returncode} before becoming ready")
+            try:
+                if (await client.get("/ready")).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise SystemExit(f"The app was not ready after {READY_TIMEOUT_SECONDS}s")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def benchmark(args: argparse.Namespace) -> dict:
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        raise SystemExit(f"No fixtures found in {args.fixtures}")
+    workdir = tempfile.mkdtemp(prefix="refnet_bench")
+    provider = server = None
+    try:
+        provider, endpoints = _start_provider(args, workdir)
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app:app", "--host", FAKE_HOST, "--port", str(port),
+             "--workers", str(args.workers), "--log-level", "warning"],
+            # The scenarios do not use the resume index, which refuses to start with several workers
+            env={
+                **_server_env(endpoints, workdir),
+                "WEB_CONCURRENCY": str(args.workers),
+                "RESUME_INDEX_ENABLED": "1" if args.workers == 1 else "0",
+            },
+        )
+        url = f"http://{FAKE_HOST}:{port}"
+        startup = await _wait_ready(url, server)
+        results = {
+            "commit": _git_commit(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "config": {
+                "workers": args.workers,
+                "units": args.units,
+                "concurrency": args.concurrency,
+                "unique_inputs": args.unique,
+                "provider": {key: getattr(args, key) for key in (
+                    "latency", "jitter", "tokens_per_second", "completion_tokens", "failure_rate", "failure_status", "seed"
+                )},
+            },
+            "startup_seconds": round(startup, 2),
+            "idle_rss_mb": process_tree_rss(server.pid),
+            "workloads": {},
+        }
+        print(f"app ready in {startup:.1f}s, {results['idle_rss_mb']} MB resident")
+        limits = httpx.Limits(max_connections=max(args.concurrency) * 2)
+        timeout = httpx.Timeout(REQUEST_TIMEOUT_SECONDS)
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+            offset = 0
+            for workload in args.workloads:
+                if args.warmup:
+                    await run_level(client, workload, 1, args.warmup, fixtures, args.unique, offset, None, None)
+                    offset += args.warmup
+                levels = []
+                for concurrency in args.concurrency:
+                    units = max(args.units, concurrency)
+                    level = await run_level(
+                        client, workload, concurrency, units, fixtures, args.unique, offset, server.pid, endpoints["stats_url"]
+                    )
+                    offset += units
+                    levels.append(level)
+                    print(
+                        f"{workload:<9} c={concurrency:<4} {level['rps']:>8} req/s  p50 {level['p50_ms']:>8} ms  "
+                        f"p95 {level['p95_ms']:>8} ms  p99 {level['p99_ms']:>8} ms  errors {level['errors']:>4}  "
+                        f"rss {level['rss_mb_peak']} MB"
+                    )
+                results["workloads"][workload] = levels
+        return results
+    finally:
+        for process in (server, provider):
+            if process is not None and process.poll() is None:
+                process.terminate()
+                try:
+                    process.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(base: dict, new: dict, threshold: float) -> List[str]:
+    """Lines describing p95 latency and throughput changes; regressions beyond threshold percent are marked"""
+    lines = []
+    for workload, levels in new["workloads"].items():
+        before = {level["concurrency"]: level for level in base.get("workloads", {}).get(workload, [])}
+        for level in levels:
+            old = before.get(level["concurrency"])
+            if old is None:
+                continue
+            p95 = (level["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0.0
+            rps = (level["rps"] - old["rps"]) / old["rps"] * 100 if old["rps"] else 0.0
+            regressed = p95 > threshold or rps < -threshold
+            lines.append(
+                f"{'REGRESSION ' if regressed else ''}{workload} c={level['concurrency']}: "
+                f"p95 {old['p95_ms']} -> {level['p95_ms']} ms ({p95:+.1f}%), "
+                f"rps {old['rps']} -> {level['rps']} ({rps:+.1f}%)"
+            )
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Offline load test of the API against a fake LLM provider")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="start the app and the fake provider, then run the workloads")
+    run.add_argument("--workloads", default=",".join(WORKLOADS), help="comma separated: " + ", ".join(WORKLOADS))
+    run.add_argument("--concurrency", default=",".join(map(str, DEFAULT_CONCURRENCY)), help="comma separated levels")
+    run.add_argument("--units", type=int, default=50, help="workload units per level (a chat unit is a 4-message conversation)")
+    run.add_argument("--warmup", type=int, default=3, help="untimed units per workload before the first level")
+    run.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    run.add_argument("--no-unique", dest="unique", action="store_false", help="repeat identical inputs (measures cache hits)")
+    run.add_argument("--fixtures", default=FIXTURES_DIR, help="directory of resume .pdf files with .txt text")
+    run.add_argument("--out", default=None, help="write the results as JSON")
+    add_config_arguments(run)
+
+    diff = commands.add_parser("compare", help="compare two result files")
+    diff.add_argument("base")
+    diff.add_argument("new")
+    diff.add_argument("--threshold", type=float, default=10.0, help="percent change counted as a regression")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+        with open(args.new, encoding="utf-8") as f:
+            new = json.load(f)
+        lines = compare(base, new, args.threshold)
+        print("\n".join(lines) if lines else "No workload and concurrency level in common")
+        if any(line.startswith("REGRESSION") for line in lines):
+            raise SystemExit(1)
+        return
+
+    args.workloads = [name for name in args.workloads.split(",") if name]
+    unknown = [name for name in args.workloads if name not in WORKLOADS]
+    if unknown:
+        parser.error(f"unknown workloads: {', '.join(unknown)}")
+    args.concurrency = [int(level) for level in args.concurrency.split(",")]
+    results = asyncio.run(benchmark(args))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,139 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
-from services.resume_parser_service import parse_resume
+import json
+import time
+from typing import List, Optional
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from services.resume_parser_service import (
+    PARSER_BATCH_MAX_FILES,
+    PARSER_MODES,
+    RESUME_PARSER_MODE,
+    batch_entries,
+    parse_resume,
+    parse_resumes_batch,
+)
+from services.text_extraction import MAX_REQUEST_BYTES, MAX_UPLOAD_BYTES, UploadRoute, UploadTooLarge, file_extension, read_upload
+from services.extraction_cache import extraction_cache
+from services.extraction_pool import EXTRACTION_RETRY_AFTER_SECONDS, ExtractionOverloaded, ExtractionTimeout
+from services.resume_index import index_resume, resume_index_text
+from services.embedding_index import embed_resume
+from services.index_owner import index_owner
+
+router = APIRouter(route_class=UploadRoute)
+
+def check_mode(mode: str) -> None:
+    if mode not in PARSER_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(PARSER_MODES)}")
+
+
+def check_index_enabled() -> None:
+    """Servers running several workers leave the resume index out; check before parsing"""
+    if not index_owner.enabled:
+        raise HTTPException(status_code=400, detail="The resume index is disabled on this server (RESUME_INDEX_ENABLED=0)")
 
-router = APIRouter()
 
 @router.post("/parser")
-async def resume_parser(file: UploadFile = File(...)):
+async def resume_parser(
+    file: UploadFile = File(...),
+    resume_id: Optional[str] = Form(None),
+    mode: str = Form(RESUME_PARSER_MODE)
+):
     """
     Extract structured resume details such as name, email, skills, projects, etc.
+    When resume_id is given, the parsed resume is also added to the resume search indexes.
+    mode is llm (the default), hybrid (rule-based fields first, Gemini for the rest) or offline
+    (rules only); hybrid and offline results carry a per-field "confidence" and the "parse_mode"
+    used, also sent as the X-Parse-Mode header. With RESUME_PARSER_OFFLINE_FALLBACK=1 a failed
+    Gemini call is answered from the rules with parse_mode "offline_fallback".
     """
     if not file.filename.lower().endswith((".pdf", ".txt")):
         raise HTTPException(status_code=400, detail="Only PDF or TXT files are supported.")
+    check_mode(mode)
+    if resume_id:
+        check_index_enabled()
 
     try:
-        result = await parse_resume(file)
-        return JSONResponse(content=result)
+        result = await parse_resume(file, mode)
+        if resume_id:
+            resume_text = resume_index_text(result)
+            index_resume(resume_id, resume_text)
+            embed_resume(resume_id, resume_text)
+        # Anything but a full answer (rules only, or the rules standing in for a failed Gemini call) is flagged
+        headers = {"X-Parse-Mode": result["parse_mode"]} if "parse_mode" in result else None
+        return JSONResponse(content=result, headers=headers)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ExtractionOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(EXTRACTION_RETRY_AFTER_SECONDS)})
+    except ExtractionTimeout as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error parsing resume: {e}")
+
+
+@router.post("/parser/batch")
+async def resume_parser_batch(
+    files: List[UploadFile] = File(...),
+    index: bool = Form(False),
+    mode: str = Form(RESUME_PARSER_MODE)
+):
+    """
+    Parse many resumes in one request: PDF/TXT files, zip archives of them, or both.
+    Responds with newline-delimited JSON as each file finishes:
+    {"type": "result", "file": ..., "resume_id": ..., "cached": ..., "resume": {...}} or
+    {"type": "error", "file": ..., "error": ...}, then a final
+    {"type": "done", "total": ..., "succeeded": ..., "failed": ..., "seconds": ...}.
+    With index=true every parsed resume is added to the search indexes under its resume_id,
+    the file name followed by "#" and the first 12 hex digits of its SHA-256.
+    mode works as for /parser.
+    """
+    check_mode(mode)
+    if index:
+        check_index_enabled()
+    started = time.perf_counter()
+    entries, rejected = [], []
+    for file in files:
+        try:
+            max_bytes = MAX_REQUEST_BYTES if file_extension(file.filename) == ".zip" else MAX_UPLOAD_BYTES
+            entries.extend(batch_entries(file.filename, await read_upload(file, max_bytes)))
+        except ValueError as e:
+            rejected.append({"type": "error", "file": file.filename, "error": str(e)})
+    if len(entries) > PARSER_BATCH_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"Too many files. Please send at most {PARSER_BATCH_MAX_FILES} resumes per batch.")
+
+    def event(data: dict) -> str:
+        return json.dumps(data) + "\n"
+
+    async def events():
+        succeeded = 0
+        for error in rejected:
+            yield event(error)
+        async for result in parse_resumes_batch(entries, mode=mode):
+            if result["type"] == "result":
+                succeeded += 1
+                if index:
+                    resume_text = resume_index_text(result["resume"])
+                    index_resume(result["resume_id"], resume_text)
+                    embed_resume(result["resume_id"], resume_text)
+            yield event(result)
+        total = len(entries) + len(rejected)
+        yield event({
+            "type": "done",
+            "total": total,
+            "succeeded": succeeded,
+            "failed": total - succeeded,
+            "seconds": round(time.perf_counter() - started, 3)
+        })
+
+    return StreamingResponse(
+        events(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/parser/cache/stats")
+async def resume_parser_cache_stats():
+    """
+    Hit/miss counters and size of the uploaded document cache shared by the parser and analyzer
+    """
+    return extraction_cache.stats()
@@ -1,10 +1,26 @@
 from fastapi import APIRouter,HTTPException,UploadFile,Form
 from fastapi.responses import JSONResponse
-from sklearn.metrics.pairwise import cosine_similarity
 from services.resume_analyser_service import *
+from services.embedding_index import shortlist_candidates
+from services.text_extraction import UploadRoute
+from pydantic import BaseModel, Field
+from typing import List
+import asyncio
 import json
 
-router = APIRouter()
+router = APIRouter(route_class=UploadRoute)
+
+
+class ShortlistCandidate(BaseModel):
+    id: str
+    text: str
+
+
+class ShortlistRequest(BaseModel):
+    job_description: str = Field(..., max_length=5000)
+    candidates: List[ShortlistCandidate] = Field(..., min_length=1, max_length=2000)
+    shortlist_size: int = Field(20, ge=1)
+    evaluate_top: int = Field(5, ge=0, le=20)
 
 @router.post("/resume_analyzer")
 async def analyze_resume(
@@ -28,7 +44,7 @@ async def analyze_resume(
     
     try:
         
-        resume_text = extract_resume_text(resume_file)
+        resume_text = await extract_resume_text(resume_file)
         
         
         max_resume_length = 3000
@@ -41,7 +57,7 @@ async def analyze_resume(
             job_description = job_description[:max_jd_length] + "..."
         
        
-        result = workflow.invoke({
+        result = await get_workflow().ainvoke({
             "job_description": job_description.strip(), 
             "resume": resume_text
         })
@@ -52,6 +68,12 @@ async def analyze_resume(
             "status": "success"
         })
         
+    except ExtractionOverloaded as e:
+        return JSONResponse(
+            content={"error": str(e)},
+            status_code=503,
+            headers={"Retry-After": str(EXTRACTION_RETRY_AFTER_SECONDS)}
+        )
     except ValueError as ve:
         return JSONResponse(
             content={"error": str(ve)}, 
@@ -64,3 +86,45 @@ async def analyze_resume(
         )
 
 
+@router.post("/resume_analyzer/shortlist")
+async def shortlist_resumes(request: ShortlistRequest):
+    """
+    Rank a candidate pool by embedding similarity and only run the LLM evaluation on the best matches
+    """
+    if not request.job_description.strip():
+        return JSONResponse(
+            content={"error": "Job description is required"},
+            status_code=400
+        )
+
+    try:
+        texts = [candidate.text for candidate in request.candidates]
+        shortlist = shortlist_candidates(request.job_description, texts, request.shortlist_size)
+
+        max_resume_length = 3000
+        max_jd_length = 2000
+        job_description = request.job_description.strip()[:max_jd_length]
+
+        evaluations = await asyncio.gather(*[
+            get_workflow().ainvoke({
+                "job_description": job_description,
+                "resume": texts[i][:max_resume_length]
+            })
+            for i, _ in shortlist[:request.evaluate_top]
+        ])
+
+        results = []
+        for rank, (i, similarity) in enumerate(shortlist, start=1):
+            candidate = {"id": request.candidates[i].id, "rank": rank, "similarity": round(similarity, 4)}
+            if rank <= len(evaluations):
+                candidate["score"] = evaluations[rank - 1]["score"]
+                candidate["feedback"] = evaluations[rank - 1]["feedback"]
+            results.append(candidate)
+
+        return JSONResponse(content={"total": len(texts), "results": results, "status": "success"})
+
+    except Exception as e:
+        return JSONResponse(
+            content={"error": f"Processing error: {str(e)}"},
+            status_code=500
+        )
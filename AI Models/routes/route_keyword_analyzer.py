@@ -12,13 +12,11 @@ async def keyword_analyzer(jd_text,resume_text):
     Analyze the keywords in Job Description and Resume and gives matching score
     """
     try:
-        result = pipeline.fit_transform([resume_text,jd_text])
+        (resume_tokens, jd_tokens), result = analyze_documents([resume_text, jd_text])
         similarity_score = cosine_similarity(result[0:1], result[1:2])[0][0]
         score_percent = round(similarity_score * 100, 2)
-        preprocessor = SpacyPreprocessor()
-        processed_texts = preprocessor.transform([jd_text, resume_text])
-        jd_keywords = set(processed_texts[0].split())
-        resume_keywords = set(processed_texts[1].split())
+        jd_keywords = set(jd_tokens)
+        resume_keywords = set(resume_tokens)
 
         matching_keywords = sorted(list(jd_keywords.intersection(resume_keywords)))
         missing_keywords = sorted(list(jd_keywords.difference(resume_keywords)))
@@ -32,3 +30,32 @@ async def keyword_analyzer(jd_text,resume_text):
         return JSONResponse(content=json_output)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error while analyzing : {e}")
+
+
+@router.post("/keyword_analyzer/batch")
+async def keyword_analyzer_batch(request: BatchKeywordRequest):
+    """
+    Score one Job Description against many resumes and return candidates ranked by match score
+    """
+    try:
+        scores = score_resumes(request.jd_text, [resume.text for resume in request.resumes])
+        ranked = sorted(
+            ({"id": resume.id, **score} for resume, score in zip(request.resumes, scores)),
+            key=lambda candidate: candidate["Resume Match Score"],
+            reverse=True,
+        )
+        if request.top_k:
+            ranked = ranked[:request.top_k]
+        for rank, candidate in enumerate(ranked, start=1):
+            candidate["rank"] = rank
+        return JSONResponse(content={"total": len(scores), "results": ranked})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error while analyzing batch : {e}")
+
+
+@router.get("/keyword_analyzer/cache/stats")
+async def keyword_analyzer_cache_stats():
+    """
+    Hit/miss counters and size of the preprocessed document cache
+    """
+    return document_cache.stats()
@@ -0,0 +1,99 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from services.metrics import metrics
+from services.components import components
+from services.extraction_cache import extraction_cache
+from services.extraction_pool import extraction_pool
+from services.keywordana import document_cache
+from services.chatbot_service import response_cache, session_store
+from services.roadmap import roadmap_cache
+from services.llm_gateway import single_flight_stats
+from services.resume_parser_service import packing_stats
+
+router = APIRouter()
+
+
+@metrics.collector
+def cache_metrics():
+    """Lookups and hit ratio of every cache, from the counters each one keeps"""
+    extraction = extraction_cache.stats()
+    documents = document_cache.stats()
+    responses = response_cache.stats()
+    roadmaps = roadmap_cache.stats()
+    lookups = {
+        ("extraction_text", "hit"): extraction["text_hits"],
+        ("extraction_text", "miss"): extraction["text_misses"],
+        ("extraction_parsed", "hit"): extraction["parsed_hits"],
+        ("extraction_parsed", "miss"): extraction["parsed_misses"],
+        ("keyword_documents", "hit"): documents["memory_hits"],
+        ("keyword_documents", "disk_hit"): documents["disk_hits"],
+        ("keyword_documents", "miss"): documents["misses"],
+        ("chat_responses", "hit"): responses["exact_hits"],
+        ("chat_responses", "semantic_hit"): responses["semantic_hits"],
+        ("chat_responses", "miss"): responses["misses"],
+        ("roadmaps", "hit"): roadmaps["fresh_hits"],
+        ("roadmaps", "stale_hit"): roadmaps["stale_hits"],
+        ("roadmaps", "miss"): roadmaps["misses"],
+        ("llm_single_flight", "miss"): single_flight_stats["calls"],
+        ("llm_single_flight", "hit"): single_flight_stats["coalesced"],
+    }
+    yield "refnet_cache_lookups_total", "counter", "Cache lookups by cache and result", [
+        ({"cache": cache, "result": result}, value) for (cache, result), value in lookups.items()
+    ]
+    ratios = {
+        "extraction_text": extraction["text_hit_ratio"],
+        "extraction_parsed": extraction["parsed_hit_ratio"],
+        "keyword_documents": documents["hit_ratio"],
+        "chat_responses": responses["hit_ratio"],
+        "roadmaps": roadmaps["hit_ratio"],
+    }
+    yield "refnet_cache_hit_ratio", "gauge", "Share of lookups answered from the cache since startup", [
+        ({"cache": cache}, ratio) for cache, ratio in ratios.items()
+    ]
+    yield "refnet_cache_entries", "gauge", "Entries held by each cache", [
+        ({"cache": "extraction"}, extraction["entries"]),
+        ({"cache": "keyword_documents"}, documents["entries"]),
+        ({"cache": "chat_responses"}, responses["entries"]),
+        ({"cache": "roadmaps"}, roadmaps["domains"]),
+    ]
+    yield "refnet_cache_evictions_total", "counter", "Entries evicted to stay within each cache's budget", [
+        ({"cache": "extraction"}, extraction["evictions"]),
+        ({"cache": "keyword_documents"}, documents["evictions"]),
+        ({"cache": "chat_responses"}, responses["evictions"]),
+    ]
+
+
+@metrics.collector
+def queue_metrics():
+    """Depth and outcomes of the document extraction pool and the resume packer"""
+    pool = extraction_pool.stats()
+    yield "refnet_extraction_workers", "gauge", "Document extraction worker processes", [({}, pool["workers"])]
+    yield "refnet_extraction_busy", "gauge", "Extraction workers running a job", [({}, pool["busy"])]
+    yield "refnet_extraction_queued", "gauge", "Uploads waiting for an extraction worker", [({}, pool["queued"])]
+    yield "refnet_extraction_jobs_total", "counter", "Extraction jobs by outcome", [
+        ({"outcome": outcome}, pool[outcome]) for outcome in ("completed", "failed", "rejected", "timeouts", "crashes")
+    ]
+    yield "refnet_parser_packed_calls_total", "counter", "Gemini calls carrying several resumes", [({}, packing_stats["packed_calls"])]
+    yield "refnet_parser_packed_resumes_total", "counter", "Resumes parsed in packed calls", [({}, packing_stats["packed_resumes"])]
+    yield "refnet_parser_pack_fallbacks_total", "counter", "Resumes re-parsed alone after a packed call", [({}, packing_stats["fallbacks"])]
+
+
+@metrics.collector
+def process_metrics():
+    """Component load times and chat session counts"""
+    status = components.status()["components"]
+    yield "refnet_component_loaded", "gauge", "1 once a lazily created component is loaded", [
+        ({"component": name}, int(state["loaded"])) for name, state in status.items()
+    ]
+    yield "refnet_component_load_seconds", "gauge", "Time taken to create each component", [
+        ({"component": name}, state["seconds"]) for name, state in status.items() if state["seconds"] is not None
+    ]
+    sessions = session_store.stats()
+    yield "refnet_chat_sessions", "gauge", "Live chat sessions", [({}, sessions["total_sessions"])]
+    yield "refnet_chat_messages", "gauge", "Messages held across live chat sessions", [({}, sessions["total_messages"])]
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Request and stage latency, LLM tokens and cost, cache and queue metrics in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,92 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+from services.resume_index import resume_index, index_resume, search_resumes
+from services.embedding_index import embedding_index, embed_resume, semantic_search
+
+router = APIRouter()
+
+
+class IndexResumeRequest(BaseModel):
+    text: str
+
+
+class ResumeSearchRequest(BaseModel):
+    jd_text: str
+    top_k: int = Field(10, ge=1, le=1000)
+
+
+@router.put("/resume_index/{resume_id}")
+async def add_resume(resume_id: str, request: IndexResumeRequest):
+    """
+    Add a resume to the search index, replacing any previous version with the same id
+    """
+    if not request.text.strip():
+        raise HTTPException(status_code=400, detail="Resume text is required")
+    index_resume(resume_id, request.text)
+    embed_resume(resume_id, request.text)
+    return {"success": True, "resume_id": resume_id, "documents": len(resume_index)}
+
+
+@router.delete("/resume_index/{resume_id}")
+async def remove_resume(resume_id: str):
+    """
+    Remove a resume from the search index
+    """
+    removed = resume_index.remove(resume_id)
+    removed = embedding_index.remove(resume_id) or removed
+    if removed:
+        return {"success": True, "message": "Resume removed from index"}
+    return {"success": False, "message": "Resume not found"}
+
+
+@router.post("/resume_index/search")
+async def search_index(request: ResumeSearchRequest):
+    """
+    Top-K indexed resumes for a Job Description
+    """
+    try:
+        results = search_resumes(request.jd_text, request.top_k)
+        return JSONResponse(content={
+            "results": [
+                {"resume_id": resume_id, "score": round(score, 4), "rank": rank}
+                for rank, (resume_id, score) in enumerate(results, start=1)
+            ]
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error while searching resumes : {e}")
+
+
+@router.post("/resume_index/semantic_search")
+async def semantic_search_index(request: ResumeSearchRequest):
+    """
+    Approximate nearest-neighbour search over resume embeddings, for synonym-aware shortlisting
+    """
+    try:
+        results = semantic_search(request.jd_text, request.top_k)
+        return JSONResponse(content={
+            "results": [
+                {"resume_id": resume_id, "similarity": round(score, 4), "rank": rank}
+                for rank, (resume_id, score) in enumerate(results, start=1)
+            ]
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error while searching resumes : {e}")
+
+
+@router.post("/resume_index/snapshot")
+async def snapshot_index():
+    """
+    Save the resume index to disk
+    """
+    try:
+        resume_index.snapshot()
+        embedding_index.snapshot()
+        return {"success": True, **resume_index.stats(), "embeddings": len(embedding_index)}
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Error while saving resume index : {e}")
+
+
+@router.get("/resume_index/stats")
+async def index_stats():
+    return {**resume_index.stats(), "embeddings": len(embedding_index)}
@@ -1,18 +1,66 @@
-from fastapi import APIRouter,HTTPException
+from fastapi import APIRouter,HTTPException,Header,Query
 from fastapi.responses import JSONResponse
-from services.roadmap import chain
+from services.roadmap import create_roadmap, roadmap_cache
+from services.roadmap_cache import MAX_DOMAIN_LENGTH
+from pydantic import BaseModel, Field
+from typing import List, Optional
 import pydantic
+import hmac
 import json
+import os
+
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY") or None
+MAX_WARM_DOMAINS = 50
 
 router = APIRouter()
 
 @router.post("/roadmap_creator")
-async def roadmap_creator(domain:str):
+async def roadmap_creator(domain: str = Query(..., min_length=1, max_length=MAX_DOMAIN_LENGTH)):
     """
     Analyze the keywords in Job Description and Resume and gives matching score
     """
     try:
-        result = chain.invoke({"domain":domain})
+        result = await create_roadmap(domain)
         return JSONResponse(content=result.model_dump())
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error while creating roadmap : {e}")
+
+
+class WarmRequest(BaseModel):
+    domains: List[str] = Field([], max_length=MAX_WARM_DOMAINS)
+    popular: int = Field(0, ge=0, le=MAX_WARM_DOMAINS)
+    force: bool = False
+
+
+def require_admin(x_admin_key: Optional[str]) -> None:
+    """Admin endpoints are closed unless ADMIN_API_KEY is set and sent as X-Admin-Key"""
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled, set ADMIN_API_KEY")
+    if not x_admin_key or not hmac.compare_digest(x_admin_key.encode(), ADMIN_API_KEY.encode()):
+        raise HTTPException(status_code=403, detail="Admin key required")
+
+
+@router.post("/roadmap_creator/warm")
+async def warm_roadmaps(request: WarmRequest, x_admin_key: Optional[str] = Header(None)):
+    """
+    Pre-generate roadmaps for the given domains and/or the `popular` most requested
+    ones. Fresh entries are skipped unless `force` is set.
+    """
+    require_admin(x_admin_key)
+    domains = list(request.domains)
+    if request.popular:
+        domains += roadmap_cache.popular_domains(request.popular)
+    if not domains:
+        raise HTTPException(status_code=400, detail="No domains to warm")
+    try:
+        results = await roadmap_cache.warm(domains[:MAX_WARM_DOMAINS], force=request.force)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    return JSONResponse(content={"results": results})
+
+
+@router.get("/roadmap_creator/cache/stats")
+async def roadmap_cache_stats():
+    return JSONResponse(content=roadmap_cache.stats())
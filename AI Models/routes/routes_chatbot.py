@@ -1,17 +1,32 @@
-from fastapi import APIRouter,HTTPException
-from fastapi.responses import JSONResponse
-from services.roadmap import chain
+from fastapi import APIRouter,HTTPException,Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from services.chatbot_service import *
 
 router = APIRouter()
 
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat(msg: Message):
-    user_message = msg.message.strip()
-    session_id = msg.session_id
-    timestamp = time.time()
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that closes a career stream however the response ends: finished,
+    failed, or the client gone before the body generator started (its finally never runs)
+    """
+
+    def __init__(self, content, stream: CareerStream, **kwargs):
+        super().__init__(content, **kwargs)
+        self.stream = stream
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.stream.aclose()
 
+
+TECHNICAL_DIFFICULTIES = "I'm experiencing technical difficulties. Please try again in a moment, and I'll be happy to help with your career questions."
+
+
+def quick_response(user_message: str, session_id: str, timestamp: float) -> Optional[ChatResponse]:
+    """Answer empty messages, greetings and small talk without calling the provider"""
     if not user_message:
         return ChatResponse(
             success=False,
@@ -21,13 +36,11 @@ async def chat(msg: Message):
             timestamp=timestamp
         )
 
-    if session_id not in conversations:
-        conversations[session_id] = []
-
-
-    if check_pattern(user_message, QUICK_PATTERNS['greeting']) and len(conversations[session_id]) == 0:
-        conversations[session_id].append({"role": "user", "content": user_message})
-        conversations[session_id].append({"role": "assistant", "content": GREETING_RESPONSE["message"]})
+    if check_pattern(user_message, QUICK_PATTERNS['greeting']) and not session_store.get(session_id):
+        session_store.set(session_id, [
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": GREETING_RESPONSE["message"]}
+        ])
         
         return ChatResponse(
             success=True,
@@ -58,54 +71,54 @@ async def chat(msg: Message):
             timestamp=timestamp
         )
 
-    if not is_career_related_fast(user_message):
-        
-        try:
-            ai_check = client.chat.completions.create(
-                model=MODERATION_MODEL,
-                messages=[
-                    {"role": "system", "content": "Is this message related to careers, jobs, or professional development? Respond only 'YES' or 'NO'."},
-                    {"role": "user", "content": user_message}
-                ],
-                max_tokens=5,
-                temperature=0
-            )
-            if ai_check.choices[0].message.content.strip().upper() != "YES":
-                return ChatResponse(
-                    success=False,
-                    message="I specialize in career coaching and professional development. Could you rephrase your question to focus on your career goals, job search, or professional growth?",
-                    response_type="off_topic",
-                    session_id=session_id,
-                    timestamp=timestamp,
-                    suggestions=[
-                        "How to improve my resume?",
-                        "Interview preparation tips",
-                        "Career transition advice"
-                    ]
-                )
-        except:
-            pass  
-
-    
-    if moderate_content_ai(user_message):
+    return None
+
+
+def rejection_response(rejection: str, session_id: str, timestamp: float) -> ChatResponse:
+    """Reply for a message that failed the relevance or moderation gate"""
+    if rejection == "off_topic":
         return ChatResponse(
             success=False,
-            message="I maintain a professional environment focused on career development. Please keep our conversation appropriate and career-related.",
-            response_type="moderation",
+            message="I specialize in career coaching and professional development. Could you rephrase your question to focus on your career goals, job search, or professional growth?",
+            response_type="off_topic",
             session_id=session_id,
-            timestamp=timestamp
+            timestamp=timestamp,
+            suggestions=[
+                "How to improve my resume?",
+                "Interview preparation tips",
+                "Career transition advice"
+            ]
         )
+    return ChatResponse(
+        success=False,
+        message="I maintain a professional environment focused on career development. Please keep our conversation appropriate and career-related.",
+        response_type="moderation",
+        session_id=session_id,
+        timestamp=timestamp
+    )
 
-    
-    conversations[session_id].append({"role": "user", "content": user_message})
 
-    if len(conversations[session_id]) > MAX_CONVERSATION_HISTORY:
-        conversations[session_id] = conversations[session_id][-MAX_CONVERSATION_HISTORY:]
+@router.post("/chat", response_model=ChatResponse)
+async def chat(msg: Message):
+    user_message = msg.message.strip()
+    session_id = msg.session_id
+    timestamp = time.time()
+
+    early_response = quick_response(user_message, session_id, timestamp)
+    if early_response is not None:
+        return early_response
+
+    user_entry = {"role": "user", "content": user_message}
 
     try:
-        bot_response = generate_career_response(conversations[session_id])
-        
-        conversations[session_id].append({"role": "assistant", "content": bot_response})
+        rejection, bot_response = await screen_concurrently(
+            user_message,
+            answer_career_question(history_with(session_id, user_entry))
+        )
+        if rejection is not None:
+            return rejection_response(rejection, session_id, timestamp)
+
+        append_message(session_id, user_entry, {"role": "assistant", "content": bot_response})
         
         suggestions = get_career_suggestions(user_message)
         
@@ -121,12 +134,116 @@ async def chat(msg: Message):
     except Exception as e:
         return ChatResponse(
             success=False,
-            message="I'm experiencing technical difficulties. Please try again in a moment, and I'll be happy to help with your career questions.",
+            message=TECHNICAL_DIFFICULTIES,
             response_type="error",
             session_id=session_id,
             timestamp=timestamp
         )
 
+@router.post("/chat/stream")
+async def chat_stream(msg: Message):
+    """
+    Streaming variant of /chat. Responds with newline-delimited JSON events:
+    {"type": "token", "content": ...} for each chunk of advice as it arrives,
+    then a final {"type": "done", ...} event carrying the full ChatResponse.
+    """
+    user_message = msg.message.strip()
+    session_id = msg.session_id
+    timestamp = time.time()
+
+    def event(data: dict) -> str:
+        return json.dumps(data) + "\n"
+
+    def single_event(response: ChatResponse) -> StreamingResponse:
+        return StreamingResponse(
+            iter([event({"type": "done", **response.model_dump()})]),
+            media_type="application/x-ndjson"
+        )
+
+    early_response = quick_response(user_message, session_id, timestamp)
+    if early_response is not None:
+        return single_event(early_response)
+
+    user_entry = {"role": "user", "content": user_message}
+    history = history_with(session_id, user_entry)
+    cached = cached_career_response(history)
+    try:
+        rejection, stream = await screen_concurrently(
+            user_message,
+            open_career_stream(history) if cached is None else None,
+            discard=lambda stream: stream.aclose()
+        )
+    except Exception:
+        return single_event(ChatResponse(
+            success=False,
+            message=TECHNICAL_DIFFICULTIES,
+            response_type="error",
+            session_id=session_id,
+            timestamp=timestamp
+        ))
+    if rejection is not None:
+        return single_event(rejection_response(rejection, session_id, timestamp))
+
+    if cached is not None:
+        append_message(session_id, user_entry, {"role": "assistant", "content": cached})
+        return StreamingResponse(
+            iter([
+                event({"type": "token", "content": cached}),
+                event({"type": "done", **ChatResponse(
+                    success=True,
+                    message=cached,
+                    response_type="advice",
+                    session_id=session_id,
+                    timestamp=timestamp,
+                    suggestions=get_career_suggestions(user_message)
+                ).model_dump()})
+            ]),
+            media_type="application/x-ndjson"
+        )
+
+    try:
+        append_message(session_id, user_entry)
+    except BaseException:
+        await stream.aclose()
+        raise
+
+    async def events():
+        parts = []
+        try:
+            async for token in stream:
+                parts.append(token)
+                yield event({"type": "token", "content": token})
+        except Exception:
+            yield event({"type": "done", **ChatResponse(
+                success=False,
+                message=TECHNICAL_DIFFICULTIES,
+                response_type="error",
+                session_id=session_id,
+                timestamp=timestamp
+            ).model_dump()})
+            return
+        finally:
+            await stream.aclose()
+
+        bot_response = "".join(parts).strip()
+        append_message(session_id, {"role": "assistant", "content": bot_response})
+        remember_career_response(history, bot_response)
+        yield event({"type": "done", **ChatResponse(
+            success=True,
+            message=bot_response,
+            response_type="advice",
+            session_id=session_id,
+            timestamp=timestamp,
+            suggestions=get_career_suggestions(user_message)
+        ).model_dump()})
+
+    return ClosingStreamingResponse(
+        events(),
+        stream,
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/")
 async def root():
     return {
@@ -142,31 +259,31 @@ async def root():
 @router.delete("/chat/{session_id}")
 async def clear_conversation(session_id: str):
     """Clear conversation history for a session"""
-    if session_id in conversations:
-        del conversations[session_id]
+    if session_store.delete(session_id):
         return {"success": True, "message": "Conversation history cleared"}
     return {"success": False, "message": "Session not found"}
 
 @router.get("/chat/{session_id}/history")
 async def get_conversation_history(session_id: str):
     """Get conversation history for a session"""
-    if session_id in conversations:
+    history = session_store.get(session_id)
+    if history is not None:
         return {
             "success": True,
             "session_id": session_id,
-            "history": conversations[session_id],
-            "message_count": len(conversations[session_id])
+            "history": history,
+            "message_count": len(history)
         }
     return {"success": False, "message": "Session not found"}
 
 @router.get("/stats")
-async def get_stats():
-    """Get API usage statistics"""
-    total_sessions = len(conversations)
-    total_messages = sum(len(history) for history in conversations.values())
-    
+async def get_stats(limit: int = Query(100, ge=0, le=10000)):
+    """Get API usage statistics; active_sessions lists the `limit` most recently active ids"""
+    stats = session_store.stats()
     return {
-        "total_sessions": total_sessions,
-        "total_messages": total_messages,
-        "active_sessions": [sid for sid, history in conversations.items() if len(history) > 0]
-    }
\ No newline at end of file
+        "total_sessions": stats["total_sessions"],
+        "total_messages": stats["total_messages"],
+        "active_sessions": session_store.session_ids(limit),
+        "session_store": stats,
+        "response_cache": response_cache.stats()
+    }
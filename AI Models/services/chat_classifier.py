@@ -0,0 +1,199 @@
+import argparse
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold, cross_val_predict
+from sklearn.preprocessing import normalize
+
+from services.components import component
+
+CHAT_CLASSIFIER_PATH = os.getenv("CHAT_CLASSIFIER_PATH", os.path.join("artifacts", "chat_classifier.joblib"))
+CHAT_CLASSIFIER_DATA = os.path.join("data", "chat_screening.jsonl")
+LABELS = ("career", "inappropriate")
+HASH_FEATURES = 2 ** 16
+ARTIFACT_VERSION = 2
+
+# Held-out precision a confident verdict must reach; the uncertainty bands are set from it at training time
+CHAT_CLASSIFIER_PRECISION = float(os.getenv("CHAT_CLASSIFIER_PRECISION", 0.98))
+
+
+_word_ngrams = HashingVectorizer(analyzer="word", ngram_range=(1, 2), token_pattern=r"(?u)\b\w+\b").build_analyzer()
+_char_ngrams = HashingVectorizer(analyzer="char_wb", ngram_range=(2, 4)).build_analyzer()
+_hasher = FeatureHasher(n_features=HASH_FEATURES, input_type="string", alternate_sign=False)
+
+
+def _ngrams(text: str) -> List[str]:
+    return _word_ngrams(text) + _char_ngrams(text)
+
+
+def hash_features(texts: List[str]) -> sparse.csr_matrix:
+    """L2-normalized hashed word 1-2 grams and character 2-4 grams. Stateless, so only the weights are fitted."""
+    return normalize(_hasher.transform(_ngrams(text) for text in texts))
+
+
+def build_classifier() -> LogisticRegression:
+    return LogisticRegression(C=10.0, class_weight="balanced", max_iter=1000)
+
+
+class ChatClassifier:
+    """
+    One logistic regression per label over a shared hashed feature space. Only the
+    weights are kept, so scoring a message is a sparse gather and a sigmoid.
+    Probabilities inside a label's (low, high) band are too uncertain to act on.
+    """
+
+    def __init__(self, labels: List[str], weights: np.ndarray, bias: np.ndarray, bands: Dict[str, Tuple[float, float]]):
+        self.labels = list(labels)
+        self.weights = weights  # (HASH_FEATURES, len(labels))
+        self.bias = bias
+        self.bands = bands
+
+    @classmethod
+    def from_models(cls, models: Dict[str, LogisticRegression], bands: Dict[str, Tuple[float, float]]) -> "ChatClassifier":
+        weights = np.stack([model.coef_[0] for model in models.values()], axis=1).astype(np.float32)
+        bias = np.array([model.intercept_[0] for model in models.values()], dtype=np.float32)
+        return cls(list(models), weights, bias, bands)
+
+    def probabilities(self, message: str) -> Dict[str, float]:
+        """P(label) for each label"""
+        # Same as hash_features, normalizing inline; sklearn's normalize() costs more than the rest
+        features = _hasher.transform([_ngrams(message)])
+        norm = np.sqrt(features.data @ features.data) or 1.0
+        scores = (features.data @ self.weights[features.indices]) / norm + self.bias
+        return dict(zip(self.labels, (1.0 / (1.0 + np.exp(-scores))).tolist()))
+
+    def verdicts(self, message: str) -> Dict[str, Optional[bool]]:
+        """True/False when the model is confident about a label, None inside its uncertainty band"""
+        verdicts = {}
+        for label, probability in self.probabilities(message).items():
+            low, high = self.bands[label]
+            verdicts[label] = True if probability > high else False if probability < low else None
+        return verdicts
+
+
+def read_examples(path: str = CHAT_CLASSIFIER_DATA) -> Tuple[List[str], Dict[str, np.ndarray]]:
+    """Labelled messages from a .jsonl file with "text" and one 0/1 field per label"""
+    texts, labels = [], {label: [] for label in LABELS}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                texts.append(row["text"])
+                for label in LABELS:
+                    labels[label].append(int(row[label]))
+    return texts, {label: np.array(values) for label, values in labels.items()}
+
+
+def _threshold(scores: np.ndarray, correct: np.ndarray, precision: float) -> float:
+    """The lowest t such that the examples scoring above t are at least `precision` correct (1.0 if none)"""
+    order = np.argsort(-scores, kind="stable")
+    ranked, hits = scores[order], np.cumsum(correct[order]) / np.arange(1, len(scores) + 1)
+    # Only cut between distinct scores, so "above t" is exactly the examples counted
+    cuts = np.nonzero((hits >= precision) & (np.append(ranked[1:], -np.inf) < ranked))[0]
+    if not len(cuts):
+        return 1.0
+    k = cuts[-1] + 1
+    return float(ranked[k]) if k < len(ranked) else 0.0
+
+
+def confidence_band(probabilities: np.ndarray, y: np.ndarray, precision: float = CHAT_CLASSIFIER_PRECISION) -> Tuple[float, float]:
+    """
+    (low, high) from held-out probabilities: above high at least `precision` of the
+    examples have the label, below low at least `precision` do not, and both ranges
+    are as wide as that allows.
+    """
+    high = _threshold(probabilities, y == 1, precision)
+    low = 1.0 - _threshold(1.0 - probabilities, y == 0, precision)
+    return min(low, 0.5), max(high, 0.5)
+
+
+def train(
+    texts: List[str], labels: Dict[str, np.ndarray], folds: int = 5, precision: float = CHAT_CLASSIFIER_PRECISION
+) -> Tuple[ChatClassifier, Dict[str, dict]]:
+    """
+    Fit every label and set its band from cross-validated (held-out) probabilities.
+    Reports the held-out accuracy, the band, and the share and precision of the
+    verdicts on each side of it.
+    """
+    features = hash_features(texts)
+    models, bands, report = {}, {}, {}
+    for label in LABELS:
+        y = labels[label]
+        cv = StratifiedKFold(n_splits=min(folds, int(np.bincount(y).min())), shuffle=True, random_state=0)
+        probabilities = cross_val_predict(build_classifier(), features, y, cv=cv, method="predict_proba")[:, 1]
+        low, high = bands[label] = confidence_band(probabilities, y, precision)
+        above, below = probabilities > high, probabilities < low
+        report[label] = {
+            "accuracy": round(float(((probabilities > 0.5) == y).mean()), 4),
+            "band": [round(low, 4), round(high, 4)],
+            "confident_share": round(float((above | below).mean()), 4),
+            "precision_above": round(float(y[above].mean()), 4) if above.any() else None,
+            "precision_below": round(float(1 - y[below].mean()), 4) if below.any() else None,
+        }
+        models[label] = build_classifier().fit(features, y)
+    return ChatClassifier.from_models(models, bands), report
+
+
+def save_classifier(classifier: ChatClassifier, path: str = CHAT_CLASSIFIER_PATH) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    joblib.dump(
+        {
+            "version": ARTIFACT_VERSION,
+            "labels": classifier.labels,
+            "weights": classifier.weights,
+            "bias": classifier.bias,
+            "bands": classifier.bands,
+        },
+        path,
+        compress=3,
+    )
+
+
+def load_classifier(path: str = CHAT_CLASSIFIER_PATH) -> Optional[ChatClassifier]:
+    """The saved classifier, or None if there is none (screening then relies on the LLM gates)"""
+    if not os.path.exists(path):
+        return None
+    data = joblib.load(path)
+    if data.get("version") != ARTIFACT_VERSION:
+        raise ValueError(f"Unsupported chat classifier version: {data.get('version')}; retrain it")
+    return ChatClassifier(data["labels"], data["weights"], data["bias"], data["bands"])
+
+
+@component("chat_classifier", preload=True)
+def get_chat_classifier() -> Optional[ChatClassifier]:
+    return load_classifier()
+
+
+def classify_message(message: str) -> Dict[str, Optional[bool]]:
+    """Local verdicts for a chat message; every label is None when no classifier is available"""
+    classifier = get_chat_classifier()
+    if classifier is None:
+        return dict.fromkeys(LABELS)
+    return classifier.verdicts(message)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Train the local chat relevance and moderation classifier")
+    parser.add_argument("command", choices=["train"])
+    parser.add_argument("--data", default=CHAT_CLASSIFIER_DATA, help="labelled .jsonl file")
+    parser.add_argument("--out", default=CHAT_CLASSIFIER_PATH, help="model artifact path")
+    parser.add_argument("--precision", type=float, default=CHAT_CLASSIFIER_PRECISION, help="held-out precision of confident verdicts")
+    args = parser.parse_args(argv)
+
+    texts, labels = read_examples(args.data)
+    classifier, report = train(texts, labels, precision=args.precision)
+    save_classifier(classifier, args.out)
+    for label, metrics in report.items():
+        print(f"{label}: {metrics}")
+    print(f"Saved chat classifier to {args.out} ({len(texts)} examples)")
+
+
+if __name__ == "__main__":
+    main()
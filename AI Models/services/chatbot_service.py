@@ -1,30 +1,29 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from openai import OpenAI
-from typing import List, Dict, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Dict, Optional, Tuple
+import asyncio
 import re
 import time
 from functools import lru_cache
 import json
 import os
 from dotenv import load_dotenv
+from services.chat_classifier import classify_message
+from services.llm_gateway import get_openai_client, call_llm, record_response_usage
+from services.llm_limits import llm_slot
+from services.metrics import stage
+from services.response_cache import SemanticResponseCache
+from services.session_store import create_session_store
 
 load_dotenv()
 
-# Initialize OpenAI client lazily to avoid startup errors
-def get_openai_client():
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY environment variable is required")
-    return OpenAI(api_key=api_key)
-
 MAX_CONVERSATION_HISTORY = 16    
 MAX_RESPONSE_TOKENS = 300          
 AI_TEMPERATURE = 0.7             
 MODERATION_MODEL = "gpt-4o-mini" 
 ADVICE_MODEL = "gpt-4o-mini"     
-CACHE_SIZE = 100
+CACHE_SIZE = int(os.getenv("CHAT_CACHE_SIZE", 100))
 
 app = FastAPI(
     title="Professional API",
@@ -55,7 +54,10 @@ class ChatResponse(BaseModel):
     suggestions: Optional[List[str]] = None
 
 # Store conversations by session
-conversations: Dict[str, List[dict]] = {}
+session_store = create_session_store()
+
+# Answers to questions that do not depend on earlier turns
+response_cache = SemanticResponseCache(max_entries=CACHE_SIZE)
 
 # Professional greeting response
 GREETING_RESPONSE = {
@@ -113,6 +115,18 @@ CAREER_KEYWORDS = {
     'job board', 'headhunting', 'placement', 'recruitment', 'outsourcing'
 }
 
+def history_with(session_id: str, *messages: dict) -> List[dict]:
+    """A session's history with new messages appended, trimmed to MAX_CONVERSATION_HISTORY"""
+    history = session_store.get(session_id) or []
+    history.extend(messages)
+    return history[-MAX_CONVERSATION_HISTORY:]
+
+def append_message(session_id: str, *messages: dict) -> List[dict]:
+    """Append messages to a session's history, keeping the most recent MAX_CONVERSATION_HISTORY"""
+    history = history_with(session_id, *messages)
+    session_store.set(session_id, history)
+    return history
+
 def check_pattern(message: str, patterns: List[str]) -> bool:
     """Check if message matches any of the given patterns"""
     message_lower = message.lower().strip()
@@ -126,11 +140,32 @@ def is_career_related_fast(message: str) -> bool:
     message_lower = message.lower()
     return any(keyword in message_lower for keyword in CAREER_KEYWORDS)
 
-def moderate_content_ai(text: str) -> bool:
+async def is_career_related_ai(message: str) -> bool:
+    """AI career relevance check for messages the keyword filter does not catch"""
+    try:
+        client = get_openai_client()
+        response = await call_llm(
+            "openai",
+            client.chat.completions.create,
+            model=MODERATION_MODEL,
+            messages=[
+                {"role": "system", "content": "Is this message related to careers, jobs, or professional development? Respond only 'YES' or 'NO'."},
+                {"role": "user", "content": message}
+            ],
+            max_tokens=5,
+            temperature=0
+        )
+        return response.choices[0].message.content.strip().upper() == "YES"
+    except:
+        return True  # Default to allowing if API fails
+
+async def moderate_content_ai(text: str) -> bool:
     """AI-based content moderation with caching"""
     try:
         client = get_openai_client()
-        response = client.chat.completions.create(
+        response = await call_llm(
+            "openai",
+            client.chat.completions.create,
             model=MODERATION_MODEL,
             messages=[
                 {"role": "system", "content": "You are a content moderator. Respond only with 'YES' if the message is inappropriate for professional career coaching, or 'NO' if it's appropriate."},
@@ -143,9 +178,7 @@ def moderate_content_ai(text: str) -> bool:
     except:
         return False  # Default to allowing if API fails
 
-def generate_career_response(conversation_history: List[dict]) -> str:
-    """Generate career advice using OpenAI"""
-    system_prompt = """You are a Senior Career Advisor and Executive Coach with 15+ years of experience. You provide strategic, actionable career guidance.
+CAREER_SYSTEM_PROMPT = """You are a Senior Career Advisor and Executive Coach with 15+ years of experience. You provide strategic, actionable career guidance.
 
 Your expertise includes:
 - Resume optimization and ATS compatibility
@@ -168,12 +201,19 @@ Communication style:
 
 Always maintain confidentiality and provide personalized advice."""
 
-    messages = [{"role": "system", "content": system_prompt}]
-    messages.extend(conversation_history)
+def build_advice_messages(conversation_history: List[dict]) -> List[dict]:
+    """System prompt followed by the conversation so far"""
+    return [{"role": "system", "content": CAREER_SYSTEM_PROMPT}, *conversation_history]
+
+async def generate_career_response(conversation_history: List[dict]) -> str:
+    """Generate career advice using OpenAI"""
+    messages = build_advice_messages(conversation_history)
 
     try:
         client = get_openai_client()
-        response = client.chat.completions.create(
+        response = await call_llm(
+            "openai",
+            client.chat.completions.create,
             model=ADVICE_MODEL,
             messages=messages,
             max_tokens=MAX_RESPONSE_TOKENS,
@@ -185,6 +225,163 @@ Always maintain confidentiality and provide personalized advice."""
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI generation failed: {str(e)}")
 
+_BARE_GREETING = re.compile(r"^(hi|hello|hey|good (morning|afternoon|evening))( there)?[\s!.,]*$")
+
+def is_context_free(conversation_history: List[dict]) -> bool:
+    """
+    True when the latest question is the first real turn, so its answer can be shared
+    across sessions: everything before it is bare greetings answered with the canned
+    greeting. A message that merely contains "hi" or "hey" carries context.
+    """
+    for message in conversation_history[:-1]:
+        if message["role"] == "assistant":
+            if message["content"] != GREETING_RESPONSE["message"]:
+                return False
+        elif not _BARE_GREETING.match(message["content"].lower().strip()):
+            return False
+    return True
+
+def cached_career_response(conversation_history: List[dict]) -> Optional[str]:
+    """A cached answer to the latest question, if it is context-free and was answered before"""
+    if not is_context_free(conversation_history):
+        return None
+    return response_cache.get(conversation_history[-1]["content"])
+
+def remember_career_response(conversation_history: List[dict], response: str) -> None:
+    if response and is_context_free(conversation_history):
+        response_cache.put(conversation_history[-1]["content"], response)
+
+async def answer_career_question(conversation_history: List[dict]) -> str:
+    """generate_career_response behind the semantic response cache"""
+    cached = cached_career_response(conversation_history)
+    if cached is not None:
+        return cached
+    with stage("generation"):
+        response = await generate_career_response(conversation_history)
+    remember_career_response(conversation_history, response)
+    return response
+
+class CareerStream:
+    """
+    An open streaming completion. Iterating yields advice tokens as the provider
+    produces them. The provider slot is held until the stream is consumed or closed;
+    whoever holds one must aclose() it on every path, including when it is never iterated.
+    """
+
+    def __init__(self, stream, slot: asyncio.Semaphore):
+        self._stream = stream
+        self._slot = slot
+        self._closed = False
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        try:
+            with stage("generation"):
+                async for chunk in self._stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+                    elif chunk.usage is not None:
+                        # The final chunk, sent because of include_usage
+                        record_response_usage("openai", chunk)
+        finally:
+            await self.aclose()
+
+    async def aclose(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._slot.release()
+            await self._stream.close()
+
+async def open_career_stream(conversation_history: List[dict]) -> CareerStream:
+    """Start a streaming advice completion"""
+    client = get_openai_client()
+    slot = llm_slot("openai")
+    await slot.acquire()
+    try:
+        with stage("stream_open"):
+            stream = await client.chat.completions.create(
+                model=ADVICE_MODEL,
+                messages=build_advice_messages(conversation_history),
+                max_tokens=MAX_RESPONSE_TOKENS,
+                temperature=AI_TEMPERATURE,
+                presence_penalty=0.1,
+                frequency_penalty=0.1,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+    except BaseException:
+        slot.release()
+        raise
+    return CareerStream(stream, slot)
+
+async def _passes_relevance(message: str) -> bool:
+    with stage("relevance"):
+        return await is_career_related_ai(message)
+
+async def _passes_moderation(message: str) -> bool:
+    with stage("moderation"):
+        return not await moderate_content_ai(message)
+
+async def screen_concurrently(
+    message: str,
+    work: Optional[Awaitable[Any]] = None,
+    discard: Optional[Callable[[Any], Awaitable[None]]] = None,
+) -> Tuple[Optional[str], Any]:
+    """
+    Run the relevance and moderation gates concurrently, together with speculative
+    work (normally the advice generation) so a passing message costs about one
+    round-trip. Returns (rejection, result): rejection is "off_topic" or "moderation"
+    when a gate fails, in which case the work is cancelled, or discarded with
+    `discard` if it already finished. The same happens when a gate raises or the
+    caller is cancelled, so an opened stream is never left holding its slot.
+
+    The classifier can only let a message through: a gate it confidently passes (or
+    the keyword check, for relevance) costs no LLM call. A message it flags as
+    off-topic or inappropriate still goes to that LLM gate, which has the final
+    word; the work is then only started once every gate has passed, instead of
+    speculatively.
+    """
+    with stage("classifier"):
+        verdicts = classify_message(message)
+    relevant = True if is_career_related_fast(message) else verdicts["career"]
+    inappropriate = verdicts["inappropriate"]
+    flagged = relevant is False or inappropriate is True
+
+    gates: Dict[asyncio.Task, str] = {}
+    if relevant is not True:
+        gates[asyncio.create_task(_passes_relevance(message))] = "off_topic"
+    if inappropriate is not False:
+        gates[asyncio.create_task(_passes_moderation(message))] = "moderation"
+    work_task = asyncio.create_task(work) if work is not None and not flagged else None
+
+    rejection = None
+    handed_over = False
+    try:
+        pending = set(gates)
+        while pending and rejection is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.result():
+                    rejection = gates[task]
+                    break
+        if rejection is None:
+            if work_task is None and work is not None:
+                work_task = asyncio.create_task(work)
+            result = await work_task if work_task is not None else None
+            handed_over = True
+            return None, result
+        return rejection, None
+    finally:
+        for task in gates:
+            task.cancel()
+        if work_task is None and asyncio.iscoroutine(work):
+            work.close()
+        # Rejected, failed or cancelled (the client went away): the work's result has no owner
+        if not handed_over and work_task is not None:
+            if not work_task.done():
+                work_task.cancel()
+            elif not work_task.cancelled() and work_task.exception() is None and discard is not None:
+                await discard(work_task.result())
+
 def get_career_suggestions(user_message: str) -> List[str]:
     """Generate relevant follow-up suggestions based on user message"""
     suggestions_map = {
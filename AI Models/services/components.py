@@ -0,0 +1,187 @@
+import argparse
+import asyncio
+import gc
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+COMPONENT_WARMUP = os.getenv("COMPONENT_WARMUP", "1") != "0"
+PRELOAD_COMPONENTS = os.getenv("PRELOAD_COMPONENTS", "0") == "1"
+
+_MISSING = object()
+
+
+class Component:
+    """
+    A heavy object (model, client, compiled graph) created on first call and shared
+    afterwards, like an lru_cache(maxsize=1) getter that also records its load time.
+    """
+
+    def __init__(self, name: str, factory: Callable, preload: bool = False):
+        self.name = name
+        self.factory = factory
+        self.preload = preload
+        self.seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self._value = _MISSING
+        self._lock = threading.Lock()
+        self.__doc__ = factory.__doc__
+        self.__wrapped__ = factory
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not _MISSING
+
+    def __call__(self):
+        if self._value is _MISSING:
+            with self._lock:
+                if self._value is _MISSING:
+                    start = time.perf_counter()
+                    try:
+                        value = self.factory()
+                    except Exception as e:
+                        self.error = f"{type(e).__name__}: {e}"
+                        raise
+                    self.seconds = time.perf_counter() - start
+                    self.error = None
+                    self._value = value
+        return self._value
+
+    def cache_clear(self) -> None:
+        with self._lock:
+            self._value = _MISSING
+
+
+class ComponentRegistry:
+    """
+    Every lazily created heavy component of the app. Components load on first use;
+    the lifespan hook also starts a background warm-up that loads them one by one
+    so the first requests do not pay for it, and /ready reports when it is done.
+
+    Components marked preload are safe to create before the server forks its
+    workers (no threads, sockets or event loops). With PRELOAD_COMPONENTS=1 they
+    are loaded at import, so under `gunicorn --preload` the workers share the
+    spaCy model and vocabularies copy-on-write.
+    """
+
+    def __init__(self):
+        self._components: Dict[str, Component] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.warmup_started: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+
+    def component(self, name: str, preload: bool = False) -> Callable[[Callable], Component]:
+        """Decorator registering a zero-argument factory as a lazily created component"""
+
+        def register(factory: Callable) -> Component:
+            component = Component(name, factory, preload)
+            self._components[name] = component
+            return component
+
+        return register
+
+    def preload(self) -> None:
+        for component in self._components.values():
+            if component.preload:
+                component()
+        # Objects created so far are never collected, so the collector does not
+        # write to (and un-share) their pages in forked workers
+        gc.freeze()
+
+    async def warm_up(self) -> None:
+        self.warmup_started = time.time()
+        start = time.perf_counter()
+        for component in list(self._components.values()):
+            if component.loaded:
+                continue
+            try:
+                await asyncio.to_thread(component)
+            except Exception:
+                # Recorded on the component; it is retried on first use
+                pass
+        self.warmup_seconds = time.perf_counter() - start
+
+    def start_warm_up(self) -> asyncio.Task:
+        if self._task is None:
+            self._task = asyncio.create_task(self.warm_up())
+        return self._task
+
+    async def stop_warm_up(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    @property
+    def ready(self) -> bool:
+        return self.warmup_seconds is not None or (not COMPONENT_WARMUP and self._task is None)
+
+    def status(self) -> dict:
+        errors = {name: c.error for name, c in self._components.items() if c.error and not c.loaded}
+        return {
+            "ready": self.ready,
+            "status": ("degraded" if errors else "ready") if self.ready else "warming_up",
+            "warmup_seconds": round(self.warmup_seconds, 3) if self.warmup_seconds is not None else None,
+            "components": {
+                name: {
+                    "loaded": c.loaded,
+                    "seconds": round(c.seconds, 3) if c.seconds is not None else None,
+                    "preload": c.preload,
+                    "error": c.error if not c.loaded else None,
+                }
+                for name, c in self._components.items()
+            },
+        }
+
+
+components = ComponentRegistry()
+component = components.component
+
+
+def import_profile(module: str = "app", top: int = 25) -> Tuple[float, List[Tuple[str, float]]]:
+    """Seconds to import a module in a fresh interpreter and its slowest imports (cumulative seconds)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=False,
+    )
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        timings.append((name.rstrip(), int(cumulative) / 1e6))
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    total = next((seconds for name, seconds in reversed(timings) if name.strip() == module), 0.0)
+    return total, sorted(timings, key=lambda item: item[1], reverse=True)[:top]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Startup profile of the API")
+    parser.add_argument("command", choices=["profile"])
+    parser.add_argument("--module", default="app", help="module to import (default: app)")
+    parser.add_argument("--top", type=int, default=25, help="slowest imports to list")
+    parser.add_argument("--load", action="store_true", help="also load every component and time it")
+    args = parser.parse_args(argv)
+
+    total, slowest = import_profile(args.module, args.top)
+    print(f"import {args.module}: {total:.2f}s")
+    for name, seconds in slowest:
+        print(f"  {seconds:8.3f}s  {name}")
+    if args.load:
+        __import__(args.module)
+        # Run as __main__, this module's registry is not the one the app registered with
+        registry = __import__("services.components", fromlist=["components"]).components
+        asyncio.run(registry.warm_up())
+        print(f"components: {registry.warmup_seconds:.2f}s")
+        for name, state in registry.status()["components"].items():
+            print(f"  {state['seconds'] or 0:8.3f}s  {name}{'  ERROR ' + state['error'] if state['error'] else ''}")
+
+
+if __name__ == "__main__":
+    main()
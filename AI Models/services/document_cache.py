@@ -0,0 +1,166 @@
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+import ormsgpack
+import xxhash
+from scipy import sparse
+
+CACHE_MAX_BYTES = int(os.getenv("KEYWORD_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+CACHE_DIR = os.getenv("KEYWORD_CACHE_DIR") or None
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Normalization that cannot change the token stream: NFC plus collapsed whitespace"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def document_key(text: str) -> str:
+    """Content address of a document"""
+    return xxhash.xxh3_128_hexdigest(normalize_text(text).encode("utf-8"))
+
+
+@dataclass
+class CachedDocument:
+    tokens: List[str]
+    vector: Optional[sparse.csr_matrix] = None
+    vocabulary: Optional[str] = None
+
+    def nbytes(self) -> int:
+        """Approximate memory footprint used for the cache's byte budget"""
+        size = 200 + sum(50 + len(token) for token in self.tokens)
+        if self.vector is not None:
+            size += 100 + self.vector.data.nbytes + self.vector.indices.nbytes + self.vector.indptr.nbytes
+        return size
+
+    def to_bytes(self) -> bytes:
+        data = {"tokens": self.tokens}
+        if self.vector is not None:
+            data.update(
+                vocabulary=self.vocabulary,
+                n_features=self.vector.shape[1],
+                indices=self.vector.indices.astype(np.int32).tobytes(),
+                data=self.vector.data.astype(np.float64).tobytes(),
+            )
+        return ormsgpack.packb(data)
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "CachedDocument":
+        data = ormsgpack.unpackb(raw)
+        vector = None
+        if "indices" in data:
+            indices = np.frombuffer(data["indices"], dtype=np.int32)
+            values = np.frombuffer(data["data"], dtype=np.float64)
+            vector = sparse.csr_matrix(
+                (values, indices, np.array([0, len(indices)])), shape=(1, data["n_features"])
+            )
+        return cls(tokens=data["tokens"], vector=vector, vocabulary=data.get("vocabulary"))
+
+
+class DocumentCache:
+    """
+    LRU cache of preprocessed documents bounded by an approximate byte budget,
+    with an optional on-disk tier that several worker processes can share.
+    """
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES, disk_dir: Optional[str] = CACHE_DIR):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries: "OrderedDict[str, CachedDocument]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.msgpack")
+
+    def _read_disk(self, key: str) -> Optional[CachedDocument]:
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                return CachedDocument.from_bytes(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, entry: CachedDocument) -> None:
+        path = self._disk_path(key)
+        tmp_path = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(entry.to_bytes())
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def _store(self, key: str, entry: CachedDocument) -> None:
+        size = entry.nbytes()
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._sizes[key]
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._sizes[key] = size
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                old_key, _ = self._entries.popitem(last=False)
+                self._bytes -= self._sizes.pop(old_key)
+                self.evictions += 1
+
+    def get(self, key: str) -> Optional[CachedDocument]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return entry
+        if self.disk_dir:
+            entry = self._read_disk(key)
+            if entry is not None:
+                self._store(key, entry)
+                with self._lock:
+                    self.disk_hits += 1
+                return entry
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, entry: CachedDocument) -> None:
+        self._store(key, entry)
+        if self.disk_dir:
+            self._write_disk(key, entry)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "disk_tier": bool(self.disk_dir),
+            }
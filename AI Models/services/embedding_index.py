@@ -0,0 +1,275 @@
+import json
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import spacy
+import xxhash
+
+from services.components import component
+from services.index_owner import index_owner
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "spacy")
+EMBEDDING_SPACY_MODEL = os.getenv("EMBEDDING_SPACY_MODEL", "en_core_web_md")
+EMBEDDING_DTYPE = np.float16 if os.getenv("EMBEDDING_DTYPE", "float16") == "float16" else np.float32
+EMBEDDING_INDEX_DIR = os.getenv("EMBEDDING_INDEX_DIR", os.path.join("artifacts", "embedding_index"))
+HASHING_DIM = 512
+SNAPSHOT_FILE = "index.npz"
+
+# IVF parameters: below MIN_TRAIN_SIZE vectors the index is searched exhaustively
+MIN_TRAIN_SIZE = 1024
+KMEANS_ITERATIONS = 15
+DEFAULT_NPROBE = int(os.getenv("EMBEDDING_NPROBE", 8))
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+class SpacyEmbedder:
+    """Mean word vectors from a local spaCy model"""
+
+    def __init__(self, model: str = EMBEDDING_SPACY_MODEL):
+        try:
+            self.nlp = spacy.load(model)
+        except OSError:
+            from services.keywordana import get_nlp
+            self.nlp = get_nlp()
+        self.has_static_vectors = self.nlp.vocab.vectors.shape[0] > 0
+        self.dim = self.nlp.vocab.vectors.shape[1] if self.has_static_vectors else None
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if self.has_static_vectors:
+            # Static vectors are a vocab lookup, the tokenizer is all that needs to run
+            docs = self.nlp.tokenizer.pipe(texts)
+        else:
+            # Small models have no word vectors; fall back to the tok2vec tensors
+            disabled = [name for name in self.nlp.pipe_names if name != "tok2vec"]
+            docs = self.nlp.pipe(texts, disable=disabled)
+        return _normalize(np.vstack([doc.vector for doc in docs]))
+
+
+class HashingEmbedder:
+    """Signed feature hashing of word unigrams and bigrams; dependency-free fallback"""
+
+    def __init__(self, dim: int = HASHING_DIM):
+        self.dim = dim
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        from services.keywordana import preprocess_documents
+
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, tokens in enumerate(preprocess_documents(texts)):
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            for feature in features:
+                h = xxhash.xxh64_intdigest(feature)
+                matrix[row, h % self.dim] += 1.0 if (h >> 63) else -1.0
+        return _normalize(matrix)
+
+
+EMBEDDERS: Dict[str, Callable[[], object]] = {
+    "spacy": SpacyEmbedder,
+    "hashing": HashingEmbedder,
+}
+
+
+def register_embedder(name: str, factory: Callable[[], object]) -> None:
+    """Register a local embedding backend; it must expose embed(texts) -> float32 matrix"""
+    EMBEDDERS[name] = factory
+
+
+@component("embedder", preload=True)
+def get_embedder():
+    if EMBEDDING_BACKEND not in EMBEDDERS:
+        raise ValueError(f"Unknown embedding backend: {EMBEDDING_BACKEND}")
+    return EMBEDDERS[EMBEDDING_BACKEND]()
+
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    return get_embedder().embed(texts)
+
+
+class EmbeddingIndex:
+    """
+    Inverted-file (IVF) approximate nearest-neighbour index over unit vectors.
+
+    Vectors live in one contiguous matrix (float16 by default). Once enough
+    vectors are added, k-means centroids partition them into lists and a query
+    only scores the vectors in its nprobe closest lists. The quantizer is
+    retrained whenever the index doubles in size since the last training.
+    """
+
+    def __init__(self, dtype=EMBEDDING_DTYPE):
+        self.dtype = dtype
+        self._vectors: Optional[np.ndarray] = None
+        self._size = 0
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._lists: List[Set[int]] = []
+        self._trained_size = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _reserve(self, dim: int, extra: int) -> None:
+        if self._vectors is None:
+            self._vectors = np.zeros((max(extra, 64), dim), dtype=self.dtype)
+            self._assign = np.zeros(len(self._vectors), dtype=np.int32)
+        elif self._size + extra > len(self._vectors):
+            capacity = max(2 * len(self._vectors), self._size + extra)
+            vectors = np.zeros((capacity, self._vectors.shape[1]), dtype=self.dtype)
+            vectors[:self._size] = self._vectors[:self._size]
+            assign = np.zeros(capacity, dtype=np.int32)
+            assign[:self._size] = self._assign[:self._size]
+            self._vectors, self._assign = vectors, assign
+
+    def _nearest_centroids(self, vectors: np.ndarray, n: int = 1) -> np.ndarray:
+        scores = vectors.astype(np.float32) @ self._centroids.T
+        if n == 1:
+            return scores.argmax(axis=1)
+        n = min(n, scores.shape[1])
+        return np.argpartition(-scores, n - 1, axis=1)[:, :n]
+
+    def _train(self) -> None:
+        """Fit the coarse quantizer with spherical k-means and reassign every vector"""
+        data = self._vectors[:self._size].astype(np.float32)
+        n_lists = max(1, int(np.sqrt(self._size)))
+        rng = np.random.default_rng(0)
+        self._centroids = data[rng.choice(self._size, n_lists, replace=False)]
+        for _ in range(KMEANS_ITERATIONS):
+            assign = self._nearest_centroids(data)
+            sums = np.zeros_like(self._centroids)
+            np.add.at(sums, assign, data)
+            empty = np.bincount(assign, minlength=n_lists) == 0
+            sums[empty] = self._centroids[empty]
+            self._centroids = _normalize(sums)
+        self._assign[:self._size] = self._nearest_centroids(data)
+        self._lists = [set() for _ in range(n_lists)]
+        for row, list_id in enumerate(self._assign[:self._size]):
+            self._lists[list_id].add(row)
+        self._trained_size = self._size
+
+    def add(self, ids: List[str], vectors: np.ndarray) -> None:
+        """Add or replace vectors by id"""
+        with self._lock:
+            for doc_id in ids:
+                self.remove(doc_id)
+            self._reserve(vectors.shape[1], len(ids))
+            start = self._size
+            self._vectors[start:start + len(ids)] = vectors
+            for offset, doc_id in enumerate(ids):
+                self._rows[doc_id] = start + offset
+                self._ids.append(doc_id)
+            self._size += len(ids)
+            if self._centroids is not None:
+                list_ids = self._nearest_centroids(vectors)
+                for offset, list_id in enumerate(list_ids):
+                    self._assign[start + offset] = list_id
+                    self._lists[list_id].add(start + offset)
+            if self._size >= MIN_TRAIN_SIZE and self._size >= 2 * self._trained_size:
+                self._train()
+
+    def remove(self, doc_id: str) -> bool:
+        """Remove a vector by moving the last row into its slot"""
+        with self._lock:
+            row = self._rows.pop(doc_id, None)
+            if row is None:
+                return False
+            last = self._size - 1
+            if self._centroids is not None:
+                self._lists[self._assign[row]].discard(row)
+                self._lists[self._assign[last]].discard(last)
+            if row != last:
+                moved_id = self._ids[last]
+                self._vectors[row] = self._vectors[last]
+                self._assign[row] = self._assign[last]
+                self._ids[row] = moved_id
+                self._rows[moved_id] = row
+                if self._centroids is not None:
+                    self._lists[self._assign[row]].add(row)
+            self._ids.pop()
+            self._size -= 1
+            return True
+
+    def search(self, query: np.ndarray, k: int = 10, nprobe: int = DEFAULT_NPROBE) -> List[Tuple[str, float]]:
+        """Approximate top-k ids by cosine similarity for one unit query vector"""
+        with self._lock:
+            if self._size == 0 or k <= 0:
+                return []
+            query = query.astype(np.float32).ravel()
+            if self._centroids is None:
+                rows = np.arange(self._size)
+            else:
+                probes = self._nearest_centroids(query[None, :], nprobe)[0]
+                rows = np.fromiter(
+                    (row for list_id in probes for row in self._lists[list_id]), dtype=np.int64
+                )
+                if len(rows) == 0:
+                    return []
+            scores = self._vectors[rows].astype(np.float32) @ query
+            k = min(k, len(rows))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self._ids[rows[i]], float(scores[i])) for i in top]
+
+    def snapshot(self, path: str = EMBEDDING_INDEX_DIR) -> None:
+        """
+        Write the ids and vectors as one file, atomically: a crash mid-write leaves
+        the previous snapshot in place, never vectors that do not match their ids
+        """
+        with self._lock:
+            vectors = self._vectors[:self._size] if self._size else np.zeros((0, 0), self.dtype)
+            ids = np.array(self._ids, dtype=np.str_)
+            os.makedirs(path, exist_ok=True)
+            snapshot_path = os.path.join(path, SNAPSHOT_FILE)
+            tmp_path = f"{snapshot_path}.tmp{os.getpid()}"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, vectors=vectors, ids=ids)
+            os.replace(tmp_path, snapshot_path)
+
+    @classmethod
+    def restore(cls, path: str = EMBEDDING_INDEX_DIR) -> "EmbeddingIndex":
+        index = cls()
+        snapshot_path = os.path.join(path, SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path):
+            with np.load(snapshot_path) as data:
+                ids, vectors = data["ids"].tolist(), data["vectors"]
+        elif os.path.exists(os.path.join(path, "ids.json")):
+            # Snapshots written before index.npz: ids.json and vectors.npy
+            with open(os.path.join(path, "ids.json"), encoding="utf-8") as f:
+                ids = json.load(f)
+            vectors = np.load(os.path.join(path, "vectors.npy")) if ids else None
+        else:
+            return index
+        if ids:
+            if len(ids) != len(vectors):
+                raise ValueError(f"Embedding index snapshot in {path} is inconsistent, rebuild it")
+            index.add(ids, vectors)
+        return index
+
+
+embedding_index = EmbeddingIndex.restore()
+
+
+def embed_resume(resume_id: str, text: str) -> None:
+    index_owner.require()
+    embedding_index.add([resume_id], embed_texts([text]))
+
+
+def semantic_search(jd_text: str, k: int = 10) -> List[Tuple[str, float]]:
+    index_owner.require()
+    return embedding_index.search(embed_texts([jd_text])[0], k)
+
+
+def shortlist_candidates(jd_text: str, candidate_texts: List[str], k: int) -> List[Tuple[int, float]]:
+    """Indices of the k candidates closest to the job description, with their cosine similarity"""
+    vectors = embed_texts([jd_text, *candidate_texts])
+    scores = vectors[1:] @ vectors[0]
+    order = np.argsort(-scores)[:k]
+    return [(int(i), float(scores[i])) for i in order]
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+EXTRACTION_CACHE_DB = os.getenv("EXTRACTION_CACHE_DB", os.path.join("artifacts", "extraction_cache.db"))
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+# Bump when extraction or the resume prompt changes so old entries are not served
+EXTRACTION_CACHE_VERSION = 1
+
+
+def upload_key(data: bytes, filename: str, max_pages: Optional[int]) -> str:
+    """Content address of an upload: its bytes plus everything that changes what is extracted from them"""
+    extension = os.path.splitext(filename or "")[1].lower()
+    digest = hashlib.sha256(data).hexdigest()
+    return f"{digest}:{extension}:{max_pages}:{EXTRACTION_CACHE_VERSION}"
+
+
+class ExtractionCache:
+    """
+    Persistent cache of uploaded documents keyed by content hash: the extracted
+    text and page count, plus the parsed resume once the LLM has produced one
+    (stored per parse variant, since the fast parser uses a different prompt).
+
+    Entries live in SQLite (WAL mode), shared by every worker and both the parser
+    and analyzer services. When the stored text and results grow past max_bytes,
+    the least recently used entries are deleted.
+    """
+
+    def __init__(self, path: str = EXTRACTION_CACHE_DB, max_bytes: int = EXTRACTION_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.text_hits = 0
+        self.text_misses = 0
+        self.parsed_hits = 0
+        self.parsed_misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened on first use: extraction worker processes import this module but never touch the cache
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "key TEXT NOT NULL, variant TEXT NOT NULL, value TEXT NOT NULL, pages INTEGER, "
+                "size INTEGER NOT NULL, accessed_at REAL NOT NULL, PRIMARY KEY (key, variant))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS documents_accessed ON documents (accessed_at)")
+            self._conn = conn
+        return self._conn
+
+    def _get(self, key: str, variant: str) -> Optional[Tuple[str, Optional[int]]]:
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, pages FROM documents WHERE key = ? AND variant = ?", (key, variant)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE documents SET accessed_at = ? WHERE key = ? AND variant = ?", (time.time(), key, variant)
+                )
+        return row
+
+    def _put(self, key: str, variant: str, value: str, pages: Optional[int] = None) -> None:
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO documents (key, variant, value, pages, size, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, variant, value, pages, size, time.time()),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        # Other processes write to the same file, so the total is re-read rather than tracked
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM documents").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        victims = []
+        for rowid, size in conn.execute("SELECT rowid, size FROM documents ORDER BY accessed_at"):
+            victims.append((rowid,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM documents WHERE rowid = ?", victims)
+        self.evictions += len(victims)
+
+    def get_text(self, key: str) -> Optional[Tuple[str, Optional[int]]]:
+        """(text, page count) extracted from this upload before"""
+        if not self.enabled:
+            return None
+        row = self._get(key, "text")
+        if row is None:
+            self.text_misses += 1
+            return None
+        self.text_hits += 1
+        return row[0], row[1]
+
+    def put_text(self, key: str, text: str, pages: Optional[int]) -> None:
+        if self.enabled:
+            self._put(key, "text", text, pages)
+
+    def get_parsed(self, key: str, variant: str = "resume") -> Optional[dict]:
+        """The structured result an LLM parse of this upload produced before"""
+        if not self.enabled:
+            return None
+        row = self._get(key, variant)
+        if row is None:
+            self.parsed_misses += 1
+            return None
+        self.parsed_hits += 1
+        return json.loads(row[0])
+
+    def put_parsed(self, key: str, parsed: dict, variant: str = "resume") -> None:
+        if self.enabled:
+            self._put(key, variant, json.dumps(parsed))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection().execute("DELETE FROM documents")
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM documents"
+            ).fetchone()
+        text_lookups = self.text_hits + self.text_misses
+        parsed_lookups = self.parsed_hits + self.parsed_misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "text_hits": self.text_hits,
+            "text_misses": self.text_misses,
+            "parsed_hits": self.parsed_hits,
+            "parsed_misses": self.parsed_misses,
+            "evictions": self.evictions,
+            "text_hit_ratio": round(self.text_hits / text_lookups, 4) if text_lookups else 0.0,
+            "parsed_hit_ratio": round(self.parsed_hits / parsed_lookups, 4) if parsed_lookups else 0.0,
+        }
+
+
+extraction_cache = ExtractionCache()
@@ -0,0 +1,213 @@
+import asyncio
+import multiprocessing
+import os
+from typing import Any, Callable, List, Optional, Tuple
+
+# Every web worker process has its own pool, so by default the CPUs are split between them
+# (WEB_CONCURRENCY is the worker count gunicorn and uvicorn read)
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", 1)))
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", max(1, (os.cpu_count() or 1) // WEB_CONCURRENCY)))
+EXTRACTION_QUEUE_SIZE = int(os.getenv("EXTRACTION_QUEUE_SIZE", 4 * EXTRACTION_WORKERS))
+EXTRACTION_TIMEOUT_SECONDS = float(os.getenv("EXTRACTION_TIMEOUT_SECONDS", 20))
+EXTRACTION_RETRY_AFTER_SECONDS = int(os.getenv("EXTRACTION_RETRY_AFTER_SECONDS", 5))
+WORKER_START_TIMEOUT_SECONDS = 60
+
+
+class ExtractionOverloaded(Exception):
+    """Every worker is busy and the waiting queue is full; callers should answer 503"""
+
+
+class ExtractionTimeout(ValueError):
+    pass
+
+
+def _worker_main(conn, preload: Tuple[str, ...]) -> None:
+    """Worker process loop: receive (function path, args), send back ("ok", result) or ("error", exception)"""
+    import importlib
+
+    for module in preload:
+        importlib.import_module(module)
+    conn.send(("ready", None))
+    functions = {}
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if job is None:
+            return
+        path, args = job
+        try:
+            if path not in functions:
+                module, name = path.rsplit(".", 1)
+                functions[path] = getattr(importlib.import_module(module), name)
+            conn.send(("ok", functions[path](*args)))
+        except Exception as e:
+            try:
+                conn.send(("error", e))
+            except Exception:
+                conn.send(("error", ValueError(f"{type(e).__name__}: {e}")))
+
+
+class _Worker:
+    def __init__(self, context, preload: Tuple[str, ...]):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, preload), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def call(self, job: Tuple[str, tuple], timeout: float) -> Any:
+        """Blocking round-trip to the worker; run in a thread"""
+        if not self.ready:
+            # Interpreter start-up and imports are not charged to the first job's timeout
+            try:
+                if not self.conn.poll(WORKER_START_TIMEOUT_SECONDS):
+                    raise EOFError
+                self.conn.recv()
+            except EOFError:
+                raise ValueError("Document processing worker failed to start")
+            self.ready = True
+        self.conn.send(job)
+        if not self.conn.poll(timeout):
+            raise ExtractionTimeout(f"Document processing exceeded {timeout:g}s")
+        try:
+            status, payload = self.conn.recv()
+        except EOFError:
+            raise ValueError("Document processing worker crashed")
+        if status == "error":
+            raise payload
+        return payload
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+
+class ExtractionPool:
+    """
+    Long-lived worker processes for CPU-bound document parsing, sized to this web
+    worker's share of the CPUs. Jobs beyond the idle workers wait in a bounded
+    queue; once that is full run() raises ExtractionOverloaded instead of queueing
+    without limit. A job that exceeds the timeout gets its worker killed and
+    replaced, so a pathological PDF cannot hold a core forever. A job whose caller
+    went away is left to finish and its result discarded, which is cheaper than
+    respawning the worker.
+    """
+
+    def __init__(
+        self,
+        workers: int = EXTRACTION_WORKERS,
+        queue_size: int = EXTRACTION_QUEUE_SIZE,
+        timeout: float = EXTRACTION_TIMEOUT_SECONDS,
+        # The API process never parses documents itself, so the PDF engine is imported only here
+        preload: Tuple[str, ...] = ("services.text_extraction", "fitz"),
+    ):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.preload = preload
+        # spawn, not fork: the parent holds gRPC/HTTP client threads that must not be forked
+        self._context = multiprocessing.get_context("spawn")
+        self._idle: Optional[asyncio.Queue] = None
+        self._all: List[_Worker] = []
+        self._waiting = 0
+        self._busy = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.crashes = 0
+
+    def start(self) -> None:
+        """Spawn the workers now rather than on the first job (they take a few seconds to import)"""
+        if self._idle is not None or self.workers <= 0:
+            return
+        self._idle = asyncio.Queue()
+        for _ in range(self.workers):
+            self._spawn()
+
+    def _spawn(self) -> None:
+        worker = _Worker(self._context, self.preload)
+        self._all.append(worker)
+        self._idle.put_nowait(worker)
+
+    def _retire(self, worker: _Worker) -> None:
+        worker.kill()
+        if worker in self._all:
+            self._all.remove(worker)
+        if self._idle is not None:
+            self._spawn()
+
+    def _settle(self, worker: _Worker, call: asyncio.Future) -> None:
+        """Once a job ends, count it and return its worker, or replace it after a timeout or crash"""
+        self._busy -= 1
+        error = call.exception()
+        if error is None:
+            self.completed += 1
+        elif isinstance(error, ExtractionTimeout):
+            self.timeouts += 1
+            self._retire(worker)
+            return
+        else:
+            self.failed += 1
+            if not worker.process.is_alive():
+                self.crashes += 1
+                self._retire(worker)
+                return
+        if self._idle is not None and worker in self._all:
+            self._idle.put_nowait(worker)
+
+    async def run(self, function: Callable, *args) -> Any:
+        """Run a module-level function in a worker process"""
+        if self.workers <= 0:
+            return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+        if self._idle is None:
+            self.start()
+        if self._waiting >= self.queue_size and self._idle.empty():
+            self.rejected += 1
+            raise ExtractionOverloaded("Document processing is at capacity, please retry shortly")
+
+        self._waiting += 1
+        try:
+            worker = await self._idle.get()
+        finally:
+            self._waiting -= 1
+
+        self._busy += 1
+        job = (f"{function.__module__}.{function.__qualname__}", args)
+        call = asyncio.ensure_future(asyncio.to_thread(worker.call, job, self.timeout))
+        call.add_done_callback(lambda _: self._settle(worker, call))
+        # shield: when the caller is cancelled the job runs to completion (or its timeout)
+        # and the worker goes back to the pool, instead of being killed and respawned
+        return await asyncio.shield(call)
+
+    def close(self) -> None:
+        for worker in self._all:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+        for worker in self._all:
+            worker.process.join(timeout=1)
+            if worker.process.is_alive():
+                worker.process.kill()
+        self._all.clear()
+        self._idle = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "busy": self._busy,
+            "queued": self._waiting,
+            "queue_size": self.queue_size,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "crashes": self.crashes,
+        }
+
+
+extraction_pool = ExtractionPool()
@@ -0,0 +1,95 @@
+import fcntl
+import os
+import threading
+from typing import IO, Optional
+
+from services.extraction_pool import WEB_CONCURRENCY
+
+RESUME_INDEX_ENABLED = os.getenv("RESUME_INDEX_ENABLED", "1") != "0"
+RESUME_INDEX_LOCK = os.getenv("RESUME_INDEX_LOCK", os.path.join("artifacts", "resume_index.lock"))
+
+
+class IndexNotOwned(RuntimeError):
+    """The resume indexes live in another worker process"""
+
+
+class IndexOwner:
+    """
+    The resume and embedding indexes are in-process: each worker would hold its own
+    copy, miss resumes indexed by the others and overwrite their snapshots at
+    shutdown. The process serving them holds an exclusive lock on RESUME_INDEX_LOCK;
+    in every other process they refuse to work.
+
+    start() claims the lock when a worker starts up (not at import, so under
+    `gunicorn --preload` the master does not take it before forking) and fails the
+    startup when it cannot, so a server with several workers does not come up with
+    the indexes answering from only one of them. Such servers set
+    RESUME_INDEX_ENABLED=0 and leave the indexes out.
+    """
+
+    def __init__(self, path: str = RESUME_INDEX_LOCK, enabled: bool = RESUME_INDEX_ENABLED):
+        self.path = path
+        self.enabled = enabled
+        self._pid: Optional[int] = None
+        self._file: Optional[IO] = None
+        self._lock = threading.Lock()
+
+    def held(self) -> bool:
+        """True when this process owns the indexes (without trying to claim them)"""
+        return self._pid == os.getpid() and self._file is not None
+
+    def start(self, workers: int = WEB_CONCURRENCY) -> None:
+        """Claim the indexes for this worker, or raise IndexNotOwned to stop the server starting"""
+        if not self.enabled:
+            return
+        if workers > 1:
+            raise IndexNotOwned(
+                f"The resume index is in-process and cannot be served by {workers} workers; "
+                "run with one worker or set RESUME_INDEX_ENABLED=0"
+            )
+        if not self.claim():
+            raise IndexNotOwned(
+                f"The resume index is already served by process {self.owner_pid()}; "
+                "run with one worker or set RESUME_INDEX_ENABLED=0"
+            )
+
+    def claim(self) -> bool:
+        if not self.enabled:
+            return False
+        with self._lock:
+            if self._pid == os.getpid():
+                return self._file is not None
+            # A claim inherited through fork belongs to the parent
+            self._pid, self._file = os.getpid(), None
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            f = open(self.path, "a+")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                return False
+            f.seek(0)
+            f.truncate()
+            f.write(str(os.getpid()))
+            f.flush()
+            self._file = f
+            return True
+
+    def owner_pid(self) -> Optional[int]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return int(f.read().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+    def require(self) -> None:
+        if not self.enabled:
+            raise IndexNotOwned("The resume index is disabled (RESUME_INDEX_ENABLED=0)")
+        if not self.claim():
+            raise IndexNotOwned(
+                f"The resume index is served by worker process {self.owner_pid()}; "
+                "run the index API with a single worker"
+            )
+
+
+index_owner = IndexOwner()
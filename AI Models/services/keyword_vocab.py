@@ -0,0 +1,206 @@
+import argparse
+import json
+import os
+import uuid
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+
+from services.components import component
+
+VOCAB_DIR = os.getenv("KEYWORD_VOCAB_DIR", os.path.join("artifacts", "keyword_vocab"))
+TERMS_FILE = "terms.json"
+DF_FILE = "df.npy"
+IDF_FILE = "idf.npy"
+META_FILE = "meta.json"
+FIT_BATCH_SIZE = 1000
+
+
+class SavedVocabulary(NamedTuple):
+    terms: List[str]
+    df: np.ndarray
+    idf: np.ndarray
+    n_docs: int
+    version: Optional[str]
+
+
+@dataclass(frozen=True)
+class KeywordVocabulary:
+    """A fitted vectorizer together with the version of the vocabulary it was built from"""
+    vectorizer: TfidfVectorizer
+    version: Optional[str]
+
+    @property
+    def n_features(self) -> int:
+        return len(self.vectorizer.idf_)
+
+
+def compute_idf(df: np.ndarray, n_docs: int) -> np.ndarray:
+    """Smoothed IDF, identical to TfidfVectorizer(smooth_idf=True)"""
+    return np.log((1 + n_docs) / (1 + df.astype(np.float64))) + 1.0
+
+
+def count_document_frequencies(docs: Iterable[str]) -> Tuple[List[str], np.ndarray, int]:
+    """Return the terms, their document frequencies and the number of documents"""
+    docs = list(docs)
+    if not docs:
+        return [], np.zeros(0, dtype=np.int64), 0
+    counter = CountVectorizer(binary=True)
+    matrix = counter.fit_transform(docs)
+    df = np.asarray(matrix.sum(axis=0)).ravel().astype(np.int64)
+    return counter.get_feature_names_out().tolist(), df, len(docs)
+
+
+def merge_document_frequencies(
+    terms: List[str], df: np.ndarray, new_terms: List[str], new_df: np.ndarray
+) -> Tuple[List[str], np.ndarray]:
+    """Add new counts onto an existing vocabulary, appending unseen terms at the end"""
+    index = {term: i for i, term in enumerate(terms)}
+    merged_terms = list(terms)
+    merged_df = np.concatenate([np.asarray(df, dtype=np.int64), np.zeros(len(new_terms), dtype=np.int64)])
+    for term, count in zip(new_terms, new_df):
+        i = index.get(term)
+        if i is None:
+            i = index[term] = len(merged_terms)
+            merged_terms.append(term)
+        merged_df[i] += count
+    return merged_terms, merged_df[:len(merged_terms)]
+
+
+def _replace(path: str, write) -> None:
+    """Write to a temp file and atomically move it into place"""
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def save_vocabulary(terms: List[str], df: np.ndarray, n_docs: int, path: str = VOCAB_DIR) -> None:
+    """Persist the vocabulary, document frequencies and precomputed IDF weights"""
+    os.makedirs(path, exist_ok=True)
+
+    def write_json(data):
+        def write(tmp_path):
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+        return write
+
+    def write_array(array):
+        def write(tmp_path):
+            with open(tmp_path, "wb") as f:
+                np.save(f, array)
+        return write
+
+    _replace(os.path.join(path, DF_FILE), write_array(np.asarray(df, dtype=np.int64)))
+    _replace(os.path.join(path, IDF_FILE), write_array(compute_idf(np.asarray(df), n_docs)))
+    _replace(os.path.join(path, TERMS_FILE), write_json(terms))
+    _replace(os.path.join(path, META_FILE), write_json({"n_docs": n_docs, "n_terms": len(terms), "version": uuid.uuid4().hex}))
+
+
+def _read_meta(path: str) -> dict:
+    with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_vocabulary(path: str = VOCAB_DIR, mmap: bool = True) -> Optional[SavedVocabulary]:
+    """Load a saved vocabulary, memory-mapping the arrays. Returns None if nothing is saved."""
+    if not os.path.exists(os.path.join(path, META_FILE)):
+        return None
+    mmap_mode = "r" if mmap else None
+    for _ in range(3):
+        meta = _read_meta(path)
+        with open(os.path.join(path, TERMS_FILE), encoding="utf-8") as f:
+            terms = json.load(f)
+        df = np.load(os.path.join(path, DF_FILE), mmap_mode=mmap_mode)
+        idf = np.load(os.path.join(path, IDF_FILE), mmap_mode=mmap_mode)
+        # meta.json is replaced last, so an unchanged version means the files read belong to it
+        if _read_meta(path).get("version") == meta.get("version"):
+            break
+    if not (len(terms) == len(df) == len(idf) == meta["n_terms"]):
+        raise ValueError(f"Keyword vocabulary in {path} is inconsistent, refit it")
+    return SavedVocabulary(terms, df, idf, meta["n_docs"], meta.get("version"))
+
+
+def build_vectorizer(terms: List[str], idf: np.ndarray) -> TfidfVectorizer:
+    """Build a ready-to-transform TfidfVectorizer from a saved vocabulary"""
+    vectorizer = TfidfVectorizer(vocabulary={term: i for i, term in enumerate(terms)})
+    vectorizer.idf_ = idf
+    return vectorizer
+
+
+@component("keyword_vocabulary", preload=True)
+def get_keyword_vocabulary() -> Optional[KeywordVocabulary]:
+    """
+    Pre-fitted vectorizer shared by the keyword routes and the version it was built
+    from, or None when no vocabulary is saved. Both come from one load, so vectors
+    are never tagged with a version other than the one that produced them.
+    """
+    saved = load_vocabulary()
+    if saved is None:
+        return None
+    return KeywordVocabulary(build_vectorizer(saved.terms, saved.idf), saved.version)
+
+
+def read_corpus(paths: Iterable[str]) -> Iterator[str]:
+    """Yield documents from .txt files (one per file), .jsonl files ("text" field per line) or directories"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                yield from read_corpus(os.path.join(root, name) for name in sorted(files))
+        elif path.endswith(".jsonl"):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)["text"]
+        elif path.endswith(".txt"):
+            with open(path, encoding="utf-8", errors="ignore") as f:
+                yield f.read()
+
+
+def _batches(docs: Iterable[str], size: int) -> Iterator[List[str]]:
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def fit_vocabulary(docs: Iterable[str], path: str = VOCAB_DIR, incremental: bool = False) -> Tuple[int, int]:
+    """Fit (or with incremental=True, extend) the saved vocabulary. Returns (n_docs, n_terms)."""
+    from services.keywordana import preprocess_documents
+
+    terms, df, n_docs = [], np.zeros(0, dtype=np.int64), 0
+    if incremental:
+        saved = load_vocabulary(path, mmap=False)
+        if saved is not None:
+            terms, df, n_docs = saved.terms, saved.df, saved.n_docs
+
+    for batch in _batches(docs, FIT_BATCH_SIZE):
+        cleaned = [" ".join(tokens) for tokens in preprocess_documents(batch)]
+        new_terms, new_df, new_docs = count_document_frequencies(cleaned)
+        terms, df = merge_document_frequencies(terms, df, new_terms, new_df)
+        n_docs += new_docs
+
+    if not terms:
+        raise ValueError("Corpus is empty, nothing to fit")
+    save_vocabulary(terms, df, n_docs, path)
+    return n_docs, len(terms)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Fit the keyword analyzer TF-IDF vocabulary")
+    parser.add_argument("command", choices=["fit", "update"], help="fit from scratch or add documents to the saved vocabulary")
+    parser.add_argument("paths", nargs="+", help=".txt / .jsonl files or directories of job descriptions and resumes")
+    parser.add_argument("--dir", default=VOCAB_DIR, help="vocabulary directory")
+    args = parser.parse_args(argv)
+
+    n_docs, n_terms = fit_vocabulary(read_corpus(args.paths), args.dir, incremental=args.command == "update")
+    print(f"Saved vocabulary to {args.dir}: {n_docs} documents, {n_terms} terms")
+
+
+if __name__ == "__main__":
+    main()
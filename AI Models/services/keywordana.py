@@ -4,35 +4,138 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.pipeline import Pipeline
 import re
 from sklearn.base import BaseEstimator, TransformerMixin
+from typing import Iterable, List, Optional, Tuple
+from pydantic import BaseModel, Field
+from scipy import sparse
 import spacy
+from services.keyword_vocab import get_keyword_vocabulary
+from services.document_cache import CachedDocument, DocumentCache, document_key
+from services.components import component
 
 app = FastAPI()
-nlp = spacy.load("en_core_web_sm")
+document_cache = DocumentCache()
+
+
+@component("spacy", preload=True)
+def get_nlp():
+    """The English spaCy pipeline shared by every service"""
+    return spacy.load("en_core_web_sm")
+
+
+PUNC = '\n\n \n\n\n!"-#$%&()--.*+,-/:;<=>?@[\\]^_`{|}~\t\n '
+PIPE_BATCH_SIZE = 64
+MAX_BATCH_RESUMES = 1000
+
+class BatchResume(BaseModel):
+    id: str
+    text: str
+
+class BatchKeywordRequest(BaseModel):
+    jd_text: str
+    resumes: List[BatchResume] = Field(..., min_length=1, max_length=MAX_BATCH_RESUMES)
+    top_k: Optional[int] = Field(None, ge=1)
+
+def _clean_tokens(doc) -> List[str]:
+    """Drop stop words, punctuation and whitespace from a tokenized doc"""
+    return [
+        token.lower_ for token in doc
+        if not token.is_stop and not token.is_space and token.text not in PUNC
+    ]
+
+def preprocess_documents(texts: Iterable[str]) -> List[List[str]]:
+    """
+    Tokenize every document in a single batched pass and return the cleaned tokens.
+    Stop words and punctuation are lexical attributes, so the tagger, parser
+    and NER are skipped and only the tokenizer runs.
+    """
+    return [_clean_tokens(doc) for doc in get_nlp().tokenizer.pipe(texts, batch_size=PIPE_BATCH_SIZE)]
+
+def vectorize_documents(token_docs: List[List[str]]):
+    """
+    TF-IDF vectors for preprocessed documents. Uses the pre-fitted vocabulary when
+    one is saved, otherwise falls back to fitting on the documents themselves.
+    """
+    texts = [" ".join(tokens) for tokens in token_docs]
+    vocabulary = get_keyword_vocabulary()
+    if vocabulary is not None:
+        return vocabulary.vectorizer.transform(texts)
+    return TfidfVectorizer().fit_transform(texts)
+
+def analyze_documents(texts: List[str]) -> Tuple[List[List[str]], sparse.csr_matrix]:
+    """
+    Cleaned tokens and TF-IDF vectors for each document, served from the document
+    cache where possible. Only cache misses are tokenized, in one batch, and vectors
+    are only cached when they come from the pre-fitted vocabulary.
+    """
+    keys = [document_key(text) for text in texts]
+    entries = [document_cache.get(key) for key in keys]
+
+    missing = {}
+    for i, entry in enumerate(entries):
+        if entry is None:
+            missing.setdefault(keys[i], []).append(i)
+    if missing:
+        first_texts = [texts[positions[0]] for positions in missing.values()]
+        for positions, tokens in zip(missing.values(), preprocess_documents(first_texts)):
+            entry = CachedDocument(tokens=tokens)
+            for i in positions:
+                entries[i] = entry
+
+    token_docs = [entry.tokens for entry in entries]
+    vocabulary = get_keyword_vocabulary()
+    if vocabulary is None:
+        for key in missing:
+            document_cache.put(key, entries[missing[key][0]])
+        return token_docs, TfidfVectorizer().fit_transform([" ".join(tokens) for tokens in token_docs])
+
+    # Entries from another vocabulary, including disk-tier entries written by workers
+    # running an older or newer one, are re-vectorized rather than stacked
+    stale = [
+        i for i, entry in enumerate(entries)
+        if entry.vector is None
+        or entry.vocabulary != vocabulary.version
+        or entry.vector.shape[1] != vocabulary.n_features
+    ]
+    if stale:
+        vectors = vocabulary.vectorizer.transform([" ".join(token_docs[i]) for i in stale])
+        for row, i in enumerate(stale):
+            entries[i] = CachedDocument(tokens=token_docs[i], vector=vectors[row], vocabulary=vocabulary.version)
+            document_cache.put(keys[i], entries[i])
+    return token_docs, sparse.vstack([entry.vector for entry in entries], format="csr")
+
+def score_resumes(jd_text: str, resume_texts: List[str]) -> List[dict]:
+    """
+    Score many resumes against one job description in a single vectorized pass.
+    Uncached documents go through one nlp.pipe batch, then one sparse matrix product;
+    rows are L2-normalized, so the dot product is the cosine similarity.
+    """
+    (jd_tokens, *resume_tokens), matrix = analyze_documents([jd_text, *resume_texts])
+    similarities = (matrix[1:] @ matrix[0].T).toarray().ravel()
+
+    jd_keywords = set(jd_tokens)
+    results = []
+    for tokens, similarity in zip(resume_tokens, similarities):
+        resume_keywords = set(tokens)
+        results.append({
+            "Resume Match Score": round(float(similarity) * 100, 2),
+            "Matching Keywords": sorted(jd_keywords.intersection(resume_keywords)),
+            "Missing Keywords": sorted(jd_keywords.difference(resume_keywords)),
+        })
+    return results
 
 def separate_punc(doc):
-    no_punc = [token.text for token in nlp(doc) if not token.is_stop]
-    no_punc_str = " ".join(no_punc)
-    return [token.text.lower() for token in nlp(no_punc_str) if token.text not in '\n\n \n\n\n!"-#$%&()--.*+,-/:;<=>?@[\\]^_`{|}~\t\n ']
+    return preprocess_documents([doc])[0]
 
 class SpacyPreprocessor(BaseEstimator, TransformerMixin):
     def __init__(self):
-        self.punc = '\n\n \n\n\n!"-#$%&()--.*+,-/:;<=>?@[\\]^_`{|}~\t\n '
+        self.punc = PUNC
 
     def fit(self, X, y=None):
         return self
 
     def transform(self, X):
-        processed_docs = []
-        for doc in X:
-            tokens = [token.text for token in nlp(doc) if not token.is_stop]
-            no_punc_str = " ".join(tokens)
-            tokens_cleaned = [
-                token.text.lower() for token in nlp(no_punc_str)
-                if token.text not in self.punc
-            ]
-            processed_docs.append(" ".join(tokens_cleaned))
-        return processed_docs
-    
+        return [" ".join(tokens) for tokens in preprocess_documents(X)]
+
 pipeline = Pipeline(
     [
         ("preprocess",SpacyPreprocessor()),
@@ -0,0 +1,293 @@
+import asyncio
+import json
+import os
+import time
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+import openai
+import xxhash
+from dotenv import load_dotenv
+from google.api_core import exceptions as google_exceptions
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.prompts import BasePromptTemplate
+from openai import AsyncOpenAI
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+
+from services.components import component
+from services.llm_limits import llm_slot
+from services.metrics import LLM_IN_FLIGHT, LLM_REQUEST_SECONDS, LLM_SLOT_WAIT_SECONDS, record_llm_usage
+
+if TYPE_CHECKING:
+    # Each LangChain provider package takes about a second to import; loaded on first use
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from langchain_openai import ChatOpenAI
+
+load_dotenv()
+
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 30))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", 5))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 100))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", 20))
+LLM_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", 60))
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+# host:port of a Gemini-compatible gRPC endpoint, e.g. the fake provider used by the load benchmark
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT") or None
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+LLM_HTTP2 = HTTP2_AVAILABLE and os.getenv("LLM_HTTP2", "1") == "1"
+LLM_SINGLE_FLIGHT = os.getenv("LLM_SINGLE_FLIGHT", "1") == "1"
+
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    httpx.TransportError,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+)
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_async_http_client() -> httpx.AsyncClient:
+    """Process-wide keep-alive connection pool for async provider calls"""
+    return httpx.AsyncClient(http2=LLM_HTTP2, timeout=_timeout(), limits=_limits())
+
+
+@lru_cache(maxsize=1)
+def get_http_client() -> httpx.Client:
+    """Process-wide keep-alive connection pool for the few synchronous callers"""
+    return httpx.Client(http2=LLM_HTTP2, timeout=_timeout(), limits=_limits())
+
+
+def _openai_api_key() -> str:
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY environment variable is required")
+    return api_key
+
+
+@component("openai_client")
+def get_openai_client() -> AsyncOpenAI:
+    """Shared AsyncOpenAI client. Retries are handled by call_llm, not the SDK."""
+    return AsyncOpenAI(
+        api_key=_openai_api_key(),
+        base_url=OPENAI_BASE_URL,
+        http_client=get_async_http_client(),
+        timeout=LLM_TIMEOUT_SECONDS,
+        max_retries=0,
+    )
+
+
+class UsageCallback(BaseCallbackHandler):
+    """Counts the tokens (and estimated cost) of every LangChain call made on a chat model"""
+
+    def __init__(self, provider: str, model: str):
+        self.provider = provider
+        self.model = model
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+        if input_tokens or output_tokens:
+            record_llm_usage(self.provider, self.model, input_tokens, output_tokens)
+
+
+def record_response_usage(provider: str, response: Any) -> None:
+    """Token counts of a raw OpenAI SDK response (or final stream chunk), if it reports them"""
+    usage = getattr(response, "usage", None)
+    if usage is not None and hasattr(usage, "prompt_tokens"):
+        record_llm_usage(provider, getattr(response, "model", None) or "unknown", usage.prompt_tokens, usage.completion_tokens)
+
+
+@lru_cache(maxsize=None)
+def get_chat_openai(model: str, temperature: float) -> "ChatOpenAI":
+    """Shared LangChain OpenAI chat model on the pooled HTTP clients"""
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        api_key=_openai_api_key(),
+        base_url=OPENAI_BASE_URL,
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client(),
+        timeout=LLM_TIMEOUT_SECONDS,
+        max_retries=0,
+        callbacks=[UsageCallback("openai", model)],
+    )
+
+
+@lru_cache(maxsize=None)
+def get_chat_gemini(model: str, temperature: float, max_output_tokens: int) -> "ChatGoogleGenerativeAI":
+    """Shared Gemini chat model; its gRPC channel is created once and reused"""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(
+        model=model,
+        temperature=temperature,
+        api_key=os.getenv("GENAI_API_KEY"),
+        max_output_tokens=max_output_tokens,
+        request_timeout=LLM_TIMEOUT_SECONDS,
+        max_retries=1,  # a single attempt, call_llm owns retries
+        client_options={"api_endpoint": GEMINI_API_ENDPOINT} if GEMINI_API_ENDPOINT else None,
+        callbacks=[UsageCallback("gemini", model)],
+    )
+
+
+async def _call_with_retries(provider: str, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+    async for attempt in AsyncRetrying(
+        retry=retry_if_exception_type(RETRYABLE_ERRORS),
+        stop=stop_after_attempt(LLM_MAX_RETRIES + 1),
+        wait=wait_random_exponential(multiplier=0.5, max=8),
+        reraise=True,
+    ):
+        with attempt:
+            waiting = time.perf_counter()
+            async with llm_slot(provider):
+                LLM_SLOT_WAIT_SECONDS.observe(time.perf_counter() - waiting, provider=provider)
+                LLM_IN_FLIGHT.inc(provider=provider)
+                try:
+                    result = await fn(*args, **kwargs)
+                finally:
+                    LLM_IN_FLIGHT.dec(provider=provider)
+                record_response_usage(provider, result)
+                return result
+
+
+class _Flight:
+    """One in-flight provider call and the number of callers awaiting it"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+        self.abandoned = False
+
+
+_flights: Dict[str, _Flight] = {}
+single_flight_stats = {"calls": 0, "coalesced": 0}
+
+
+def _jsonable(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return repr(value)
+
+
+def _request_identity(fn: Callable[..., Awaitable[Any]], args: tuple) -> tuple:
+    """What a call is made on, and its remaining arguments"""
+    target = getattr(fn, "__self__", None)
+    steps = getattr(target, "steps", None)
+    if steps and isinstance(steps[0], BasePromptTemplate) and args and isinstance(args[0], dict):
+        # A prompt | model | parser chain, often rebuilt per request around the same shared
+        # model and parser objects: identify it by the rendered prompt and those objects.
+        # They stay alive while a flight runs, so their ids cannot be reused meanwhile.
+        rendered = steps[0].invoke(args[0]).to_string()
+        return [rendered, [(type(step).__qualname__, id(step)) for step in steps[1:]]], args[1:]
+    return id(target), args
+
+
+def request_key(provider: str, fn: Callable[..., Awaitable[Any]], args: tuple, kwargs: dict) -> Optional[str]:
+    """
+    Hash identifying a provider request: the fully rendered prompt (or the client the
+    call is bound to and its messages) plus the call's parameters.
+    None if the request cannot be serialized.
+    """
+    try:
+        target, args = _request_identity(fn, args)
+        payload = json.dumps(
+            [provider, id(asyncio.get_running_loop()), target, getattr(fn, "__qualname__", repr(fn)), args, kwargs],
+            sort_keys=True,
+            default=_jsonable,
+        )
+    except (TypeError, ValueError, KeyError):
+        return None
+    return xxhash.xxh3_128_hexdigest(payload.encode("utf-8"))
+
+
+async def call_llm(provider: str, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+    """
+    Await a provider call while holding one of the provider's concurrency slots,
+    retrying transient failures with jittered exponential backoff.
+
+    Identical concurrent requests are coalesced (single-flight): callers with the
+    same request_key await one shared call. The call is cancelled only once every
+    caller waiting on it has been cancelled.
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        result = await _single_flight(provider, fn, *args, **kwargs)
+        outcome = "ok"
+        return result
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, provider=provider, outcome=outcome)
+
+
+async def _single_flight(provider: str, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+    key = request_key(provider, fn, args, kwargs) if LLM_SINGLE_FLIGHT else None
+    if key is None:
+        return await _call_with_retries(provider, fn, *args, **kwargs)
+
+    flight = _flights.get(key)
+    if flight is None or flight.abandoned or flight.task.cancelled():
+        # Never join a cancelled flight: start a fresh one in its place
+        flight = _Flight(asyncio.create_task(_call_with_retries(provider, fn, *args, **kwargs)))
+        _flights[key] = flight
+        flight.task.add_done_callback(lambda _, flight=flight: _forget(key, flight))
+        single_flight_stats["calls"] += 1
+    else:
+        single_flight_stats["coalesced"] += 1
+
+    flight.waiters += 1
+    try:
+        return await asyncio.shield(flight.task)
+    finally:
+        flight.waiters -= 1
+        if flight.waiters == 0 and not flight.task.done():
+            flight.abandoned = True
+            _forget(key, flight)
+            flight.task.cancel()
+
+
+def _forget(key: str, flight: _Flight) -> None:
+    # A newer flight may already hold the key
+    if _flights.get(key) is flight:
+        del _flights[key]
+
+
+async def close_clients() -> None:
+    """Close the shared connection pools on shutdown"""
+    if get_async_http_client.cache_info().currsize:
+        await get_async_http_client().aclose()
+    if get_http_client.cache_info().currsize:
+        get_http_client().close()
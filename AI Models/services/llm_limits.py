@@ -0,0 +1,25 @@
+import asyncio
+import os
+from typing import Dict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Maximum number of in-flight LLM calls per provider, per worker process
+PROVIDER_CONCURRENCY = {
+    "openai": int(os.getenv("OPENAI_MAX_CONCURRENCY", 32)),
+    "gemini": int(os.getenv("GEMINI_MAX_CONCURRENCY", 16)),
+}
+
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def llm_slot(provider: str) -> asyncio.Semaphore:
+    """
+    Semaphore bounding concurrent calls to one provider. Use as
+    `async with llm_slot("openai"): await model.ainvoke(...)`.
+    """
+    if provider not in _semaphores:
+        _semaphores[provider] = asyncio.Semaphore(PROVIDER_CONCURRENCY.get(provider, 16))
+    return _semaphores[provider]
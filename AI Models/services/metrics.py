@@ -0,0 +1,282 @@
+import bisect
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# USD per million (input, output) tokens, matched on the longest model name prefix.
+# LLM_PRICES='{"gpt-4o-mini": [0.15, 0.6]}' overrides or adds entries.
+LLM_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gemini-2.0-flash": (0.10, 0.40),
+}
+LLM_PRICES.update({model: tuple(price) for model, price in json.loads(os.getenv("LLM_PRICES", "{}")).items()})
+
+# A collector returns (name, type, help, [(labels, value)]) for values read at scrape time
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    @abstractmethod
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        """(sample name, labels, value) for every sample of the metric"""
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield self.name, dict(zip(self.labels, key)), value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (per-bucket counts, the last one for +Inf; sum)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            values = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        for key, counts, total in values:
+            labels = dict(zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class MetricsRegistry:
+    """
+    Process-local metrics rendered in the Prometheus text format. Instruments
+    (counters, gauges, histograms) are updated as things happen; collectors read
+    the stats the caches and pools already keep, at scrape time. With several
+    workers every process reports its own values, as Prometheus expects.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def _register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def collector(self, function: Callable[[], Iterable[Family]]) -> Callable[[], Iterable[Family]]:
+        """Decorator registering a function that reports metric families at scrape time"""
+        self._collectors.append(function)
+        return function
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for name, labels, value in metric.samples())
+        for collect in self._collectors:
+            try:
+                families = list(collect())
+            except Exception:
+                # One failing stats() must not break the whole scrape
+                continue
+            for name, kind, help, samples in families:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+REQUEST_SECONDS = metrics.histogram("refnet_request_seconds", "HTTP request latency", ("method", "route", "status"))
+REQUESTS_IN_PROGRESS = metrics.gauge("refnet_requests_in_progress", "HTTP requests being served")
+STAGE_SECONDS = metrics.histogram("refnet_stage_seconds", "Time spent in one stage of a request", ("route", "stage"))
+LLM_REQUEST_SECONDS = metrics.histogram(
+    "refnet_llm_request_seconds", "Provider call latency, including retries and slot waits", ("provider", "outcome")
+)
+LLM_SLOT_WAIT_SECONDS = metrics.histogram(
+    "refnet_llm_slot_wait_seconds", "Time a provider call waited for a concurrency slot", ("provider",)
+)
+LLM_IN_FLIGHT = metrics.gauge("refnet_llm_in_flight", "Provider calls holding a concurrency slot", ("provider",))
+LLM_TOKENS = metrics.counter("refnet_llm_tokens_total", "Tokens sent to and received from each model", ("provider", "model", "direction"))
+LLM_COST = metrics.counter("refnet_llm_cost_usd_total", "Estimated spend per model, from LLM_PRICES", ("provider", "model"))
+
+
+def model_price(model: str) -> Optional[Tuple[float, float]]:
+    matches = [name for name in LLM_PRICES if model.startswith(name)]
+    return LLM_PRICES[max(matches, key=len)] if matches else None
+
+
+def record_llm_usage(provider: str, model: str, input_tokens: int, output_tokens: int) -> None:
+    LLM_TOKENS.inc(input_tokens, provider=provider, model=model, direction="input")
+    LLM_TOKENS.inc(output_tokens, provider=provider, model=model, direction="output")
+    price = model_price(model)
+    if price is not None:
+        LLM_COST.inc((input_tokens * price[0] + output_tokens * price[1]) / 1e6, provider=provider, model=model)
+
+
+class RequestTimings:
+    """Stages timed while serving one request"""
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.stages: List[Tuple[str, float]] = []
+
+    @property
+    def route(self) -> str:
+        # The router stores the matched route in the scope; its path template keeps label values bounded
+        route = self.scope.get("route")
+        return getattr(route, "path", "unmatched")
+
+    def server_timing(self, total: float) -> str:
+        durations: Dict[str, float] = {}
+        for name, seconds in self.stages:
+            durations[name] = durations.get(name, 0.0) + seconds
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in durations.items()]
+        return ", ".join([*entries, f"total;dur={total * 1000:.1f}"])
+
+
+_request: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Time a block as one stage of the current request, e.g. `with stage("extract"): ...`.
+    Stages may overlap (concurrent gates) and repeat (batches); outside a request
+    they are recorded without a route.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        timings = _request.get()
+        STAGE_SECONDS.observe(seconds, route=timings.route if timings else "", stage=name)
+        if timings is not None:
+            timings.stages.append((name, seconds))
+
+
+class MetricsMiddleware:
+    """
+    Record the latency of every HTTP request by route template and status. With
+    server_timing on, responses carry a Server-Timing header listing the stages
+    finished before the headers were sent (all of them, unless the response streams).
+    """
+
+    def __init__(self, app, server_timing: bool = SERVER_TIMING):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = RequestTimings(scope)
+        token = _request.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    header = timings.server_timing(time.perf_counter() - start).encode("latin-1")
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header)]}
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+            _request.reset(token)
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start, method=scope["method"], route=timings.route, status=status
+            )
@@ -0,0 +1,169 @@
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.embedding_index import embed_texts
+
+CHAT_CACHE_TTL_SECONDS = float(os.getenv("CHAT_CACHE_TTL_SECONDS", 6 * 60 * 60))
+# Unset: answers are only reused for the same normalized question. Averaged word
+# vectors score questions that differ in one word ("junior" / "senior") above 0.95,
+# so a threshold should only be set together with a sentence encoder tested on it.
+CHAT_CACHE_SIMILARITY = float(os.getenv("CHAT_CACHE_SIMILARITY")) if os.getenv("CHAT_CACHE_SIMILARITY") else None
+
+_NON_WORD = re.compile(r"[^\w\s+#]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(text: str) -> str:
+    """Lowercase, drop punctuation (keeping the + and # of C++ / C#) and collapse whitespace"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return _WHITESPACE.sub(" ", _NON_WORD.sub(" ", text)).strip()
+
+
+@lru_cache(maxsize=1024)
+def _embed_question(question: str) -> np.ndarray:
+    # A miss embeds the question on get and again on put; this makes the second one free
+    vector = embed_texts([question])[0]
+    vector.setflags(write=False)
+    return vector
+
+
+class SemanticResponseCache:
+    """
+    Bounded LRU cache of chatbot answers keyed on the normalized question.
+
+    A lookup tries the exact normalized text. With a similarity threshold it then
+    tries the cached question whose embedding is most similar, accepting it at or
+    above the threshold; without one nothing is embedded.
+    Entries expire after the TTL. Vectors live in one preallocated matrix, one row
+    per entry, so a semantic lookup is a single matrix-vector product.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float = CHAT_CACHE_TTL_SECONDS,
+        threshold: Optional[float] = CHAT_CACHE_SIMILARITY,
+        embed: Callable[[str], np.ndarray] = _embed_question,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.embed = embed
+        # normalized question -> (response, created_at, matrix row)
+        self._entries: "OrderedDict[str, Tuple[str, float, int]]" = OrderedDict()
+        self._vectors: Optional[np.ndarray] = None
+        self._row_keys: List[Optional[str]] = [None] * max_entries
+        self._free_rows = list(range(max_entries - 1, -1, -1))
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, key: str) -> None:
+        _, _, row = self._entries.pop(key)
+        self._row_keys[row] = None
+        self._free_rows.append(row)
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return now - created_at > self.ttl_seconds
+
+    def _lookup(self, key: str, vector: Optional[np.ndarray], now: float) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if not self._expired(entry[1], now):
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry[0]
+            self._drop(key)
+            self.expirations += 1
+        if vector is None or not self._entries:
+            return None
+        scores = self._vectors @ vector
+        for row in np.argsort(-scores):
+            if scores[row] < self.threshold:
+                break
+            match = self._row_keys[row]
+            if match is None:
+                continue
+            response, created_at, _ = self._entries[match]
+            if self._expired(created_at, now):
+                self._drop(match)
+                self.expirations += 1
+                continue
+            self._entries.move_to_end(match)
+            self.semantic_hits += 1
+            return response
+        return None
+
+    def get(self, question: str) -> Optional[str]:
+        """A cached answer to this question (or with a threshold, a near-identical one)"""
+        key = normalize_question(question)
+        if not key or self.max_entries <= 0:
+            return None
+        now = time.time()
+        with self._lock:
+            response = self._lookup(key, None, now)
+            if response is not None:
+                return response
+            if not self._entries or self.threshold is None:
+                self.misses += 1
+                return None
+        vector = self.embed(key)
+        with self._lock:
+            response = self._lookup(key, vector, now)
+            if response is None:
+                self.misses += 1
+            return response
+
+    def put(self, question: str, response: str) -> None:
+        key = normalize_question(question)
+        if not key or self.max_entries <= 0:
+            return
+        vector = self.embed(key) if self.threshold is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if not self._free_rows:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            row = self._free_rows.pop()
+            if vector is not None:
+                if self._vectors is None:
+                    self._vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+                self._vectors[row] = vector
+            self._row_keys[row] = key
+            self._entries[key] = (response, time.time(), row)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "similarity_threshold": self.threshold,
+            }
@@ -1,18 +1,17 @@
 from fastapi import FastAPI, UploadFile, Form
 from fastapi.responses import JSONResponse
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
-from langgraph.graph import StateGraph, END, START
 from typing import TypedDict
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
-import docx2txt
-import fitz  
-import tempfile
 import os
 import asyncio
 from functools import lru_cache
+from services.llm_gateway import get_chat_openai, call_llm
+from services.text_extraction import extract_upload_text, file_extension
+from services.extraction_pool import EXTRACTION_RETRY_AFTER_SECONDS, ExtractionOverloaded
+from services.components import component
+from services.metrics import stage
 
 
 load_dotenv()
@@ -40,8 +39,9 @@ class ResumeState(TypedDict):
 #     api_key=os.getenv("GENAI_API_KEY")               
 # )
 
-llm = ChatOpenAI(model='gpt-4.1-mini-2025-04-14',temperature=0.5)
-structured_llm = llm.with_structured_output(EvaluationSchema)
+@component("evaluation_llm")
+def get_structured_llm():
+    return get_chat_openai('gpt-4.1-mini-2025-04-14', 0.5).with_structured_output(EvaluationSchema)
 
 
 combined_prompt = PromptTemplate(
@@ -62,98 +62,50 @@ Instructions:
 )
 
 
-def evaluate_resume(state: ResumeState):
+async def evaluate_resume(state: ResumeState):
     """Single evaluation function that returns both score and feedback"""
-    result = structured_llm.invoke(
-        combined_prompt.format(
-            job_description=state["job_description"], 
-            resume=state["resume"]
+    with stage("evaluate"):
+        result = await call_llm(
+            "openai",
+            get_structured_llm().ainvoke,
+            combined_prompt.format(
+                job_description=state["job_description"], 
+                resume=state["resume"]
+            )
         )
-    )
     return {
         "score": result.score,
         "feedback": result.feedback
     }
 
 
-graph = StateGraph(ResumeState)
-graph.add_node("evaluate_resume", evaluate_resume)
-graph.add_edge(START, "evaluate_resume")
-graph.add_edge("evaluate_resume", END)
-workflow = graph.compile()
+@component("evaluation_workflow")
+def get_workflow():
+    from langgraph.graph import StateGraph, END, START
 
+    graph = StateGraph(ResumeState)
+    graph.add_node("evaluate_resume", evaluate_resume)
+    graph.add_edge(START, "evaluate_resume")
+    graph.add_edge("evaluate_resume", END)
+    return graph.compile()
 
-def extract_text_from_pdf(file_path: str) -> str:
-    """Optimized PDF text extraction"""
-    text = ""
-    try:
-        with fitz.open(file_path) as doc:
-            
-            max_pages = min(3, len(doc))
-            for page_num in range(max_pages):
-                page = doc[page_num]
-                text += page.get_text("text")
-        return text.strip()
-    except Exception as e:
-        raise ValueError(f"Error extracting PDF text: {str(e)}")
 
-def extract_text_from_docx(file_path: str) -> str:
-    """Optimized DOCX text extraction"""
-    try:
-        text = docx2txt.process(file_path)
-        return text.strip()
-    except Exception as e:
-        raise ValueError(f"Error extracting DOCX text: {str(e)}")
+RESUME_EXTENSIONS = (".pdf", ".doc", ".docx")
 
-def extract_resume_text(file: UploadFile) -> str:
-    """Optimized resume text extraction with better error handling"""
+async def extract_resume_text(file: UploadFile) -> str:
+    """Extract resume text from the in-memory upload"""
     if not file or not file.filename:
         raise ValueError("No file provided")
-    
-   
-    if hasattr(file, 'size') and file.size > 10 * 1024 * 1024:
-        raise ValueError("File too large. Please upload files smaller than 10MB.")
-    
-    
-    file_ext = os.path.splitext(file.filename)[1].lower()
-    
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp:
-            content = file.file.read()
-            tmp.write(content)
-            tmp_path = tmp.name
-        
-        
-        file.file.seek(0)
-        
-        
-        if file_ext == ".pdf":
-            text = extract_text_from_pdf(tmp_path)
-        elif file_ext in [".doc", ".docx"]:
-            text = extract_text_from_docx(tmp_path)
-        else:
-            raise ValueError("Unsupported file type. Please upload PDF or DOCX files only.")
-        
-        
-        try:
-            os.unlink(tmp_path)
-        except:
-            pass  
-            
-        
-        if not text or len(text.strip()) < 50:
-            raise ValueError("Unable to extract sufficient text from the file. Please check the file format.")
-            
-        return text
-        
-    except Exception as e:
-       
-        try:
-            if 'tmp_path' in locals():
-                os.unlink(tmp_path)
-        except:
-            pass
-        raise e
+
+    if file_extension(file.filename) not in RESUME_EXTENSIONS:
+        raise ValueError("Unsupported file type. Please upload PDF or DOCX files only.")
+
+    text = await extract_upload_text(file, allowed=RESUME_EXTENSIONS)
+
+    if not text or len(text.strip()) < 50:
+        raise ValueError("Unable to extract sufficient text from the file. Please check the file format.")
+
+    return text
 
 
 @app.post("/analyze_resume")
@@ -178,7 +130,7 @@ async def analyze_resume(
     
     try:
         
-        resume_text = extract_resume_text(resume_file)
+        resume_text = await extract_resume_text(resume_file)
         
         
         max_resume_length = 3000
@@ -191,7 +143,7 @@ async def analyze_resume(
             job_description = job_description[:max_jd_length] + "..."
         
        
-        result = workflow.invoke({
+        result = await get_workflow().ainvoke({
             "job_description": job_description.strip(), 
             "resume": resume_text
         })
@@ -202,6 +154,12 @@ async def analyze_resume(
             "status": "success"
         })
         
+    except ExtractionOverloaded as e:
+        return JSONResponse(
+            content={"error": str(e)},
+            status_code=503,
+            headers={"Retry-After": str(EXTRACTION_RETRY_AFTER_SECONDS)}
+        )
     except ValueError as ve:
         return JSONResponse(
             content={"error": str(ve)}, 
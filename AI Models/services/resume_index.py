@@ -0,0 +1,176 @@
+import heapq
+import math
+import os
+import threading
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import ormsgpack
+
+from services.keywordana import preprocess_documents
+from services.index_owner import index_owner
+
+RESUME_INDEX_PATH = os.getenv("RESUME_INDEX_PATH", os.path.join("artifacts", "resume_index.msgpack"))
+SNAPSHOT_VERSION = 1
+
+
+class ResumeIndex:
+    """
+    Inverted index over resume tokens answering top-K queries for a job description.
+
+    Postings hold the cosine-normalized sublinear TF of each term in each resume.
+    The IDF factor is applied at query time from the live document frequencies, so
+    adding or removing a resume never rewrites other postings. Queries use max-score
+    pruning: query terms are ordered by their score upper bound, and once the
+    upper bounds of the weakest terms cannot beat the current K-th score, resumes
+    that only contain those terms are never scored.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._max_weight: Dict[str, float] = {}
+        self._doc_tf: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_tf)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_tf
+
+    @staticmethod
+    def _tf_weights(term_freqs: Dict[str, int]) -> Dict[str, float]:
+        weights = {term: 1.0 + math.log(tf) for term, tf in term_freqs.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        return {term: w / norm for term, w in weights.items()}
+
+    def _idf(self, term: str) -> float:
+        n_docs = len(self._doc_tf)
+        return math.log((1 + n_docs) / (1 + len(self._postings.get(term, ())))) + 1.0
+
+    def add(self, doc_id: str, tokens: List[str]) -> None:
+        """Index a resume, replacing any previous version with the same id"""
+        self._add_term_freqs(doc_id, dict(Counter(tokens)))
+
+    def _add_term_freqs(self, doc_id: str, term_freqs: Dict[str, int]) -> None:
+        with self._lock:
+            if doc_id in self._doc_tf:
+                self.remove(doc_id)
+            self._doc_tf[doc_id] = term_freqs
+            for term, weight in self._tf_weights(term_freqs).items():
+                self._postings.setdefault(term, {})[doc_id] = weight
+                if weight > self._max_weight.get(term, 0.0):
+                    self._max_weight[term] = weight
+
+    def remove(self, doc_id: str) -> bool:
+        with self._lock:
+            term_freqs = self._doc_tf.pop(doc_id, None)
+            if term_freqs is None:
+                return False
+            for term in term_freqs:
+                postings = self._postings[term]
+                weight = postings.pop(doc_id)
+                if not postings:
+                    del self._postings[term]
+                    del self._max_weight[term]
+                elif weight >= self._max_weight[term]:
+                    self._max_weight[term] = max(postings.values())
+            return True
+
+    def search(self, tokens: List[str], k: int = 10) -> List[Tuple[str, float]]:
+        """Top-k resumes for the query tokens as (doc_id, score) pairs, best first"""
+        with self._lock:
+            query = {
+                term: (1.0 + math.log(tf)) * self._idf(term)
+                for term, tf in Counter(tokens).items() if term in self._postings
+            }
+            if not query or k <= 0:
+                return []
+            query_norm = math.sqrt(sum(w * w for w in query.values()))
+            # Per-term contribution is query weight * idf * posting weight
+            factors = {term: weight / query_norm * self._idf(term) for term, weight in query.items()}
+            terms = sorted(factors, key=lambda term: factors[term] * self._max_weight[term])
+            upper = [factors[term] * self._max_weight[term] for term in terms]
+            # prefix[i] bounds the score a resume can get from terms[:i + 1]
+            prefix = list(upper)
+            for i in range(1, len(prefix)):
+                prefix[i] += prefix[i - 1]
+
+            heap: List[Tuple[float, str]] = []
+            threshold = 0.0
+            scored = set()
+            for i in range(len(terms) - 1, -1, -1):
+                if len(heap) == k and prefix[i] <= threshold:
+                    break
+                for doc_id in self._postings[terms[i]]:
+                    if doc_id in scored:
+                        continue
+                    scored.add(doc_id)
+                    score = 0.0
+                    for j in range(len(terms) - 1, -1, -1):
+                        if len(heap) == k and score + prefix[j] <= threshold:
+                            break
+                        weight = self._postings[terms[j]].get(doc_id)
+                        if weight is not None:
+                            score += factors[terms[j]] * weight
+                    else:
+                        if len(heap) < k:
+                            heapq.heappush(heap, (score, doc_id))
+                        elif score > threshold:
+                            heapq.heapreplace(heap, (score, doc_id))
+                        if len(heap) == k:
+                            threshold = heap[0][0]
+            return [(doc_id, score) for score, doc_id in sorted(heap, reverse=True)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "documents": len(self._doc_tf),
+                "terms": len(self._postings),
+                "postings": sum(len(postings) for postings in self._postings.values()),
+            }
+
+    def snapshot(self, path: str = RESUME_INDEX_PATH) -> None:
+        """Write the index to disk atomically"""
+        with self._lock:
+            raw = ormsgpack.packb({"version": SNAPSHOT_VERSION, "docs": self._doc_tf})
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            f.write(raw)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def restore(cls, path: str = RESUME_INDEX_PATH) -> "ResumeIndex":
+        """Load a snapshot, or return an empty index if none exists"""
+        index = cls()
+        if not os.path.exists(path):
+            return index
+        with open(path, "rb") as f:
+            data = ormsgpack.unpackb(f.read())
+        if data.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported resume index snapshot version: {data.get('version')}")
+        for doc_id, term_freqs in data["docs"].items():
+            index._add_term_freqs(doc_id, term_freqs)
+        return index
+
+
+resume_index = ResumeIndex.restore()
+
+
+def index_resume(resume_id: str, text: str) -> None:
+    index_owner.require()
+    resume_index.add(resume_id, preprocess_documents([text])[0])
+
+
+def search_resumes(jd_text: str, k: int = 10) -> List[Tuple[str, float]]:
+    index_owner.require()
+    return resume_index.search(preprocess_documents([jd_text])[0], k)
+
+
+def resume_index_text(resume: dict) -> str:
+    """Searchable text built from the fields of a parsed ResumeInfo"""
+    parts = [resume.get("experience") or ""]
+    for field in ("skills", "certifications", "achievements", "projects"):
+        parts.extend(resume.get(field) or [])
+    return "\n".join(parts)
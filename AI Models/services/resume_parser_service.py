@@ -1,31 +1,56 @@
 import os
+import io
 import asyncio
-import aiofiles
-from concurrent.futures import ThreadPoolExecutor
-from functools import lru_cache
-import pdfplumber
+import zipfile
+from functools import lru_cache, partial
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import ChatPromptTemplate
 from langchain.output_parsers import PydanticOutputParser
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from langchain_core.utils.json import parse_json_markdown
+from pydantic import BaseModel, EmailStr, Field, ValidationError, create_model
+from typing import AsyncIterator, Callable, Dict, Optional, List, Tuple
+from services.llm_gateway import get_chat_gemini, call_llm
+from services.text_extraction import (
+    MAX_UPLOAD_BYTES,
+    ExtractedUpload,
+    UploadTooLarge,
+    check_extension,
+    extract_bytes,
+    extract_upload,
+    file_extension,
+)
+from services.extraction_cache import extraction_cache
+from services.extraction_pool import EXTRACTION_RETRY_AFTER_SECONDS, ExtractionOverloaded, extraction_pool
+from services.resume_rules import FIELD_SECTIONS, RuleExtraction, extract_resume_fields
+from services.components import component
+from services.metrics import stage
 
 load_dotenv()
 
-UPLOAD_FOLDER = "uploads"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+PARSER_BATCH_CONCURRENCY = int(os.getenv("PARSER_BATCH_CONCURRENCY", 8))
+PARSER_BATCH_MAX_FILES = int(os.getenv("PARSER_BATCH_MAX_FILES", 500))
+BATCH_EXTRACTION_ATTEMPTS = 3
+# Packed mode: several resumes per Gemini call on batch imports (PARSER_PACK_SIZE=1 disables it)
+PARSER_PACK_SIZE = int(os.getenv("PARSER_PACK_SIZE", 4))
+PARSER_PACK_MAX_CHARS = int(os.getenv("PARSER_PACK_MAX_CHARS", 12000))
+PARSER_PACK_WAIT_SECONDS = float(os.getenv("PARSER_PACK_WAIT_SECONDS", 0.2))
+# llm: Gemini extracts every field; hybrid: rules first, Gemini only for the fields they are unsure of;
+# offline: rules only. With the fallback on, a failed Gemini call is answered from the rules
+# (parse_mode "offline_fallback", and an X-Parse-Mode header on /parser).
+PARSER_MODES = ("llm", "hybrid", "offline")
+RESUME_PARSER_MODE = os.getenv("RESUME_PARSER_MODE", "llm")
+RESUME_PARSER_OFFLINE_FALLBACK = os.getenv("RESUME_PARSER_OFFLINE_FALLBACK", "0") == "1"
 
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash-exp",  
-    temperature=0.1,
-    api_key=os.getenv("GENAI_API_KEY"),
-    
-    max_output_tokens=2048,  
-    max_retries=2,  
-    request_timeout=30,  
-)
+@component("parser_llm")
+def get_parser_llm():
+    return get_chat_gemini("gemini-2.0-flash-exp", 0.1, 2048)
+
+
+@component("packed_parser_llm")
+def get_packed_llm():
+    return get_chat_gemini("gemini-2.0-flash-exp", 0.1, 8192)
+
 
 class ResumeInfo(BaseModel):
     name: str
@@ -40,6 +65,20 @@ class ResumeInfo(BaseModel):
     projects: List[str]
 
 
+RESUME_FIELDS = tuple(ResumeInfo.model_fields)
+
+
+class PackedResumeInfo(ResumeInfo):
+    resume_number: int = Field(description="The number of the resume this entry was extracted from")
+
+
+class PackedResumes(BaseModel):
+    resumes: List[PackedResumeInfo]
+
+
+packing_stats = {"packed_calls": 0, "packed_resumes": 0, "fallbacks": 0}
+
+
 @lru_cache(maxsize=1)
 def get_parser_and_prompt():
     parser = PydanticOutputParser(pydantic_object=ResumeInfo)
@@ -50,24 +89,31 @@ def get_parser_and_prompt():
     return parser, prompt
 
 
-executor = ThreadPoolExecutor(max_workers=2)
+@lru_cache(maxsize=64)
+def get_fields_parser_and_prompt(fields: Tuple[str, ...]):
+    """Parser and prompt asking only for some ResumeInfo fields, with a schema of just those"""
+    model = create_model("ResumeFields", **{name: (ResumeInfo.model_fields[name].annotation, ResumeInfo.model_fields[name]) for name in fields})
+    parser = PydanticOutputParser(pydantic_object=model)
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", "You are an expert resume analyzer. Extract structured information efficiently and concisely."),
+        ("human", "Extract only these fields from the resume excerpt (be concise):\n\n{text}\n\n{format_instructions}")
+    ])
+    return parser, prompt
+
+
+@lru_cache(maxsize=1)
+def get_packed_parser_and_prompt():
+    parser = PydanticOutputParser(pydantic_object=PackedResumes)
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", "You are an expert resume analyzer. Extract structured information efficiently and concisely."),
+        ("human", "Extract info from each of the {count} resumes below (be concise). Return exactly one entry per resume, "
+                  "with resume_number set to the number in the resume's header. Never mix details between resumes.\n\n"
+                  "{resumes}\n\n{format_instructions}")
+    ])
+    return parser, prompt
 
-def extract_pdf_text_sync(file_path: str) -> str:
-    """Synchronous PDF text extraction"""
-    content = []
-    with pdfplumber.open(file_path) as pdf:
-        
-        pages_to_process = min(len(pdf.pages), 3)
-        for i in range(pages_to_process):
-            text = pdf.pages[i].extract_text()
-            if text:
-                content.append(text)
-    return "\n".join(content)
 
-async def extract_pdf_text_async(file_path: str) -> str:
-    """Asynchronous PDF text extraction using thread pool"""
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(executor, extract_pdf_text_sync, file_path)
+SUPPORTED_EXTENSIONS = (".pdf", ".txt")
 
 def truncate_text(text: str, max_chars: int = 4000) -> str:
     """Truncate text to reduce processing time while keeping important info"""
@@ -85,114 +131,392 @@ def truncate_text(text: str, max_chars: int = 4000) -> str:
     else:
         return truncated + "..."
 
-async def save_file_async(file, file_path: str) -> None:
-    """Asynchronously save uploaded file"""
-    async with aiofiles.open(file_path, 'wb') as f:
-        content = await file.read()
-        await f.write(content)
+def _validated(values: dict) -> dict:
+    try:
+        return ResumeInfo.model_validate(values).dict()
+    except ValidationError:
+        # The email is the only field a rule value can fail validation on
+        return ResumeInfo.model_validate({**values, "email": None}).dict()
+
+
+def offline_resume(rules: RuleExtraction, mode: str = "offline") -> dict:
+    """A ResumeInfo built from the rules alone, with every field's confidence"""
+    result = _validated(rules.values)
+    result["confidence"] = {name: rules.confidence[name] for name in RESUME_FIELDS}
+    result["parse_mode"] = mode
+    return result
 
-async def read_text_file_async(file_path: str) -> str:
-    """Asynchronously read text file"""
-    async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
-        return await f.read()
 
-async def parse_resume(file):
+def merge_rules(parsed: dict, rules: RuleExtraction) -> dict:
+    """Confident rule values over the LLM's answer; fields the LLM filled have no confidence"""
+    confident = rules.confident()
+    result = _validated({**parsed, **confident})
+    result["confidence"] = {name: rules.confidence[name] if name in confident else None for name in RESUME_FIELDS}
+    result["parse_mode"] = "hybrid"
+    return result
+
+
+def rules_context(text: str, rules: RuleExtraction, fields: List[str]) -> str:
+    """
+    The part of the resume the LLM needs for these fields: their sections when the
+    rules found all of them (the header for the name), otherwise the whole text
+    """
+    sections = []
+    for name in fields:
+        section = "header" if name == "name" else FIELD_SECTIONS.get(name)
+        if section not in rules.sections:
+            return truncate_text(text)
+        sections.append(section)
+    return truncate_text("\n\n".join(
+        rules.sections[section] if section == "header" else f"{section.upper()}\n{rules.sections[section]}"
+        for section in dict.fromkeys(sections)
+    ))
+
+
+async def _parse_with_llm(text: str) -> dict:
+    parser, prompt = get_parser_and_prompt()
+    chain = prompt | get_parser_llm() | parser
+
+    result = await call_llm("gemini", chain.ainvoke, {
+        "text": truncate_text(text),
+        "format_instructions": parser.get_format_instructions()
+    })
+    return result.dict()
+
+
+async def _parse_hybrid(text: str, rules: RuleExtraction) -> dict:
+    missing = rules.missing(RESUME_FIELDS)
+    if not missing:
+        return merge_rules({}, rules)
+    parser, prompt = get_fields_parser_and_prompt(tuple(missing))
+    chain = prompt | get_parser_llm() | parser
+
+    result = await call_llm("gemini", chain.ainvoke, {
+        "text": rules_context(text, rules, missing),
+        "format_instructions": parser.get_format_instructions()
+    })
+    return merge_rules(result.dict(), rules)
+
+
+def _cache_variant(mode: str) -> str:
+    return "resume" if mode == "llm" else "resume_hybrid"
+
+
+async def parse_extracted(upload: ExtractedUpload, mode: str = RESUME_PARSER_MODE) -> dict:
+    """
+    Structured information from extracted resume text, from the cache when this
+    upload was parsed before. In hybrid mode the rule-based extractor fills the
+    fields it is confident about and Gemini is only asked for the rest, from the
+    sections they live in. Offline (and fallback) results are not cached, so the
+    next request gets a full answer once the provider is back.
+    """
+    with stage("rules"):
+        rules = extract_resume_fields(upload.text) if mode != "llm" else None
+    if mode == "offline":
+        return offline_resume(rules)
+    cached = extraction_cache.get_parsed(upload.key, variant=_cache_variant(mode))
+    if cached is not None:
+        return cached
+    try:
+        with stage("llm"):
+            parsed = await (_parse_with_llm(upload.text) if mode == "llm" else _parse_hybrid(upload.text, rules))
+    except Exception:
+        if not RESUME_PARSER_OFFLINE_FALLBACK:
+            raise
+        return offline_resume(rules or extract_resume_fields(upload.text), "offline_fallback")
+    extraction_cache.put_parsed(upload.key, parsed, variant=_cache_variant(mode))
+    return parsed
+
+
+async def parse_resume(file, mode: str = RESUME_PARSER_MODE):
     """
     Extract structured information from a resume file using Gemini (optimized version).
+    A resume uploaded before is answered from the extraction cache without calling Gemini.
+    """
+    upload = await extract_upload(file, allowed=SUPPORTED_EXTENSIONS)
+    return await parse_extracted(upload, mode)
+
+
+def _belongs_to(resume: ResumeInfo, text: str) -> bool:
+    """Guard against a packed answer attributed to the wrong resume: its name and email must appear in the text"""
+    lowered = text.lower()
+    name_words = resume.name.lower().split()
+    if name_words and name_words[0] not in lowered:
+        return False
+    return resume.email is None or resume.email.lower() in lowered
+
+
+def split_packed_response(content: str, texts: List[str]) -> List[Optional[dict]]:
+    """
+    The parsed resume for each packed text, in order. Entries that are missing,
+    duplicated, fail ResumeInfo validation or do not match their resume are None.
     """
-    file_path = os.path.join(UPLOAD_FOLDER, file.filename)
-    
-    
-    await save_file_async(file, file_path)
-    
     try:
-       
-        if file.filename.lower().endswith(".pdf"):
-            
-            resume_text = await extract_pdf_text_async(file_path)
-        else:
-           
-            resume_text = await read_text_file_async(file_path)
-        
-        
-        resume_text = truncate_text(resume_text)
-        
-        
-        parser, prompt = get_parser_and_prompt()
-        
-       
-        chain = prompt | llm | parser
-        
-        
-        result = await asyncio.get_event_loop().run_in_executor(
-            None, 
-            lambda: chain.invoke({
-                "text": resume_text,
-                "format_instructions": parser.get_format_instructions()
-            })
-        )
-        
-        return result.dict()
-    
-    finally:
-        
+        data = parse_json_markdown(content)
+    except Exception:
+        return [None] * len(texts)
+    entries = data.get("resumes") if isinstance(data, dict) else data
+    by_number: Dict[int, List[dict]] = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if isinstance(entry, dict) and isinstance(entry.get("resume_number"), int):
+            by_number.setdefault(entry.pop("resume_number"), []).append(entry)
+
+    results: List[Optional[dict]] = []
+    for number, text in enumerate(texts, 1):
+        answers = by_number.get(number, [])
+        # A resume number answered twice is ambiguous, so neither answer is used
+        if len(answers) != 1:
+            results.append(None)
+            continue
         try:
-            os.remove(file_path)
-        except:
-            pass  
+            resume = ResumeInfo.model_validate(answers[0])
+        except ValidationError:
+            results.append(None)
+            continue
+        results.append(resume.dict() if _belongs_to(resume, text) else None)
+    return results
 
 
-async def parse_resumes_batch(files: List):
+async def parse_packed(uploads: List[ExtractedUpload]) -> List[Optional[dict]]:
     """
-    Parse multiple resumes concurrently for better throughput.
+    Parse several extracted resumes with one Gemini call, so the system prompt and
+    format instructions are sent once per pack instead of once per resume. Returns
+    the validated result per resume, None where it must be parsed on its own.
     """
-    tasks = [parse_resume(file) for file in files]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    texts = [truncate_text(upload.text) for upload in uploads]
+    resumes = "\n\n".join(f"=== Resume {number} ===\n{text}" for number, text in enumerate(texts, 1))
+    parser, prompt = get_packed_parser_and_prompt()
+    chain = prompt | get_packed_llm()
+
+    message = await call_llm("gemini", chain.ainvoke, {
+        "count": len(texts),
+        "resumes": resumes,
+        "format_instructions": parser.get_format_instructions()
+    })
+    results = split_packed_response(message.content, texts)
+    packing_stats["packed_calls"] += 1
+    packing_stats["packed_resumes"] += sum(parsed is not None for parsed in results)
     return results
 
-async def parse_resume_fast(file):
+
+class ResumePacker:
     """
-    Ultra-fast version with maximum optimizations (may sacrifice some accuracy).
+    Groups extracted resumes arriving from concurrent batch tasks into packs for
+    parse_packed. A pack is sent when it reaches PARSER_PACK_SIZE resumes or
+    PARSER_PACK_MAX_CHARS of text, or PARSER_PACK_WAIT_SECONDS after its first
+    resume arrived. Resumes the packed answer does not validate for are retried
+    with a single-resume call. In hybrid mode resumes the rules fully cover skip
+    the LLM, and confident rule values override the packed answer.
     """
-    file_path = os.path.join(UPLOAD_FOLDER, file.filename)
-    
-   
-    await save_file_async(file, file_path)
-    
-    try:
-       
-        if file.filename.lower().endswith(".pdf"):
-           
-            with pdfplumber.open(file_path) as pdf:
-                if pdf.pages:
-                    resume_text = pdf.pages[0].extract_text() or ""
-                else:
-                    resume_text = ""
+
+    def __init__(
+        self,
+        slots: asyncio.Semaphore,
+        mode: str = RESUME_PARSER_MODE,
+        size: int = PARSER_PACK_SIZE,
+        max_chars: int = PARSER_PACK_MAX_CHARS,
+        wait_seconds: float = PARSER_PACK_WAIT_SECONDS,
+    ):
+        self.slots = slots
+        self.mode = mode
+        self.size = size
+        self.max_chars = max_chars
+        self.wait_seconds = wait_seconds
+        self._pending: List[Tuple[ExtractedUpload, Optional[RuleExtraction], asyncio.Future]] = []
+        self._chars = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+    async def parse(self, upload: ExtractedUpload) -> dict:
+        chars = len(truncate_text(upload.text))
+        if self.mode == "offline" or self.size <= 1 or chars >= self.max_chars:
+            async with self.slots:
+                return await parse_extracted(upload, self.mode)
+        cached = extraction_cache.get_parsed(upload.key, variant=_cache_variant(self.mode))
+        if cached is not None:
+            return cached
+        rules = extract_resume_fields(upload.text) if self.mode == "hybrid" else None
+        if rules is not None and not rules.missing(RESUME_FIELDS):
+            return await parse_extracted(upload, self.mode)
+
+        if self._pending and self._chars + chars > self.max_chars:
+            self._flush()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((upload, rules, future))
+        self._chars += chars
+        if len(self._pending) >= self.size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.wait_seconds, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pack, self._pending, self._chars = self._pending, [], 0
+        if pack:
+            task = asyncio.create_task(self._run(pack))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, pack: List[Tuple[ExtractedUpload, Optional[RuleExtraction], asyncio.Future]]) -> None:
+        results: List[Optional[dict]] = [None] * len(pack)
+        if len(pack) > 1:
+            try:
+                async with self.slots:
+                    results = await parse_packed([upload for upload, _, _ in pack])
+            except Exception:
+                pass
+        await asyncio.gather(*(
+            self._resolve(upload, rules, future, parsed) for (upload, rules, future), parsed in zip(pack, results)
+        ))
+
+    async def _resolve(
+        self, upload: ExtractedUpload, rules: Optional[RuleExtraction], future: asyncio.Future, parsed: Optional[dict]
+    ) -> None:
+        if future.done():
+            return
+        if parsed is None:
+            packing_stats["fallbacks"] += 1
+            try:
+                async with self.slots:
+                    parsed = await parse_extracted(upload, self.mode)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                return
         else:
-            
-            async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
-                resume_text = await f.read(3000)
-        
-       
-        
-      
-        fast_prompt = ChatPromptTemplate.from_messages([
-            ("system", "Extract resume data efficiently. Be brief but complete."),
-            ("human", "Resume text:\n{text}\n\nReturn: {format_instructions}")
-        ])
-        
-        parser, _ = get_parser_and_prompt()
-        chain = fast_prompt | llm | parser
-        
-        result = chain.invoke({
-            "text": resume_text,
-            "format_instructions": parser.get_format_instructions()
-        })
-        
-        return result.dict()
-    
-    finally:
+            if rules is not None:
+                parsed = merge_rules(parsed, rules)
+            extraction_cache.put_parsed(upload.key, parsed, variant=_cache_variant(self.mode))
+        if not future.done():
+            future.set_result(parsed)
+
+    def cancel(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        for task in self._tasks:
+            task.cancel()
+
+
+def _read_zip_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo, max_bytes: int = MAX_UPLOAD_BYTES) -> bytes:
+    # The declared size can lie, so the read itself is bounded too
+    too_large = UploadTooLarge(f"File too large. Please upload files smaller than {max_bytes // (1024 * 1024)}MB.")
+    if info.file_size > max_bytes:
+        raise too_large
+    with archive.open(info) as f:
+        data = f.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise too_large
+    return data
+
+
+def batch_entries(filename: str, data: bytes) -> List[Tuple[str, Callable[[], bytes]]]:
+    """
+    A batch upload as (name, read) pairs: the file itself, or every file inside a
+    zip archive. Archive members are only decompressed when read.
+    """
+    if file_extension(filename) != ".zip":
+        return [(filename, lambda: data)]
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(data))
+    except zipfile.BadZipFile:
+        raise ValueError(f"Not a valid zip archive: {filename}")
+    entries = []
+    for info in archive.infolist():
+        if info.is_dir() or info.filename.startswith("__MACOSX/") or os.path.basename(info.filename).startswith("."):
+            continue
+        entries.append((info.filename, partial(_read_zip_member, archive, info)))
+    return entries
+
+
+async def _extract_for_batch(data: bytes, filename: str) -> ExtractedUpload:
+    # Other requests share the extraction pool, so a full queue is waited out rather than failing the file
+    for attempt in range(BATCH_EXTRACTION_ATTEMPTS):
+        try:
+            return await extract_bytes(data, filename)
+        except ExtractionOverloaded:
+            if attempt == BATCH_EXTRACTION_ATTEMPTS - 1:
+                raise
+            await asyncio.sleep(EXTRACTION_RETRY_AFTER_SECONDS)
+
+
+def batch_resume_id(name: str, key: str) -> str:
+    """
+    Index id of a resume from a batch: its file name plus the start of its content
+    hash, so two candidates' "resume.pdf" do not overwrite each other
+    """
+    return f"{name}#{key[:12]}"
+
+
+async def parse_resumes_batch(
+    entries: List[Tuple[str, Callable[[], bytes]]],
+    concurrency: int = PARSER_BATCH_CONCURRENCY,
+    mode: str = RESUME_PARSER_MODE,
+) -> AsyncIterator[dict]:
+    """
+    Parse many resumes concurrently, yielding one event per file as soon as it
+    finishes: {"type": "result", "file", "resume_id", "cached", "resume"} or {"type": "error",
+    "file", "error"}. Extraction runs at most one file per extraction worker and
+    at most `concurrency` Gemini calls are in flight, so a large batch neither
+    floods the worker pool nor trips provider rate limits. Short resumes are
+    parsed several per call by a ResumePacker.
+    """
+    extract_slots = asyncio.Semaphore(max(1, extraction_pool.workers))
+    packer = ResumePacker(asyncio.Semaphore(concurrency), mode)
+
+    async def parse_entry(name: str, read: Callable[[], bytes]) -> dict:
         try:
-            os.remove(file_path)
-        except:
-            pass
\ No newline at end of file
+            check_extension(name, SUPPORTED_EXTENSIONS)
+            async with extract_slots:
+                data = await asyncio.to_thread(read)
+                upload = await _extract_for_batch(data, name)
+            resume = await packer.parse(upload)
+            return {
+                "type": "result",
+                "file": name,
+                "resume_id": batch_resume_id(name, upload.key),
+                "cached": upload.cached,
+                "resume": resume,
+            }
+        except Exception as e:
+            return {"type": "error", "file": name, "error": str(e) or type(e).__name__}
+
+    tasks = [asyncio.create_task(parse_entry(name, read)) for name, read in entries]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        # The client went away or the stream was closed early
+        for task in tasks:
+            task.cancel()
+        packer.cancel()
+
+async def parse_resume_fast(file):
+    """
+    Ultra-fast version with maximum optimizations (may sacrifice some accuracy).
+    Only the first PDF page or the first 3000 characters of a text file are used.
+    """
+    upload = await extract_upload(file, allowed=SUPPORTED_EXTENSIONS, max_pages=1)
+    cached = extraction_cache.get_parsed(upload.key, variant="resume_fast")
+    if cached is not None:
+        return cached
+    resume_text = upload.text[:3000]
+
+    fast_prompt = ChatPromptTemplate.from_messages([
+        ("system", "Extract resume data efficiently. Be brief but complete."),
+        ("human", "Resume text:\n{text}\n\nReturn: {format_instructions}")
+    ])
+
+    parser, _ = get_parser_and_prompt()
+    chain = fast_prompt | get_parser_llm() | parser
+
+    result = await call_llm("gemini", chain.ainvoke, {
+        "text": resume_text,
+        "format_instructions": parser.get_format_instructions()
+    })
+
+    parsed = result.dict()
+    extraction_cache.put_parsed(upload.key, parsed, variant="resume_fast")
+    return parsed
@@ -0,0 +1,211 @@
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# Fields at or above this confidence are taken from the rules and not asked of the LLM
+RESUME_RULES_MIN_CONFIDENCE = float(os.getenv("RESUME_RULES_MIN_CONFIDENCE", 0.8))
+
+SECTION_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "summary": ("summary", "profile", "objective", "about me", "professional summary", "career objective"),
+    "skills": (
+        "skills", "technical skills", "core skills", "key skills", "skills and tools", "technologies",
+        "tech stack", "core competencies", "tools and technologies",
+    ),
+    "experience": (
+        "experience", "work experience", "professional experience", "employment history",
+        "work history", "employment", "internships", "internship experience",
+    ),
+    "education": ("education", "academic background", "academics", "education and training"),
+    "projects": ("projects", "personal projects", "key projects", "academic projects", "selected projects"),
+    "certifications": (
+        "certifications", "certificates", "certification", "licenses and certifications",
+        "courses and certifications", "certifications and courses",
+    ),
+    "achievements": (
+        "achievements", "awards", "honors", "honours", "accomplishments", "awards and achievements",
+        "honors and awards", "awards and honors",
+    ),
+}
+_HEADINGS = {alias: section for section, aliases in SECTION_ALIASES.items() for alias in aliases}
+
+# The section each ResumeInfo field is read from, used to send the LLM only what it needs
+FIELD_SECTIONS = {
+    "skills": "skills",
+    "experience": "experience",
+    "certifications": "certifications",
+    "achievements": "achievements",
+    "projects": "projects",
+}
+
+EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[A-Za-z]{2,}")
+PHONE = re.compile(r"(?<![\w/])\+?\(?\d[\d\s().-]{6,}\d(?![\w/])")
+LINKEDIN = re.compile(r"(?:https?://)?(?:[a-z]{2,3}\.)?linkedin\.com/(?:in|pub)/[\w%.-]+/?", re.IGNORECASE)
+GITHUB = re.compile(r"(?:https?://)?(?:www\.)?github\.com/[\w-]+/?(?![\w/])", re.IGNORECASE)
+YEAR_RANGE = re.compile(r"(?:19|20)\d{2}\s*(?:[-–—]|to)\s*(?:(?:19|20)\d{2}|present|current|now)", re.IGNORECASE)
+
+_BULLET = re.compile(r"^\s*(?:[•●▪◦‣∙·*-]|\d+[.)])\s*")
+_LIST_SEPARATORS = re.compile(r"\s*(?:[,;|•●▪]|\s·\s)\s*")
+_HEADING_NOISE = re.compile(r"\((?:cont(?:inued|'d)?\.?)\)|[:\s]+$", re.IGNORECASE)
+_NAME_WORD = re.compile(r"^[^\W\d_][^\W\d_'.-]*(?:['.-][^\W\d_]+)*\.?$")
+
+
+@dataclass
+class RuleExtraction:
+    """ResumeInfo fields recovered without the LLM, each with a confidence in [0, 1]"""
+
+    values: Dict[str, object] = field(default_factory=dict)
+    confidence: Dict[str, float] = field(default_factory=dict)
+    sections: Dict[str, str] = field(default_factory=dict)
+
+    def set(self, name: str, value: object, confidence: float) -> None:
+        self.values[name] = value
+        self.confidence[name] = round(confidence, 2)
+
+    def confident(self, threshold: float = RESUME_RULES_MIN_CONFIDENCE) -> Dict[str, object]:
+        return {name: value for name, value in self.values.items() if self.confidence[name] >= threshold}
+
+    def missing(self, fields: List[str], threshold: float = RESUME_RULES_MIN_CONFIDENCE) -> List[str]:
+        return [name for name in fields if self.confidence.get(name, 0.0) < threshold]
+
+
+def _heading(line: str) -> Optional[Tuple[str, str]]:
+    """(section, inline content) when the line is a section heading such as "SKILLS" or "Skills: Python, Go" """
+    head, colon, rest = line.partition(":")
+    candidate = _HEADING_NOISE.sub("", head if colon else line).strip().lower().replace("&", "and")
+    candidate = " ".join(candidate.split())
+    if len(candidate.split()) > 4 or candidate not in _HEADINGS:
+        return None
+    return _HEADINGS[candidate], rest.strip() if colon else ""
+
+
+def split_sections(text: str) -> Dict[str, str]:
+    """Section name -> body. Lines before the first heading go to "header"; repeated headings are merged."""
+    sections: Dict[str, List[str]] = {"header": []}
+    current = "header"
+    for line in text.split("\n"):
+        heading = _heading(line.strip())
+        if heading is not None:
+            current, inline = heading
+            sections.setdefault(current, [])
+            if inline:
+                sections[current].append(inline)
+            continue
+        sections[current].append(line)
+    return {name: "\n".join(lines).strip() for name, lines in sections.items() if any(line.strip() for line in lines)}
+
+
+def split_items(body: str) -> List[str]:
+    """List items from a section body: one per bullet or line, lines further split on commas, semicolons and pipes"""
+    items = []
+    for line in body.split("\n"):
+        line = _BULLET.sub("", line).strip()
+        # "Languages: Python, Go" -> the label is not an item
+        label, colon, rest = line.partition(":")
+        if colon and rest.strip() and len(label.split()) <= 3:
+            line = rest
+        items.extend(item.strip(" .") for item in _LIST_SEPARATORS.split(line))
+    return list(dict.fromkeys(item for item in items if 1 < len(item) <= 80))
+
+
+def split_entries(body: str) -> List[str]:
+    """Entries of a section whose items span several lines (a title followed by bullets): the title lines"""
+    entries = []
+    for line in body.split("\n"):
+        stripped = line.strip()
+        if stripped and not _BULLET.match(line):
+            entries.append(stripped)
+    return entries
+
+
+def _get_nlp():
+    # The pipeline keywordana shares; imported lazily so importing this module stays cheap
+    from services.keywordana import get_nlp
+    try:
+        return get_nlp()
+    except OSError:
+        # No spaCy model installed: offline parsing still works, names come from the first line
+        return None
+
+
+def _name_like(line: str) -> bool:
+    words = line.split()
+    return 2 <= len(words) <= 4 and all(_NAME_WORD.match(word) and word[0].isupper() for word in words)
+
+
+def extract_name(header: str) -> Tuple[Optional[str], float]:
+    lines = [line.strip() for line in header.split("\n") if line.strip()][:5]
+    if not lines:
+        return None, 0.0
+    nlp = _get_nlp()
+    if nlp is not None and "ner" in nlp.pipe_names:
+        for entity in nlp("\n".join(lines)).ents:
+            if entity.label_ == "PERSON" and _name_like(entity.text):
+                # A PERSON entity that is also the whole first line is the usual resume layout
+                return entity.text, 0.95 if entity.text == lines[0] else 0.85
+    if _name_like(lines[0]):
+        return lines[0], 0.8
+    return None, 0.0
+
+
+def _first(pattern: re.Pattern, text: str) -> Optional[str]:
+    match = pattern.search(text)
+    return match.group(0).rstrip("/") if match else None
+
+
+def _phone(text: str) -> Optional[str]:
+    for match in PHONE.finditer(text):
+        candidate = match.group(0).strip()
+        digits = re.sub(r"\D", "", candidate)
+        # Year ranges and dates also look like digit runs
+        if 7 <= len(digits) <= 15 and not YEAR_RANGE.fullmatch(candidate):
+            return candidate
+    return None
+
+
+def extract_resume_fields(text: str) -> RuleExtraction:
+    """
+    Fill every ResumeInfo field that regexes and section headings can recover.
+    Contact fields are searched in the whole text, so not finding one is itself
+    a confident answer (None). List fields come from their section when present;
+    the experience summary lists the dated role lines.
+    """
+    result = RuleExtraction(sections=split_sections(text))
+    sections = result.sections
+    header = sections.get("header", "")
+
+    name, confidence = extract_name(header)
+    result.set("name", name or "", confidence)
+    email = _first(EMAIL, text)
+    result.set("email", email, 0.98 if email else 0.9)
+    phone = _phone(header) or _phone(text)
+    result.set("phone_number", phone, 0.9 if phone else 0.85)
+    linkedin = _first(LINKEDIN, text)
+    result.set("linkedin", linkedin, 0.98 if linkedin else 0.9)
+    github = _first(GITHUB, text)
+    result.set("github", github, 0.98 if github else 0.9)
+
+    # In a resume with clear headings, a missing certifications or awards section means there are none
+    absent = 0.8 if len(sections) >= 4 else 0.5
+    skills = split_items(sections.get("skills", ""))
+    result.set("skills", skills, 0.9 if skills else 0.0)
+    certifications = split_items(sections.get("certifications", ""))
+    result.set("certifications", certifications, 0.85 if certifications else absent)
+    achievements = split_items(sections.get("achievements", ""))
+    result.set("achievements", achievements or None, 0.85 if achievements else absent)
+    # Entry sections are trusted when every entry line looks like a title: project
+    # names short enough to be headings, roles carrying their date range. Otherwise
+    # titles, companies and descriptions are likely mixed up and the LLM is asked.
+    projects = split_entries(sections.get("projects", ""))
+    if projects:
+        result.set("projects", projects, 0.85 if all(len(entry) <= 80 for entry in projects) else 0.6)
+    else:
+        result.set("projects", projects, absent)
+    entries = split_entries(sections.get("experience", ""))
+    roles = [line for line in entries if YEAR_RANGE.search(line)]
+    if roles:
+        result.set("experience", "; ".join(roles), 0.85 if len(roles) == len(entries) else 0.6)
+    else:
+        # An experience section without dates, or a heading the rules do not know, is not "no experience"
+        result.set("experience", "", 0.0 if entries else absent - 0.1)
+    return result
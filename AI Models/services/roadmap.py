@@ -1,10 +1,13 @@
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
 from pydantic import BaseModel,Field
 import json
 from typing import Optional,List
 from langchain_core.output_parsers import JsonOutputParser
 from dotenv import load_dotenv
+from services.llm_gateway import get_chat_openai, call_llm
+from services.roadmap_cache import RoadmapCache
+from services.components import component
+from services.metrics import stage
 import os
 load_dotenv()
 
@@ -13,7 +16,7 @@ def get_chat_model():
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise ValueError("OPENAI_API_KEY environment variable is required")
-    return ChatOpenAI(model='gpt-4.1-mini-2025-04-14', temperature=0.5)
+    return get_chat_openai('gpt-4.1-mini-2025-04-14', 0.5)
 
 class roadmapstep(BaseModel):
     step:int =Field(description='step of the roadmap')
@@ -40,9 +43,20 @@ template = PromptTemplate(template='''
     \n {format_instruction}
     ''',input_variables=['domain'],validate_template=True,partial_variables={'format_instruction':parser.get_format_instructions()})
 
-model_structure = get_chat_model().with_structured_output(Roadmap)
+@component("roadmap_chain")
+def get_roadmap_chain():
+    return template | get_chat_model().with_structured_output(Roadmap)
 
-chain = template | model_structure
 
+async def generate_roadmap(domain: str) -> Roadmap:
+    """Generate a roadmap without blocking the event loop"""
+    with stage("generate"):
+        return await call_llm("openai", get_roadmap_chain().ainvoke, {"domain": domain})
 
 
+roadmap_cache = RoadmapCache(generate_roadmap, Roadmap)
+
+
+async def create_roadmap(domain: str) -> Roadmap:
+    """Roadmap for a domain, served from the roadmap cache when possible"""
+    return await roadmap_cache.get(domain)
@@ -0,0 +1,278 @@
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+ROADMAP_CACHE_DB = os.getenv("ROADMAP_CACHE_DB", os.path.join("artifacts", "roadmap_cache.db"))
+ROADMAP_CACHE_FRESH_SECONDS = float(os.getenv("ROADMAP_CACHE_FRESH_SECONDS", 7 * 24 * 60 * 60))
+ROADMAP_CACHE_MAX_AGE_SECONDS = float(os.getenv("ROADMAP_CACHE_MAX_AGE_SECONDS", 90 * 24 * 60 * 60))
+ROADMAP_DOMAIN_ALIASES = os.getenv("ROADMAP_DOMAIN_ALIASES") or None
+ROADMAP_CACHE_MAX_DOMAINS = int(os.getenv("ROADMAP_CACHE_MAX_DOMAINS", 10000))
+ROADMAP_COUNT_FLUSH_SECONDS = float(os.getenv("ROADMAP_COUNT_FLUSH_SECONDS", 30))
+MAX_DOMAIN_LENGTH = 100
+
+# Whole-domain aliases, applied after normalization
+DOMAIN_ALIASES: Dict[str, str] = {
+    "ds": "data science",
+    "ml": "machine learning",
+    "ai": "artificial intelligence",
+    "ai ml": "machine learning",
+    "swe": "software engineering",
+    "sde": "software engineering",
+    "ui ux": "ux design",
+    "ux ui": "ux design",
+    "devops engineering": "devops",
+    "frontend": "frontend development",
+    "front end": "frontend development",
+    "front end development": "frontend development",
+    "backend": "backend development",
+    "back end": "backend development",
+    "back end development": "backend development",
+    "full stack": "full stack development",
+    "fullstack": "full stack development",
+    "fullstack development": "full stack development",
+}
+# Abbreviations expanded word by word ("frontend dev" -> "frontend development")
+WORD_ALIASES: Dict[str, str] = {
+    "dev": "development",
+    "developer": "development",
+    "eng": "engineering",
+    "engineer": "engineering",
+    "mgmt": "management",
+    "analyst": "analysis",
+    "scientist": "science",
+}
+
+_NON_WORD = re.compile(r"[^\w\s+#]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _load_aliases(path: Optional[str]) -> Dict[str, str]:
+    aliases = dict(DOMAIN_ALIASES)
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            aliases.update({normalize_words(key): normalize_words(value) for key, value in json.load(f).items()})
+    return aliases
+
+
+def normalize_words(domain: str) -> str:
+    """Lowercase, drop punctuation (keeping C++ / C#), collapse whitespace and expand abbreviations"""
+    text = unicodedata.normalize("NFKC", domain).lower().replace("-", " ").replace("/", " ")
+    words = _WHITESPACE.sub(" ", _NON_WORD.sub(" ", text)).split()
+    return " ".join(WORD_ALIASES.get(word, word) for word in words)
+
+
+class RoadmapCache:
+    """
+    Persistent cache of validated roadmaps keyed by normalized domain.
+
+    Entries are fresh for ROADMAP_CACHE_FRESH_SECONDS. A stale entry is still
+    served while a background refresh replaces it (stale-while-revalidate);
+    entries older than ROADMAP_CACHE_MAX_AGE_SECONDS are regenerated before
+    answering. Concurrent misses for the same domain share one generation.
+    Request counts (for warming the popular domains) are batched in memory and
+    written from a thread; the least requested domains beyond
+    ROADMAP_CACHE_MAX_DOMAINS are dropped.
+    Entries live in SQLite (WAL mode) so they survive restarts and are shared
+    by every worker on the host, with an in-process copy in front that is
+    re-checked against SQLite once stale.
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[str], Awaitable[BaseModel]],
+        model: Type[BaseModel],
+        path: str = ROADMAP_CACHE_DB,
+        fresh_seconds: float = ROADMAP_CACHE_FRESH_SECONDS,
+        max_age_seconds: float = ROADMAP_CACHE_MAX_AGE_SECONDS,
+        aliases_path: Optional[str] = ROADMAP_DOMAIN_ALIASES,
+        max_domains: int = ROADMAP_CACHE_MAX_DOMAINS,
+        flush_seconds: float = ROADMAP_COUNT_FLUSH_SECONDS,
+    ):
+        self.generate = generate
+        self.model = model
+        self.fresh_seconds = fresh_seconds
+        self.max_age_seconds = max_age_seconds
+        self.aliases = _load_aliases(aliases_path)
+        self.max_domains = max_domains
+        self.flush_seconds = flush_seconds
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS roadmaps ("
+            "domain TEXT PRIMARY KEY, roadmap TEXT NOT NULL, "
+            "updated_at REAL NOT NULL, requests INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._lock = threading.Lock()
+        self._memory: Dict[str, Tuple[BaseModel, float]] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._counts: Dict[str, int] = {}
+        self._last_flush = time.monotonic()
+        self._flushing: Optional[asyncio.Task] = None
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def normalize(self, domain: str) -> str:
+        words = normalize_words(domain)
+        key = self.aliases.get(words, words)
+        if not key or len(key) > MAX_DOMAIN_LENGTH:
+            raise ValueError(f"Domain must be 1 to {MAX_DOMAIN_LENGTH} characters")
+        return key
+
+    def _read(self, key: str) -> Optional[Tuple[BaseModel, float]]:
+        entry = self._memory.get(key)
+        # The in-process copy is only trusted while fresh: once stale, another
+        # worker may already have refreshed the shared row
+        if entry is not None and time.time() - entry[1] <= self.fresh_seconds:
+            return entry
+        with self._lock:
+            row = self._conn.execute("SELECT roadmap, updated_at FROM roadmaps WHERE domain = ?", (key,)).fetchone()
+        if row is None or not row[0]:
+            # Rows created by request counting have no roadmap until the first generation
+            return None
+        if entry is not None and entry[1] >= row[1]:
+            return entry
+        entry = (self.model.model_validate_json(row[0]), row[1])
+        self._memory[key] = entry
+        return entry
+
+    def _write(self, key: str, roadmap: BaseModel) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO roadmaps (domain, roadmap, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(domain) DO UPDATE SET roadmap = excluded.roadmap, updated_at = excluded.updated_at",
+                (key, roadmap.model_dump_json(), now),
+            )
+        self._memory[key] = (roadmap, now)
+
+    def _count_request(self, key: str) -> None:
+        self._counts[key] = self._counts.get(key, 0) + 1
+        if time.monotonic() - self._last_flush < self.flush_seconds:
+            return
+        if self._flushing is None or self._flushing.done():
+            self._last_flush = time.monotonic()
+            counts, self._counts = self._counts, {}
+            self._flushing = asyncio.create_task(asyncio.to_thread(self._write_counts, counts))
+
+    def _write_counts(self, counts: Dict[str, int]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO roadmaps (domain, roadmap, updated_at, requests) VALUES (?, '', 0, ?) "
+                    "ON CONFLICT(domain) DO UPDATE SET requests = requests + excluded.requests",
+                    list(counts.items()),
+                )
+                self._conn.execute(
+                    "DELETE FROM roadmaps WHERE domain IN ("
+                    "SELECT domain FROM roadmaps ORDER BY requests DESC, updated_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_domains,),
+                )
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def flush_counts(self) -> None:
+        """Write the pending request counts now, e.g. at shutdown"""
+        counts, self._counts = self._counts, {}
+        if counts:
+            self._write_counts(counts)
+
+    async def _generate(self, key: str) -> BaseModel:
+        roadmap = await self.generate(key)
+        roadmap = self.model.model_validate(roadmap.model_dump() if isinstance(roadmap, BaseModel) else roadmap)
+        self._write(key, roadmap)
+        self.refreshes += 1
+        return roadmap
+
+    def _single_flight(self, key: str) -> "asyncio.Task":
+        """The in-flight generation for a domain, starting one if there is none"""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task
+        task = asyncio.create_task(self._generate(key))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    def _refresh_in_background(self, key: str) -> None:
+        def count_failure(task: asyncio.Task) -> None:
+            if not task.cancelled() and task.exception() is not None:
+                self.refresh_errors += 1
+
+        if key not in self._inflight:
+            self._single_flight(key).add_done_callback(count_failure)
+
+    async def get(self, domain: str) -> BaseModel:
+        key = self.normalize(domain)
+        self._count_request(key)
+        entry = self._read(key)
+        if entry is not None:
+            roadmap, updated_at = entry
+            age = time.time() - updated_at
+            if age <= self.fresh_seconds:
+                self.fresh_hits += 1
+                return roadmap
+            if age <= self.max_age_seconds:
+                self.stale_hits += 1
+                self._refresh_in_background(key)
+                return roadmap
+        self.misses += 1
+        # shield: one caller disconnecting must not cancel the generation the others wait on
+        return await asyncio.shield(self._single_flight(key))
+
+    async def warm(self, domains: List[str], force: bool = False) -> Dict[str, str]:
+        """Generate missing or stale (or with force, all) roadmaps. Returns a status per domain."""
+        keys = list(dict.fromkeys(self.normalize(domain) for domain in domains))
+
+        async def warm_one(key: str) -> str:
+            entry = self._read(key)
+            if entry is not None and not force and time.time() - entry[1] <= self.fresh_seconds:
+                return "fresh"
+            try:
+                await asyncio.shield(self._single_flight(key))
+                return "generated"
+            except Exception as e:
+                return f"error: {e}"
+
+        return dict(zip(keys, await asyncio.gather(*(warm_one(key) for key in keys))))
+
+    def popular_domains(self, limit: int = 20) -> List[str]:
+        self.flush_counts()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT domain FROM roadmaps WHERE requests > 0 ORDER BY requests DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def stats(self) -> dict:
+        with self._lock:
+            cached = self._conn.execute("SELECT COUNT(*) FROM roadmaps WHERE roadmap != ''").fetchone()[0]
+        lookups = self.fresh_hits + self.stale_hits + self.misses
+        return {
+            "domains": cached,
+            "fresh_hits": self.fresh_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "in_flight": len(self._inflight),
+            "hit_ratio": round((self.fresh_hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
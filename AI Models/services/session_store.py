@@ -0,0 +1,220 @@
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+
+import ormsgpack
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CHAT_SESSION_STORE = os.getenv("CHAT_SESSION_STORE", "memory")
+CHAT_SESSION_DB = os.getenv("CHAT_SESSION_DB", os.path.join("artifacts", "chat_sessions.db"))
+CHAT_SESSION_TTL_SECONDS = float(os.getenv("CHAT_SESSION_TTL_SECONDS", 24 * 60 * 60))
+CHAT_SESSION_MAX_SESSIONS = int(os.getenv("CHAT_SESSION_MAX_SESSIONS", 10000))
+CHAT_SESSION_MAX_BYTES = int(os.getenv("CHAT_SESSION_MAX_BYTES", 64 * 1024 * 1024))
+PURGE_EVERY_WRITES = 200
+
+
+def pack_history(history: List[dict]) -> bytes:
+    return ormsgpack.packb(history)
+
+
+def unpack_history(raw: bytes) -> List[dict]:
+    return ormsgpack.unpackb(raw)
+
+
+class SessionStore(ABC):
+    """Conversation histories by session id. Histories are lists of {"role", "content"} dicts."""
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[List[dict]]:
+        ...
+
+    @abstractmethod
+    def set(self, session_id: str, history: List[dict]) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def session_ids(self, limit: Optional[int] = None) -> List[str]:
+        """Live session ids, most recently active first"""
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Per-process LRU store with an idle TTL, a session cap and a byte cap.
+    Histories are kept msgpack-encoded, which is several times smaller than the dicts.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = CHAT_SESSION_TTL_SECONDS,
+        max_sessions: int = CHAT_SESSION_MAX_SESSIONS,
+        max_bytes: int = CHAT_SESSION_MAX_BYTES,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        # session_id -> (packed history, message count, last access time)
+        self._sessions: "OrderedDict[str, Tuple[bytes, int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._messages = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def _drop(self, session_id: str) -> None:
+        raw, count, _ = self._sessions.pop(session_id)
+        self._bytes -= len(raw)
+        self._messages -= count
+
+    def _evict(self, now: float) -> None:
+        # LRU order is last-access order, so expired sessions sit at the front
+        while self._sessions:
+            session_id, (_, _, last_access) = next(iter(self._sessions.items()))
+            over_budget = len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes
+            if not over_budget and now - last_access <= self.ttl_seconds:
+                break
+            self._drop(session_id)
+            self.evictions += 1
+
+    def get(self, session_id: str) -> Optional[List[dict]]:
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            raw, count, last_access = entry
+            if now - last_access > self.ttl_seconds:
+                self._drop(session_id)
+                return None
+            self._sessions[session_id] = (raw, count, now)
+            self._sessions.move_to_end(session_id)
+        return unpack_history(raw)
+
+    def set(self, session_id: str, history: List[dict]) -> None:
+        raw = pack_history(history)
+        now = time.time()
+        with self._lock:
+            if session_id in self._sessions:
+                self._drop(session_id)
+            self._sessions[session_id] = (raw, len(history), now)
+            self._bytes += len(raw)
+            self._messages += len(history)
+            self._evict(now)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            if session_id not in self._sessions:
+                return False
+            self._drop(session_id)
+            return True
+
+    def session_ids(self, limit: Optional[int] = None) -> List[str]:
+        with self._lock:
+            return list(islice(reversed(self._sessions), limit))
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._evict(time.time())
+            return {
+                "backend": "memory",
+                "total_sessions": len(self._sessions),
+                "total_messages": self._messages,
+                "bytes": self._bytes,
+                "evictions": self.evictions,
+            }
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    SQLite-backed store in WAL mode, so every uvicorn worker on the host sees the
+    same sessions. Sessions idle longer than the TTL are purged periodically.
+    """
+
+    def __init__(self, path: str = CHAT_SESSION_DB, ttl_seconds: float = CHAT_SESSION_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_sessions ("
+            "session_id TEXT PRIMARY KEY, history BLOB NOT NULL, "
+            "message_count INTEGER NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chat_sessions_updated_at ON chat_sessions (updated_at)")
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _cutoff(self) -> float:
+        return time.time() - self.ttl_seconds
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM chat_sessions WHERE updated_at < ?", (self._cutoff(),)).rowcount
+
+    def get(self, session_id: str) -> Optional[List[dict]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT history FROM chat_sessions WHERE session_id = ? AND updated_at >= ?",
+                (session_id, self._cutoff()),
+            ).fetchone()
+        return unpack_history(row[0]) if row else None
+
+    def set(self, session_id: str, history: List[dict]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chat_sessions (session_id, history, message_count, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (session_id, pack_history(history), len(history), time.time()),
+            )
+            self._writes += 1
+            purge = self._writes % PURGE_EVERY_WRITES == 0
+        if purge:
+            self.purge_expired()
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,)).rowcount > 0
+
+    def session_ids(self, limit: Optional[int] = None) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id FROM chat_sessions WHERE updated_at >= ? ORDER BY updated_at DESC LIMIT ?",
+                (self._cutoff(), -1 if limit is None else limit),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions, messages, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(message_count), 0), COALESCE(SUM(LENGTH(history)), 0) "
+                "FROM chat_sessions WHERE updated_at >= ?",
+                (self._cutoff(),),
+            ).fetchone()
+        return {"backend": "sqlite", "total_sessions": sessions, "total_messages": messages, "bytes": size}
+
+
+SESSION_STORES: Dict[str, type] = {
+    "memory": MemorySessionStore,
+    "sqlite": SqliteSessionStore,
+}
+
+
+def create_session_store(kind: str = CHAT_SESSION_STORE) -> SessionStore:
+    if kind not in SESSION_STORES:
+        raise ValueError(f"Unknown chat session store: {kind}")
+    return SESSION_STORES[kind]()
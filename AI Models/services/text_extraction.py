@@ -0,0 +1,338 @@
+import io
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import docx2txt
+from fastapi import HTTPException, Request, UploadFile
+from fastapi.routing import APIRoute
+from starlette.formparsers import MultiPartException, MultiPartParser, parse_options_header
+
+from services.extraction_cache import extraction_cache, upload_key
+from services.extraction_pool import extraction_pool
+from services.metrics import stage
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+MAX_REQUEST_BYTES = int(os.getenv("MAX_REQUEST_BYTES", 64 * 1024 * 1024))
+MAX_PDF_PAGES = int(os.getenv("PDF_MAX_PAGES", 3))
+PDF_ENGINE_ORDER = [name.strip() for name in os.getenv("PDF_ENGINES", "pymupdf,pypdfium2,pdfplumber").split(",") if name.strip()]
+READ_CHUNK_BYTES = 64 * 1024
+
+# Output below these is treated as a failed extraction and the next engine is tried
+MIN_CHARS_PER_PAGE = 40
+MIN_ALNUM_RATIO = 0.6
+MAX_GARBAGE_RATIO = 0.02
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+_CONTROL = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f\u00ad\u200b\ufeff]")
+_INLINE_SPACE = re.compile(r"[ \t\u00a0]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+_CID = re.compile(r"\(cid:\d+\)")
+
+
+def normalize_extracted_text(text: str) -> str:
+    """The normalization every engine's output goes through: NFKC, unix newlines, no control characters, collapsed blank space"""
+    text = unicodedata.normalize("NFKC", text).replace("\r\n", "\n").replace("\r", "\n")
+    text = _INLINE_SPACE.sub(" ", _CONTROL.sub("", text))
+    text = "\n".join(line.strip() for line in text.split("\n"))
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+def _pymupdf_pages(data: bytes, max_pages: Optional[int]) -> List[str]:
+    import fitz
+
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        pages = len(doc) if max_pages is None else min(max_pages, len(doc))
+        return [doc[page].get_text("text") for page in range(pages)]
+
+
+def _pypdfium2_pages(data: bytes, max_pages: Optional[int]) -> List[str]:
+    import pypdfium2
+
+    pdf = pypdfium2.PdfDocument(data)
+    try:
+        pages = len(pdf) if max_pages is None else min(max_pages, len(pdf))
+        texts = []
+        for index in range(pages):
+            page = pdf[index]
+            textpage = page.get_textpage()
+            texts.append(textpage.get_text_bounded())
+            textpage.close()
+            page.close()
+        return texts
+    finally:
+        pdf.close()
+
+
+def _pdfplumber_pages(data: bytes, max_pages: Optional[int]) -> List[str]:
+    import pdfplumber
+
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        pages = pdf.pages if max_pages is None else pdf.pages[:max_pages]
+        return [page.extract_text() or "" for page in pages]
+
+
+# Engines return the raw text of each page, up to max_pages
+PDF_ENGINES: Dict[str, Callable[[bytes, Optional[int]], List[str]]] = {
+    "pymupdf": _pymupdf_pages,
+    "pypdfium2": _pypdfium2_pages,
+    "pdfplumber": _pdfplumber_pages,
+}
+
+engine_stats: Dict[str, Counter] = {name: Counter() for name in PDF_ENGINES}
+_stats_lock = threading.Lock()
+
+
+def register_pdf_engine(name: str, engine: Callable[[bytes, Optional[int]], List[str]]) -> None:
+    """Register a PDF text engine; add its name to PDF_ENGINES (the env var) to use it"""
+    PDF_ENGINES[name] = engine
+    engine_stats.setdefault(name, Counter())
+
+
+def _count(engine: str, event: str) -> None:
+    with _stats_lock:
+        engine_stats.setdefault(engine, Counter())[event] += 1
+
+
+def text_quality(text: str, pages: int) -> float:
+    """0 for unusable output, otherwise the share of non-space characters that are alphanumeric"""
+    compact = "".join(text.split())
+    if len(compact) < MIN_CHARS_PER_PAGE * max(pages, 1):
+        return 0.0
+    garbage = compact.count("\ufffd") + 6 * len(_CID.findall(text))
+    if garbage / len(compact) > MAX_GARBAGE_RATIO:
+        return 0.0
+    return sum(char.isalnum() for char in compact) / len(compact)
+
+
+def extract_pdf_with(engine: str, data: bytes, max_pages: Optional[int] = MAX_PDF_PAGES) -> Tuple[str, int]:
+    """Normalized text and page count extracted by one named engine"""
+    pages = PDF_ENGINES[engine](data, max_pages)
+    return normalize_extracted_text("\n\n".join(pages)), len(pages)
+
+
+def extract_pdf(data: bytes, max_pages: Optional[int] = MAX_PDF_PAGES, engines: Optional[List[str]] = None) -> Tuple[str, int]:
+    """
+    Try the engines in order (fastest first) and return the first output that
+    looks like real text, with its page count. If every engine's output is poor,
+    the best one wins.
+    """
+    best, best_quality, errors = ("", 0), -1.0, []
+    for engine in engines or PDF_ENGINE_ORDER:
+        try:
+            text, pages = extract_pdf_with(engine, data, max_pages)
+        except ImportError:
+            continue
+        except Exception as e:
+            _count(engine, "errors")
+            errors.append(f"{engine}: {e}")
+            continue
+        quality = text_quality(text, pages)
+        if quality >= MIN_ALNUM_RATIO:
+            _count(engine, "used")
+            return text, pages
+        _count(engine, "poor_output")
+        if quality > best_quality:
+            best, best_quality = (text, pages), quality
+    if best_quality < 0:
+        raise ValueError(f"Error extracting PDF text: {'; '.join(errors) or 'no PDF engine available'}")
+    return best
+
+
+def extract_pdf_text(data: bytes, max_pages: Optional[int] = MAX_PDF_PAGES) -> str:
+    return extract_pdf(data, max_pages)[0]
+
+
+def extract_docx_text(data: bytes, max_pages: Optional[int] = None) -> str:
+    try:
+        return normalize_extracted_text(docx2txt.process(io.BytesIO(data)))
+    except Exception as e:
+        raise ValueError(f"Error extracting DOCX text: {e}")
+
+
+def extract_txt_text(data: bytes, max_pages: Optional[int] = None) -> str:
+    return normalize_extracted_text(data.decode("utf-8-sig", errors="replace"))
+
+
+EXTRACTORS: Dict[str, Callable[..., str]] = {
+    ".pdf": extract_pdf_text,
+    ".doc": extract_docx_text,
+    ".docx": extract_docx_text,
+    ".txt": extract_txt_text,
+}
+
+
+def file_extension(filename: str) -> str:
+    return os.path.splitext(filename or "")[1].lower()
+
+
+def extract_document(data: bytes, filename: str, max_pages: Optional[int] = MAX_PDF_PAGES) -> Tuple[str, Optional[int]]:
+    """Text of an in-memory document and its page count (None for formats without pages)"""
+    extension = file_extension(filename)
+    if extension == ".pdf":
+        return extract_pdf(data, max_pages)
+    extractor = EXTRACTORS.get(extension)
+    if extractor is None:
+        raise ValueError(f"Unsupported file type: {filename}")
+    return extractor(data, max_pages=max_pages), None
+
+
+def extract_text(data: bytes, filename: str, max_pages: Optional[int] = MAX_PDF_PAGES) -> str:
+    """Text of an in-memory document, picking the extractor from the file extension"""
+    return extract_document(data, filename, max_pages)[0]
+
+
+async def read_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> bytes:
+    """Read an upload in chunks, failing as soon as it grows past max_bytes"""
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLarge(f"File too large. Please upload files smaller than {max_bytes // (1024 * 1024)}MB.")
+    buffer = bytearray()
+    while True:
+        chunk = await file.read(READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        buffer += chunk
+        if len(buffer) > max_bytes:
+            raise UploadTooLarge(f"File too large. Please upload files smaller than {max_bytes // (1024 * 1024)}MB.")
+    return bytes(buffer)
+
+
+@dataclass
+class ExtractedUpload:
+    key: str
+    text: str
+    pages: Optional[int]
+    cached: bool
+
+
+def check_extension(filename: str, allowed: Optional[Iterable[str]] = None) -> str:
+    extension = file_extension(filename)
+    if extension not in EXTRACTORS or (allowed is not None and extension not in allowed):
+        raise ValueError(f"Unsupported file type: {extension or filename}")
+    return extension
+
+
+async def extract_bytes(data: bytes, filename: str, max_pages: Optional[int] = MAX_PDF_PAGES) -> ExtractedUpload:
+    """
+    Extract a document already in memory in the extraction worker pool. A document
+    whose bytes were seen before is answered from the extraction cache. Raises
+    ExtractionOverloaded when the pool is saturated and ExtractionTimeout when the
+    document takes too long.
+    """
+    with stage("extract"):
+        key = upload_key(data, filename, max_pages)
+        cached = extraction_cache.get_text(key)
+        if cached is not None:
+            return ExtractedUpload(key, cached[0], cached[1], cached=True)
+        text, pages = await extraction_pool.run(extract_document, data, filename, max_pages)
+        extraction_cache.put_text(key, text, pages)
+        return ExtractedUpload(key, text, pages, cached=False)
+
+
+async def extract_upload(
+    file: UploadFile,
+    allowed: Optional[Iterable[str]] = None,
+    max_pages: Optional[int] = MAX_PDF_PAGES,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+) -> ExtractedUpload:
+    """Read an upload into memory and extract it with extract_bytes; nothing touches the disk"""
+    if not file or not file.filename:
+        raise ValueError("No file provided")
+    check_extension(file.filename, allowed)
+    with stage("upload"):
+        data = await read_upload(file, max_bytes)
+    return await extract_bytes(data, file.filename, max_pages)
+
+
+async def extract_upload_text(
+    file: UploadFile,
+    allowed: Optional[Iterable[str]] = None,
+    max_pages: Optional[int] = MAX_PDF_PAGES,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+) -> str:
+    return (await extract_upload(file, allowed, max_pages, max_bytes)).text
+
+
+class UploadParser(MultiPartParser):
+    """
+    Starlette spools multipart files to a temporary file above 1 MB; keep any file
+    we would accept in memory (request bodies are capped by RequestSizeLimitMiddleware)
+    """
+
+    spool_max_size = max(MultiPartParser.spool_max_size, MAX_UPLOAD_BYTES)
+
+
+class UploadRequest(Request):
+    """
+    A request whose multipart form is parsed with UploadParser. Starlette has no
+    public hook for the parser class, so this overrides Request._get_form and passes
+    its options through unchanged; tests/test_text_extraction.py checks it still
+    takes effect, and requirements.txt pins Starlette.
+    """
+
+    async def _get_form(self, **options):
+        if self._form is None and parse_options_header(self.headers.get("Content-Type"))[0] == b"multipart/form-data":
+            parser = UploadParser(self.headers, self.stream(), **options)
+            try:
+                self._form = await parser.parse()
+            except MultiPartException as exc:
+                raise HTTPException(status_code=400, detail=exc.message)
+        return await super()._get_form(**options)
+
+
+if not callable(getattr(Request, "_get_form", None)):
+    # Fail at startup rather than silently spooling uploads to disk again
+    raise RuntimeError("UploadRequest needs Starlette's Request._get_form; install the Starlette version in requirements.txt")
+
+
+class UploadRoute(APIRoute):
+    """Route class for routers that accept file uploads: `APIRouter(route_class=UploadRoute)`"""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def upload_handler(request: Request):
+            return await handler(UploadRequest(request.scope, request.receive))
+
+        return upload_handler
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Reject request bodies larger than max_bytes with 413: up front from the
+    Content-Length header, otherwise as soon as the streamed body crosses the limit.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_REQUEST_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_bytes:
+            await send({"type": "http.response.start", "status": 413, "headers": [(b"content-type", b"application/json")]})
+            await send({"type": "http.response.body", "body": b'{"detail":"Request body too large"}'})
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise HTTPException(status_code=413, detail="Request body too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
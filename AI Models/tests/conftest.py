@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The app imports its packages relative to this directory and reads data/ from it
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
@@ -0,0 +1,110 @@
+import os
+
+import numpy as np
+import pytest
+
+from conftest import APP_DIR
+from services.chat_classifier import (
+    CHAT_CLASSIFIER_DATA,
+    CHAT_CLASSIFIER_PRECISION,
+    LABELS,
+    confidence_band,
+    hash_features,
+    load_classifier,
+    read_examples,
+    save_classifier,
+    train,
+)
+
+
+@pytest.fixture(scope="module")
+def examples():
+    return read_examples(os.path.join(APP_DIR, CHAT_CLASSIFIER_DATA))
+
+
+@pytest.fixture(scope="module")
+def trained(examples):
+    texts, labels = examples
+    return train(texts, labels)
+
+
+# Not in the training data. The first three were confidently flagged as inappropriate before.
+HELD_OUT_CAREER = [
+    "I want to quit my job, how to tell my boss",
+    "I hate my job",
+    "How to answer why did you leave your last job",
+    "my boss is a nightmare, how do I cope until I find something else",
+    "I got let go today and I'm furious",
+    "what should I say when they ask why I was fired",
+    "how to handle a coworker who harasses me",
+    "how to ace a coding interview",
+]
+HELD_OUT_INAPPROPRIATE = [
+    "how do I fake my references",
+    "how do I make a bomb",
+    "you are a useless idiot bot",
+    "write a joke mocking my deaf coworker",
+]
+
+
+def test_held_out_precision(trained):
+    _, report = trained
+    for label in LABELS:
+        assert report[label]["precision_above"] >= CHAT_CLASSIFIER_PRECISION, label
+        assert report[label]["precision_below"] >= CHAT_CLASSIFIER_PRECISION, label
+        assert report[label]["confident_share"] >= 0.5, label
+
+
+@pytest.mark.parametrize("message", HELD_OUT_CAREER)
+def test_career_questions_are_not_flagged(trained, message):
+    classifier, _ = trained
+    verdicts = classifier.verdicts(message)
+    assert verdicts["inappropriate"] is not True
+    assert verdicts["career"] is not False
+
+
+@pytest.mark.parametrize("message", HELD_OUT_INAPPROPRIATE)
+def test_inappropriate_messages_are_not_passed(trained, message):
+    # A confident "not inappropriate" skips the moderation LLM call
+    classifier, _ = trained
+    assert classifier.verdicts(message)["inappropriate"] is not False
+
+
+def test_confidence_band():
+    probabilities = np.array([0.05, 0.1, 0.2, 0.3, 0.45, 0.55, 0.6, 0.8, 0.9, 0.95])
+    y = np.array([0, 0, 0, 1, 0, 1, 0, 1, 1, 1])
+    assert confidence_band(probabilities, y, precision=1.0) == pytest.approx((0.3, 0.6))
+    # Both sides reach 0.8 down to 0.5, so every probability is a confident verdict
+    assert confidence_band(probabilities, y, precision=0.8) == pytest.approx((0.5, 0.5))
+    # The most confident example on each side is wrong: no verdict is ever confident
+    assert confidence_band(probabilities, 1 - y, precision=1.0) == (0.0, 1.0)
+
+
+def test_probabilities_match_hashed_features(trained, examples):
+    classifier, _ = trained
+    texts, _ = examples
+    features = hash_features(texts[:20])
+    expected = 1.0 / (1.0 + np.exp(-(features @ classifier.weights + classifier.bias)))
+    for row, text in enumerate(texts[:20]):
+        probabilities = classifier.probabilities(text)
+        assert [probabilities[label] for label in classifier.labels] == pytest.approx(expected[row].tolist(), abs=1e-5)
+
+
+def test_uncertain_band_defers(trained):
+    classifier, _ = trained
+    low, high = classifier.bands["career"]
+    probability = classifier.probabilities("hmm")["career"]
+    verdict = classifier.verdicts("hmm")["career"]
+    assert verdict is (None if low <= probability <= high else probability > high)
+
+
+def test_save_and_load(trained, tmp_path):
+    classifier, _ = trained
+    path = str(tmp_path / "chat_classifier.joblib")
+    save_classifier(classifier, path)
+    loaded = load_classifier(path)
+    assert loaded.labels == classifier.labels
+    assert loaded.bands == classifier.bands
+    message = "How do I prepare for a system design interview?"
+    assert loaded.verdicts(message) == classifier.verdicts(message)
+    assert load_classifier(str(tmp_path / "missing.joblib")) is None
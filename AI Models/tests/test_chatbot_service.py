@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from services import chatbot_service
+
+
+@pytest.fixture
+def screening(monkeypatch):
+    """Fake classifier verdicts and LLM gates; records which gates were asked"""
+    state = {"verdicts": {"career": None, "inappropriate": None}, "relevant": True, "appropriate": True, "asked": []}
+
+    async def relevance(message):
+        state["asked"].append("relevance")
+        return state["relevant"]
+
+    async def moderation(message):
+        state["asked"].append("moderation")
+        return state["appropriate"]
+
+    monkeypatch.setattr(chatbot_service, "classify_message", lambda message: dict(state["verdicts"]))
+    monkeypatch.setattr(chatbot_service, "_passes_relevance", relevance)
+    monkeypatch.setattr(chatbot_service, "_passes_moderation", moderation)
+    return state
+
+
+async def advice():
+    return "advice"
+
+
+def screen(message):
+    return asyncio.run(chatbot_service.screen_concurrently(message, advice()))
+
+
+def test_confident_pass_skips_the_llm(screening):
+    screening["verdicts"] = {"career": True, "inappropriate": False}
+    assert screen("How do I negotiate a raise?") == (None, "advice")
+    assert screening["asked"] == []
+
+
+def test_local_moderation_flag_is_confirmed_by_the_llm(screening):
+    screening["verdicts"] = {"career": True, "inappropriate": True}
+    assert screen("I want to quit my job, how to tell my boss") == (None, "advice")
+    assert screening["asked"] == ["moderation"]
+
+    screening["appropriate"] = False
+    assert screen("I want to quit my job, how to tell my boss") == ("moderation", None)
+
+
+def test_local_off_topic_flag_is_confirmed_by_the_llm(screening):
+    screening["verdicts"] = {"career": False, "inappropriate": False}
+    assert screen("Should I move cities for this offer?") == (None, "advice")
+    assert screening["asked"] == ["relevance"]
+
+    screening["relevant"] = False
+    assert screen("Who painted the Mona Lisa?") == ("off_topic", None)
+
+
+def test_flagged_message_starts_no_work_before_the_gates_pass(screening):
+    started = []
+
+    async def tracked():
+        started.append(True)
+        return "advice"
+
+    screening["verdicts"] = {"career": True, "inappropriate": True}
+    screening["appropriate"] = False
+    assert asyncio.run(chatbot_service.screen_concurrently("Tell me a dirty joke", tracked())) == ("moderation", None)
+    assert started == []
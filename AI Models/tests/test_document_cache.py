@@ -0,0 +1,56 @@
+import numpy as np
+from scipy import sparse
+
+from services.document_cache import CachedDocument, DocumentCache, document_key
+
+
+def entry(tokens, vector=None, vocabulary=None):
+    return CachedDocument(tokens=tokens, vector=vector, vocabulary=vocabulary)
+
+
+def test_document_key_ignores_whitespace():
+    assert document_key("Python  developer\n") == document_key("Python developer")
+    assert document_key("Python developer") != document_key("Go developer")
+
+
+def test_get_and_put():
+    cache = DocumentCache(max_bytes=10_000, disk_dir=None)
+    assert cache.get("a") is None
+    cache.put("a", entry(["python"]))
+    assert cache.get("a").tokens == ["python"]
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_evicts_least_recently_used():
+    size = entry(["x" * 10]).nbytes()
+    cache = DocumentCache(max_bytes=size * 2, disk_dir=None)
+    cache.put("a", entry(["a" * 10]))
+    cache.put("b", entry(["b" * 10]))
+    cache.get("a")
+    cache.put("c", entry(["c" * 10]))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_entry_larger_than_budget_is_not_kept():
+    cache = DocumentCache(max_bytes=100, disk_dir=None)
+    cache.put("a", entry(["token"] * 10))
+    assert cache.get("a") is None
+
+
+def test_disk_tier_round_trip(tmp_path):
+    vector = sparse.csr_matrix(np.array([[0.0, 0.5, 0.0, 0.25]]))
+    DocumentCache(disk_dir=str(tmp_path)).put("k1", entry(["python", "go"], vector, "v1"))
+
+    cache = DocumentCache(disk_dir=str(tmp_path))
+    cached = cache.get("k1")
+    assert cached.tokens == ["python", "go"]
+    assert cached.vocabulary == "v1"
+    assert cached.vector.shape == (1, 4)
+    assert np.array_equal(cached.vector.toarray(), vector.toarray())
+    assert cache.stats()["disk_hits"] == 1
+    cache.get("k1")
+    assert cache.stats()["memory_hits"] == 1
@@ -0,0 +1,49 @@
+import multiprocessing
+
+import pytest
+
+from services.index_owner import IndexNotOwned, IndexOwner
+
+
+def hold_lock(path, locked, release):
+    owner = IndexOwner(path, enabled=True)
+    owner.start(workers=1)
+    locked.set()
+    release.wait(10)
+
+
+def test_start_claims_the_indexes(tmp_path):
+    owner = IndexOwner(str(tmp_path / "index.lock"), enabled=True)
+    owner.start(workers=1)
+    assert owner.held()
+    owner.require()
+
+
+def test_several_workers_refuse_to_start(tmp_path):
+    owner = IndexOwner(str(tmp_path / "index.lock"), enabled=True)
+    with pytest.raises(IndexNotOwned, match="2 workers"):
+        owner.start(workers=2)
+    assert not owner.held()
+
+
+def test_second_process_refuses_to_start(tmp_path):
+    path = str(tmp_path / "index.lock")
+    context = multiprocessing.get_context("spawn")
+    locked, release = context.Event(), context.Event()
+    holder = context.Process(target=hold_lock, args=(path, locked, release))
+    holder.start()
+    try:
+        assert locked.wait(30)
+        with pytest.raises(IndexNotOwned, match=str(holder.pid)):
+            IndexOwner(path, enabled=True).start(workers=1)
+    finally:
+        release.set()
+        holder.join(10)
+
+
+def test_disabled_index(tmp_path):
+    owner = IndexOwner(str(tmp_path / "index.lock"), enabled=False)
+    owner.start(workers=4)
+    assert not owner.held()
+    with pytest.raises(IndexNotOwned, match="disabled"):
+        owner.require()
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from services import llm_gateway
+
+
+@pytest.fixture
+def provider_calls(monkeypatch):
+    """Replace the provider call with a slow fake and record each call made"""
+    calls = []
+
+    async def fake_call(provider, fn, *args, **kwargs):
+        calls.append(args)
+        number = len(calls)
+        await asyncio.sleep(0.05)
+        return f"answer {number}"
+
+    monkeypatch.setattr(llm_gateway, "_call_with_retries", fake_call)
+    monkeypatch.setattr(llm_gateway, "single_flight_stats", {"calls": 0, "coalesced": 0})
+    return calls
+
+
+async def ask(question):
+    pass
+
+
+def test_identical_requests_share_one_call(provider_calls):
+    async def main():
+        return await asyncio.gather(*(llm_gateway._single_flight("openai", ask, "hello") for _ in range(3)))
+
+    assert asyncio.run(main()) == ["answer 1"] * 3
+    assert len(provider_calls) == 1
+    assert llm_gateway.single_flight_stats == {"calls": 1, "coalesced": 2}
+    assert llm_gateway._flights == {}
+
+
+def test_different_requests_are_not_shared(provider_calls):
+    async def main():
+        return await asyncio.gather(
+            llm_gateway._single_flight("openai", ask, "hello"),
+            llm_gateway._single_flight("openai", ask, "goodbye"),
+        )
+
+    assert sorted(asyncio.run(main())) == ["answer 1", "answer 2"]
+    assert len(provider_calls) == 2
+
+
+def test_cancelled_flight_is_not_joined(provider_calls):
+    async def main():
+        first = asyncio.create_task(llm_gateway._single_flight("openai", ask, "hello"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        # The call is abandoned as soon as its last waiter leaves
+        second = asyncio.create_task(llm_gateway._single_flight("openai", ask, "hello"))
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "answer 2"
+    assert len(provider_calls) == 2
+    assert llm_gateway._flights == {}
+
+
+def test_flight_survives_while_a_waiter_remains(provider_calls):
+    async def main():
+        first = asyncio.create_task(llm_gateway._single_flight("openai", ask, "hello"))
+        second = asyncio.create_task(llm_gateway._single_flight("openai", ask, "hello"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "answer 1"
+    assert len(provider_calls) == 1
@@ -0,0 +1,64 @@
+import json
+
+from services.resume_parser_service import split_packed_response
+
+TEXTS = [
+    "Priya Sharma\npriya.sharma@example.com\nSKILLS\nPython",
+    "Arjun Mehta\narjun@example.org\nSKILLS\nGo",
+]
+
+
+def resume(number, name, email):
+    return {
+        "resume_number": number,
+        "name": name,
+        "email": email,
+        "skills": ["Python"],
+        "experience": "",
+        "certifications": [],
+        "achievements": None,
+        "projects": [],
+    }
+
+
+def packed(*entries):
+    return "```json\n" + json.dumps({"resumes": list(entries)}) + "\n```"
+
+
+def test_entries_are_matched_by_number():
+    content = packed(resume(2, "Arjun Mehta", "arjun@example.org"), resume(1, "Priya Sharma", "priya.sharma@example.com"))
+    first, second = split_packed_response(content, TEXTS)
+    assert first["name"] == "Priya Sharma"
+    assert second["email"] == "arjun@example.org"
+    assert "resume_number" not in first
+
+
+def test_missing_and_duplicate_numbers_are_none():
+    content = packed(resume(2, "Arjun Mehta", "arjun@example.org"), resume(2, "Arjun Mehta", "arjun@example.org"))
+    assert split_packed_response(content, TEXTS) == [None, None]
+
+
+def test_entry_for_another_resume_is_none():
+    content = packed(resume(1, "Arjun Mehta", "arjun@example.org"), resume(2, "Arjun Mehta", "arjun@example.org"))
+    first, second = split_packed_response(content, TEXTS)
+    assert first is None
+    assert second["name"] == "Arjun Mehta"
+
+
+def test_invalid_entry_is_none():
+    invalid = resume(1, "Priya Sharma", "priya.sharma@example.com")
+    del invalid["skills"]
+    content = packed(invalid, resume(2, "Arjun Mehta", "arjun@example.org"))
+    first, second = split_packed_response(content, TEXTS)
+    assert first is None
+    assert second is not None
+
+
+def test_unparseable_response():
+    assert split_packed_response("Sorry, I cannot help with that.", TEXTS) == [None, None]
+    assert split_packed_response(json.dumps({"resumes": "none"}), TEXTS) == [None, None]
+
+
+def test_bare_list_is_accepted():
+    content = json.dumps([resume(1, "Priya Sharma", "priya.sharma@example.com")])
+    assert split_packed_response(content, TEXTS[:1])[0]["name"] == "Priya Sharma"
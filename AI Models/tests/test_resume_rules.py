@@ -0,0 +1,87 @@
+import pytest
+
+from services import keywordana
+from services.resume_rules import RESUME_RULES_MIN_CONFIDENCE, extract_name, extract_resume_fields
+
+RESUME = """Priya Sharma
+Software Engineer · priya.sharma@example.com · +1 555 0100 · linkedin.com/in/priyasharma
+
+SUMMARY
+Software Engineer with 3 years of experience.
+
+SKILLS
+Python, Go, Kubernetes
+
+EXPERIENCE
+DevOps Engineer — Umbrella Analytics (2015–2017)
+• Built the CI/CD pipeline.
+Software Engineer — Stark Industries (2017–present)
+• Led the billing platform.
+
+PROJECTS
+Resume Parser
+Roadmap Generator
+
+EDUCATION
+B.Tech in Computer Science, University of Example, 2010
+"""
+
+
+def confident(extraction, field):
+    return extraction.confidence[field] >= RESUME_RULES_MIN_CONFIDENCE
+
+
+def test_contact_fields():
+    extraction = extract_resume_fields(RESUME)
+    assert extraction.values["name"] == "Priya Sharma"
+    assert extraction.values["email"] == "priya.sharma@example.com"
+    assert extraction.values["phone_number"] == "+1 555 0100"
+    assert extraction.values["linkedin"] == "linkedin.com/in/priyasharma"
+    assert extraction.values["github"] is None
+    assert all(confident(extraction, field) for field in ("name", "email", "phone_number", "linkedin", "github"))
+
+
+def test_sections():
+    extraction = extract_resume_fields(RESUME)
+    assert extraction.values["skills"] == ["Python", "Go", "Kubernetes"]
+    assert extraction.values["projects"] == ["Resume Parser", "Roadmap Generator"]
+    assert extraction.values["experience"] == (
+        "DevOps Engineer — Umbrella Analytics (2015–2017); Software Engineer — Stark Industries (2017–present)"
+    )
+    assert all(confident(extraction, field) for field in ("skills", "projects", "experience", "certifications"))
+    assert extraction.values["certifications"] == []
+
+
+def test_undated_experience_is_left_to_the_llm():
+    text = RESUME.replace("(2015–2017)", "").replace("(2017–present)", "")
+    extraction = extract_resume_fields(text)
+    assert extraction.values["experience"] == ""
+    assert extraction.confidence["experience"] == 0.0
+
+
+def test_long_project_entries_are_left_to_the_llm():
+    text = RESUME.replace("Resume Parser", "Resume Parser " + "that extracts every field from uploaded resumes " * 3)
+    assert not confident(extract_resume_fields(text), "projects")
+
+
+def test_missing_sections_are_not_confident():
+    extraction = extract_resume_fields("Priya Sharma\npriya.sharma@example.com\n\nI write software.")
+    assert extraction.values["skills"] == []
+    assert extraction.confidence["skills"] == 0.0
+    assert not confident(extraction, "experience")
+    assert not confident(extraction, "certifications")
+
+
+def test_name_without_a_spacy_model(monkeypatch):
+    def missing_model():
+        raise OSError("[E050] Can't find model 'en_core_web_sm'")
+
+    monkeypatch.setattr(keywordana, "get_nlp", missing_model)
+    assert extract_name("Priya Sharma\nSoftware Engineer") == ("Priya Sharma", 0.8)
+    assert extract_name("Curriculum Vitae 2024\nPriya Sharma") == (None, 0.0)
+
+
+def test_name_found_by_ner():
+    pytest.importorskip("en_core_web_sm")
+    name, confidence = extract_name("Priya Sharma\nSoftware Engineer")
+    assert (name, confidence) == ("Priya Sharma", 0.95)
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, FastAPI, File, Form, UploadFile
+from fastapi.testclient import TestClient
+
+from services.text_extraction import MAX_UPLOAD_BYTES, UploadRoute
+
+# Above Starlette's 1 MB spool threshold, within what the upload routes accept
+UPLOAD = b"x" * min(MAX_UPLOAD_BYTES, 3 * 1024 * 1024)
+
+
+def client():
+    upload_router = APIRouter(route_class=UploadRoute)
+    plain_router = APIRouter()
+
+    @upload_router.post("/upload")
+    async def upload(file: UploadFile = File(...), note: str = Form("")):
+        return {"in_memory": not file.file._rolled, "size": len(await file.read()), "note": note}
+
+    @plain_router.post("/plain")
+    async def plain(file: UploadFile = File(...)):
+        return {"in_memory": not file.file._rolled}
+
+    app = FastAPI()
+    app.include_router(upload_router)
+    app.include_router(plain_router)
+    return TestClient(app)
+
+
+def test_upload_routes_keep_files_in_memory():
+    response = client().post("/upload", files={"file": ("resume.pdf", UPLOAD)}, data={"note": "hi"})
+    assert response.status_code == 200
+    assert response.json() == {"in_memory": True, "size": len(UPLOAD), "note": "hi"}
+
+
+def test_other_routes_keep_starlettes_limit():
+    response = client().post("/plain", files={"file": ("resume.pdf", UPLOAD)})
+    assert response.json() == {"in_memory": False}
+
+
+def test_non_multipart_body_is_untouched():
+    response = client().post("/upload", data={"note": "hi"})
+    assert response.status_code == 422